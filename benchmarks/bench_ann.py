@@ -0,0 +1,128 @@
+"""
+Recall@k vs latency of the approximate index types against the exact flat baseline,
+and recall vs memory of the compressed vector precisions with and without exact re-scoring.
+
+Uses the vectors of a persisted artifact when one is given, otherwise synthetic
+clustered vectors. Run from the project root:
+    python -m benchmarks.bench_ann --index artifacts/vectorstore/<fingerprint>/index.faiss
+    python -m benchmarks.bench_ann --num-vectors 100000 --dim 768
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from src.utils.main_utils import read_yaml_file
+from src.vectorstore.faiss_store import (
+    apply_search_params,
+    build_faiss_index,
+    bytes_per_vector,
+    reconstruct_vectors,
+)
+
+SWEEPS = {
+    "hnsw": ("ef_search", [16, 32, 64, 128, 256]),
+    "ivf_flat": ("nprobe", [1, 4, 16, 64]),
+    "ivf_pq": ("nprobe", [4, 16, 64]),
+}
+PRECISION_INDEX_TYPES = ["flat", "hnsw"]
+PRECISIONS = ["fp32", "fp16", "sq8", "pq"]
+
+
+def synthetic_vectors(num_vectors: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Gaussian clusters, closer to real embedding distributions than uniform noise."""
+    centers = rng.standard_normal((max(1, num_vectors // 500), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=num_vectors)
+    return centers[labels] + 0.3 * rng.standard_normal((num_vectors, dim)).astype(np.float32)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(row_found[:k]) & set(row_truth)) for row_found, row_truth in zip(found, truth))
+    return hits / truth.size
+
+
+def timed_search(index: faiss.Index, queries: np.ndarray, k: int) -> tuple[np.ndarray, float]:
+    """Search one query at a time (like the API does) and return ids and ms/query."""
+    started = time.perf_counter()
+    ids = np.vstack([index.search(query.reshape(1, -1), k)[1] for query in queries])
+    return ids, (time.perf_counter() - started) * 1000 / len(queries)
+
+
+def rescored_search(
+    index: faiss.Index, vectors: np.ndarray, queries: np.ndarray, k: int, oversample: int
+) -> tuple[np.ndarray, float]:
+    """Fetch oversample * k candidates and re-rank them by exact L2, like the retriever does."""
+    started = time.perf_counter()
+    rows = []
+    for query in queries:
+        candidates = index.search(query.reshape(1, -1), k * oversample)[1][0]
+        candidates = candidates[candidates >= 0]
+        distances = ((vectors[candidates] - query) ** 2).sum(axis=1)
+        rows.append(candidates[np.argsort(distances, kind="stable")[:k]])
+    return np.vstack(rows), (time.perf_counter() - started) * 1000 / len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", help="index.faiss of a persisted vector store artifact")
+    parser.add_argument("--num-vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--config", default="configs/vectorstore.yaml")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.index:
+        vectors = reconstruct_vectors(faiss.read_index(args.index))
+    else:
+        vectors = synthetic_vectors(args.num_vectors, args.dim, rng)
+    # Queries are perturbed corpus vectors, so every query has real near neighbours
+    picks = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((len(picks), vectors.shape[1])).astype(np.float32)
+    config = (read_yaml_file(args.config) or {}).get("vectorstore", {})
+
+    flat = faiss.IndexFlat(vectors.shape[1], faiss.METRIC_L2)
+    flat.add(vectors)
+    truth, flat_ms = timed_search(flat, queries, args.k)
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}, {len(queries)} queries, k={args.k}")
+    print(f"{'index':<10} {'param':<14} {'build (s)':>9} {'recall@k':>9} {'ms/query':>9} {'speedup':>8}")
+    print(f"{'flat':<10} {'-':<14} {0:>9.1f} {1:>9.3f} {flat_ms:>9.3f} {1:>7.1f}x")
+
+    for index_type, (param, values) in SWEEPS.items():
+        started = time.perf_counter()
+        index = build_faiss_index(vectors, config, index_type=index_type)
+        index.add(vectors)
+        build_s = time.perf_counter() - started
+        for value in values:
+            apply_search_params(index, {param: value})
+            found, ms = timed_search(index, queries, args.k)
+            print(
+                f"{index_type:<10} {f'{param}={value}':<14} {build_s:>9.1f} "
+                f"{recall_at_k(found, truth):>9.3f} {ms:>9.3f} {flat_ms / ms:>7.1f}x"
+            )
+
+    oversample = config.get("rescore_oversample", 3)
+    print(f"\nvector precision (rescore fetches {oversample} x k candidates)")
+    print(
+        f"{'index':<10} {'precision':<10} {'bytes/vec':>9} {'recall@k':>9} "
+        f"{'rescored':>9} {'ms/query':>9} {'rescored ms':>11}"
+    )
+    for index_type in PRECISION_INDEX_TYPES:
+        for precision in PRECISIONS:
+            index = build_faiss_index(vectors, config, index_type=index_type, precision=precision)
+            index.add(vectors)
+            apply_search_params(index, config)
+            found, ms = timed_search(index, queries, args.k)
+            rescored, rescored_ms = rescored_search(index, vectors, queries, args.k, oversample)
+            print(
+                f"{index_type:<10} {precision:<10} {bytes_per_vector(index):>9} "
+                f"{recall_at_k(found, truth):>9.3f} {recall_at_k(rescored, truth):>9.3f} "
+                f"{ms:>9.3f} {rescored_ms:>11.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
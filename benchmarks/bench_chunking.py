@@ -0,0 +1,109 @@
+"""
+Length-based refinement: token-window splitting vs the previous recursive splitter.
+
+Both paths start from the same structural chunks. The legacy path re-splits every
+oversized chunk with a RecursiveCharacterTextSplitter whose length function
+re-tokenizes each candidate piece; the current path encodes every structural
+chunk once and cuts windows on that encoding.
+
+Run from the project root:
+    python -m benchmarks.bench_chunking
+    python -m benchmarks.bench_chunking --pdf data/handbook.pdf --target 256 --overlap 50
+"""
+import argparse
+import textwrap
+import time
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.preprocessing.chunking import DocumentChunker
+from src.utils.main_utils import num_tokens_from_string
+
+
+def legacy_refinement(structural_chunks: list, target_chunk_size: int, chunk_overlap: int) -> list:
+    """The refinement DocumentChunker.length_based_refinement did before the token splitter."""
+    refined_chunks = []
+    for i, structural_chunk in enumerate(structural_chunks):
+        text = structural_chunk['text']
+        metadata = structural_chunk['metadata']
+        if num_tokens_from_string(text) <= target_chunk_size:
+            refined_chunks.append(structural_chunk)
+            continue
+        sub_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=target_chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=num_tokens_from_string,
+            add_start_index=True,
+        )
+        sub_documents = sub_splitter.split_documents([Document(page_content=text, metadata=metadata)])
+        for j, sub_doc in enumerate(sub_documents):
+            sub_chunk_metadata = sub_doc.metadata.copy()
+            sub_chunk_metadata['chunk_id'] = f"{metadata.get('chunk_id', i)}-{j}"
+            refined_chunks.append({'text': sub_doc.page_content, 'metadata': sub_chunk_metadata})
+    return refined_chunks
+
+
+def load_text(pdf_path: str | None, corpus: str, pages: int) -> str:
+    """
+    Text of the PDF, or `pages` pages of PDF-like text built from `corpus`: lines
+    hard-wrapped at 90 columns, as pypdf extracts them, with a blank line only
+    between pages.
+    """
+    if pdf_path:
+        from pypdf import PdfReader
+
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(pdf_path).pages)
+    with open(corpus, "r", encoding="utf-8") as f:
+        words = f.read().split()
+    # ~3000 characters per page, the size of a dense text page
+    page_words = max(1, len(words) * 3000 // max(1, sum(len(word) + 1 for word in words)))
+    out = []
+    for page in range(pages):
+        offset = page * page_words % len(words)
+        page_text = " ".join((words * 2)[offset:offset + page_words])
+        out.append("\n".join(textwrap.wrap(page_text, width=90)))
+    return "\n\n".join(out)
+
+
+def summarize(name: str, seconds: float, chunks: list) -> None:
+    tokens = [num_tokens_from_string(chunk['text']) for chunk in chunks]
+    print(
+        f"{name:>8} {seconds * 1000:>10.1f} {len(chunks):>8} "
+        f"{max(tokens):>6} {sum(tokens) / len(tokens):>8.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to chunk; synthetic text is used when omitted")
+    parser.add_argument("--corpus", default="README.md", help="source paragraphs for the synthetic text")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--target", type=int, default=128, help="target_chunk_size in tokens")
+    parser.add_argument("--overlap", type=int, default=25, help="chunk_overlap in tokens")
+    args = parser.parse_args()
+
+    text = load_text(args.pdf, args.corpus, args.pages)
+    chunker = DocumentChunker()
+    doc = {'text': text, 'metadata': {'doc_type': 'pdf', 'source': args.pdf or args.corpus}}
+    structural_chunks = chunker.structure_aware_splitter(doc)
+    print(f"{len(text):,} characters, {len(structural_chunks)} structural chunks, "
+          f"target {args.target} tokens, overlap {args.overlap}")
+
+    started = time.perf_counter()
+    legacy = legacy_refinement(structural_chunks, args.target, args.overlap)
+    legacy_seconds = time.perf_counter() - started
+
+    structural_chunks = chunker.structure_aware_splitter(doc)
+    started = time.perf_counter()
+    current = chunker.length_based_refinement(structural_chunks, args.target, args.overlap)
+    current_seconds = time.perf_counter() - started
+
+    print(f"{'path':>8} {'time (ms)':>10} {'chunks':>8} {'max':>6} {'mean':>8}")
+    summarize("legacy", legacy_seconds, legacy)
+    summarize("token", current_seconds, current)
+    print(f"speedup: {legacy_seconds / current_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Microbenchmark: vectorized MMR vs the previous pure-Python implementation.
+
+Run from the project root:
+    python -m benchmarks.bench_mmr
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.retrieval.mmr import maximal_marginal_relevance
+
+
+def legacy_mmr(query_vec: np.ndarray, doc_vecs: list, k: int, lambda_mult: float) -> list:
+    """The nested-loop MMR that RerankMMRRetriever._apply_mmr used before."""
+    selected: list[int] = []
+    remaining = list(range(len(doc_vecs)))
+
+    def cosine(a: np.ndarray, b: np.ndarray) -> float:
+        denom = (np.linalg.norm(a) * np.linalg.norm(b))
+        if denom == 0:
+            return 0.0
+        return float(np.dot(a, b) / denom)
+
+    while remaining and len(selected) < k:
+        if not selected:
+            chosen = max(remaining, key=lambda idx: cosine(query_vec, doc_vecs[idx]))
+        else:
+            chosen = max(
+                remaining,
+                key=lambda idx: lambda_mult * cosine(query_vec, doc_vecs[idx])
+                - (1 - lambda_mult)
+                * max(cosine(doc_vecs[idx], doc_vecs[sel_idx]) for sel_idx in selected),
+            )
+        selected.append(chosen)
+        remaining.remove(chosen)
+    return selected
+
+
+def best_of(repeats: int, fn) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'candidates':>10} {'k':>4} {'legacy (ms)':>12} {'vectorized (ms)':>16} {'speedup':>8} {'same':>5}")
+    for n in args.sizes:
+        query_vec = rng.standard_normal(args.dim).astype(np.float32)
+        doc_vecs = rng.standard_normal((n, args.dim)).astype(np.float32)
+        k = min(args.k, n)
+
+        legacy_selected = legacy_mmr(query_vec, list(doc_vecs), k, args.lambda_mult)
+        new_selected = maximal_marginal_relevance(query_vec, doc_vecs, k, args.lambda_mult)
+
+        # The legacy loop is slow at large n; one run is enough there
+        legacy_repeats = 1 if n >= 1000 else args.repeats
+        legacy_s = best_of(legacy_repeats, lambda: legacy_mmr(query_vec, list(doc_vecs), k, args.lambda_mult))
+        new_s = best_of(args.repeats, lambda: maximal_marginal_relevance(query_vec, doc_vecs, k, args.lambda_mult))
+        print(
+            f"{n:>10} {k:>4} {legacy_s * 1000:>12.2f} {new_s * 1000:>16.2f} "
+            f"{legacy_s / new_s:>7.1f}x {str(legacy_selected == new_selected):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+PDF page extraction: PyPDFLoader's serial lazy_load vs page ranges extracted by
+worker processes (DocumentLoader(pdf_page_workers=N)), and a check that both
+yield the same pages with the same metadata.
+
+The first parallel read pays for starting the page workers; the pool is then
+reused, so "parallel (cold)" is the cost for the first long PDF of a process
+and "parallel (warm)" the cost for every later one.
+
+--sweep reads the first 25, 50, 100, ... pages of the PDF (written to a
+temporary file) both ways and reports the page count from which the warm
+parallel path stays ahead: pipeline.pdf_parallel_min_pages should be at
+least that.
+
+Run from the project root:
+    python -m benchmarks.bench_pdf_pages --pdf data/manual.pdf
+    python -m benchmarks.bench_pdf_pages --pdf data/manual.pdf --workers 8 --pages-per-task 64
+    python -m benchmarks.bench_pdf_pages --pdf data/manual.pdf --sweep
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import List, Tuple
+
+from langchain_community.document_loaders import PyPDFLoader
+from pypdf import PdfReader, PdfWriter
+
+from src.ingestion.loaders import DocumentLoader
+from src.ingestion.pdf_pages import shutdown_page_pool
+
+
+def serial_read(path: str):
+    return PyPDFLoader(path).lazy_load()
+
+
+def timed_read(read, path: str) -> Tuple[float, List]:
+    started = time.perf_counter()
+    pages = list(read(path))
+    return time.perf_counter() - started, pages
+
+
+def first_pages(path: str, count: int, directory: str) -> str:
+    """Copy of the first `count` pages of a PDF."""
+    reader = PdfReader(path)
+    writer = PdfWriter()
+    for page in reader.pages[:count]:
+        writer.add_page(page)
+    out_path = os.path.join(directory, f"first_{count}.pdf")
+    with open(out_path, "wb") as f:
+        writer.write(f)
+    return out_path
+
+
+def compare(path: str, loader: DocumentLoader) -> None:
+    serial_seconds, serial = timed_read(serial_read, path)
+    cold_seconds, parallel = timed_read(loader.lazy_load_document, path)
+    warm_seconds, _ = timed_read(loader.lazy_load_document, path)
+
+    identical = [(page.page_content, page.metadata) for page in serial] == [
+        (page.page_content, page.metadata) for page in parallel
+    ]
+    print(f"{len(serial)} pages, {loader.pdf_page_workers} workers, {loader.pdf_pages_per_task} pages per task")
+    print(f"{'path':>16} {'time (s)':>10} {'pages/s':>10}")
+    timings = (("serial", serial_seconds), ("parallel (cold)", cold_seconds), ("parallel (warm)", warm_seconds))
+    for name, seconds in timings:
+        print(f"{name:>16} {seconds:>10.2f} {len(serial) / seconds:>10.1f}")
+    print(f"warm speedup: {serial_seconds / warm_seconds:.1f}x, identical output: {identical}")
+
+
+def sweep(path: str, loader: DocumentLoader) -> None:
+    num_pages = len(PdfReader(path).pages)
+    counts, count = [], 25
+    while count < num_pages:
+        counts.append(count)
+        count *= 2
+    counts.append(num_pages)
+
+    # Start the pool outside the measurements: the sweep compares per-document costs
+    timed_read(loader.lazy_load_document, path)
+    break_even = None
+    print(f"{loader.pdf_page_workers} workers, {loader.pdf_pages_per_task} pages per task")
+    print(f"{'pages':>8} {'serial (s)':>11} {'parallel (s)':>13} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            sample = first_pages(path, count, directory)
+            serial_seconds, _ = timed_read(serial_read, sample)
+            parallel_seconds, _ = timed_read(loader.lazy_load_document, sample)
+            speedup = serial_seconds / parallel_seconds
+            # The smallest size from which the parallel path stays ahead, so one noisy win does not count
+            if speedup <= 1:
+                break_even = None
+            elif break_even is None:
+                break_even = count
+            print(f"{count:>8} {serial_seconds:>11.3f} {parallel_seconds:>13.3f} {speedup:>7.1f}x")
+    if break_even is None:
+        print("the parallel path never broke even on this PDF")
+    else:
+        print(f"break-even: parallel extraction wins from about {break_even} pages")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages-per-task", type=int, default=32)
+    parser.add_argument(
+        "--sweep", action="store_true", help="time growing prefixes of the PDF to find the break-even point"
+    )
+    args = parser.parse_args()
+
+    # min_pages=0: measure the parallel path even where the pipeline would stay serial
+    loader = DocumentLoader(
+        pdf_page_workers=args.workers, pdf_pages_per_task=args.pages_per_task, pdf_parallel_min_pages=0
+    )
+    try:
+        if args.sweep:
+            sweep(args.pdf, loader)
+        else:
+            compare(args.pdf, loader)
+    finally:
+        shutdown_page_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Latency and score-ordering parity of the ONNX int8 reranker backend vs torch.
+
+Queries are taken from the corpus paragraphs themselves (their first words), and
+every query is scored against the same number of candidate paragraphs by both
+backends. Exits with status 1 when the orderings disagree beyond the thresholds,
+so it doubles as a parity check after changing the export or quantization.
+
+Run from the project root:
+    python -m benchmarks.bench_reranker
+    python -m benchmarks.bench_reranker --corpus data/faq.txt --candidates 50
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from src.retrieval.onnx_reranker import OnnxCrossEncoder
+from src.utils.main_utils import read_yaml_file
+
+
+def load_paragraphs(path: str, min_words: int = 8) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        paragraphs = [" ".join(block.split()) for block in f.read().split("\n\n")]
+    return [paragraph for paragraph in paragraphs if len(paragraph.split()) >= min_words]
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    rank_a = np.argsort(np.argsort(a))
+    rank_b = np.argsort(np.argsort(b))
+    if rank_a.std() == 0 or rank_b.std() == 0:
+        return 1.0
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def top_k_overlap(a: np.ndarray, b: np.ndarray, k: int) -> float:
+    k = min(k, len(a))
+    return len(set(np.argsort(-a)[:k]) & set(np.argsort(-b)[:k])) / k
+
+
+def timed_scores(model, workload: list[list[tuple[str, str]]]) -> tuple[list[np.ndarray], float]:
+    """Score every query's candidate list (one predict call per query) and return ms/query."""
+    model.predict(workload[0])  # warm-up
+    started = time.perf_counter()
+    scores = [np.asarray(model.predict(pairs), dtype=np.float32) for pairs in workload]
+    return scores, (time.perf_counter() - started) * 1000 / len(workload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="README.md", help="text file; paragraphs are the candidates")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--candidates", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-spearman", type=float, default=0.9)
+    parser.add_argument("--min-overlap", type=float, default=0.8)
+    parser.add_argument("--config", default="configs/retrieval.yaml")
+    args = parser.parse_args()
+
+    config = (read_yaml_file(args.config) or {}).get("retrieval", {})
+    model_name = config.get("reranker_model", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    paragraphs = load_paragraphs(args.corpus)
+    if len(paragraphs) < 2:
+        sys.exit(f"{args.corpus} has too few paragraphs to benchmark with.")
+
+    rng = np.random.default_rng(0)
+    workload = []
+    for _ in range(args.queries):
+        query = " ".join(paragraphs[rng.integers(len(paragraphs))].split()[:8])
+        picks = rng.choice(len(paragraphs), size=args.candidates, replace=len(paragraphs) < args.candidates)
+        workload.append([(query, paragraphs[idx]) for idx in picks])
+
+    from sentence_transformers import CrossEncoder
+
+    torch_scores, torch_ms = timed_scores(CrossEncoder(model_name), workload)
+    onnx_options = {**(config.get("onnx") or {}), "quantize": True}
+    onnx_scores, onnx_ms = timed_scores(OnnxCrossEncoder(model_name, **onnx_options), workload)
+
+    spearmans = [spearman(a, b) for a, b in zip(torch_scores, onnx_scores)]
+    overlaps = [top_k_overlap(a, b, args.top_k) for a, b in zip(torch_scores, onnx_scores)]
+    max_diff = max(float(np.abs(a - b).max()) for a, b in zip(torch_scores, onnx_scores))
+
+    print(f"{model_name}: {len(workload)} queries x {args.candidates} candidates from {args.corpus}")
+    print(f"{'backend':<12} {'ms/query':>9} {'speedup':>8}")
+    print(f"{'torch':<12} {torch_ms:>9.2f} {1:>7.1f}x")
+    print(f"{'onnx int8':<12} {onnx_ms:>9.2f} {torch_ms / onnx_ms:>7.1f}x")
+    print(
+        f"parity: mean spearman {np.mean(spearmans):.3f} (min {min(spearmans):.3f}), "
+        f"mean top-{args.top_k} overlap {np.mean(overlaps):.3f}, max |score diff| {max_diff:.4f}"
+    )
+
+    if np.mean(spearmans) < args.min_spearman or np.mean(overlaps) < args.min_overlap:
+        print("FAIL: ONNX score ordering diverges from torch beyond the thresholds.")
+        sys.exit(1)
+    print("OK: score ordering matches within the thresholds.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,18 @@
 import os
-import shutil
-import tempfile
 from enum import Enum
-from hashlib import md5
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+from src.embedding.cache import query_cache_stats
+from src.ingestion.blob_store import BlobStore
+from src.ingestion.web_fetcher import is_url
 from src.logger import logging
 from src.rag.pipelines import RAGPipeline
+from src.utils.main_utils import documents_fingerprint
 
 
 app = FastAPI(title="RAG Service", version="1.0.0")
@@ -41,6 +43,7 @@ class Source(BaseModel):
 class QueryResponse(BaseModel):
     answer: str
     sources: List[Source]
+    cache_hit: bool = False
 
 
 class ProcessingStatus(str, Enum):
@@ -59,7 +62,9 @@ class PipelineState:
     def __init__(self) -> None:
         self.pipeline = RAGPipeline(config_dir="configs")
         self.current_fingerprint: Optional[str] = None
-        self.tmp_dir = tempfile.mkdtemp(prefix="rag_uploads_")
+        self.blob_store = BlobStore(
+            self.pipeline.config.get("pipeline", {}).get("uploads_dir") or "artifacts/uploads"
+        )
         self.status = ProcessingStatus.IDLE
         self.error_message: Optional[str] = None
         self.loaded_documents: List[Dict[str, str]] = []
@@ -70,58 +75,62 @@ class PipelineState:
         Create a fingerprint based on file content hash, not paths.
         This ensures same content = same fingerprint even if temp paths differ.
         """
-        import hashlib
-        
-        key_parts = []
-        for doc in sorted(docs, key=lambda x: x.get('path', '')):
-            path = doc.get('path', '')
-            enabled = doc.get('enabled', True)
-            
-            # For file paths, hash the file content
-            if os.path.exists(path) and os.path.isfile(path):
-                try:
-                    with open(path, 'rb') as f:
-                        file_hash = hashlib.md5(f.read()).hexdigest()
-                    key_parts.append(f"{file_hash}|{enabled}")
-                except Exception as e:
-                    logging.warning(f"Could not hash file {path}: {e}, using path instead")
-                    key_parts.append(f"{path}|{enabled}")
-            else:
-                # For URLs or non-existent files, use path
-                key_parts.append(f"{path}|{enabled}")
-        
-        joined = "|".join(key_parts)
-        return md5(joined.encode("utf-8")).hexdigest()
+        return documents_fingerprint(docs)
+
+    async def _persist_uploads_async(self, uploads: List[UploadFile]) -> List[Tuple[str, str]]:
+        """
+        Stream uploaded files into the blob store, hashing them during the write.
 
-    async def _persist_uploads_async(self, uploads: List[UploadFile]) -> List[str]:
-        """Save uploaded files asynchronously."""
-        saved_paths: List[str] = []
+        Returns (path, content hash) per upload. The blobs stay pinned until
+        `_release_uploads` is called for them.
+        """
+        saved: List[Tuple[str, str]] = []
         for upload in uploads:
             suffix = os.path.splitext(upload.filename)[-1]
-            fd, path = tempfile.mkstemp(dir=self.tmp_dir, suffix=suffix)
             try:
-                content = await upload.read()
-                with os.fdopen(fd, "wb") as f:
-                    f.write(content)
-                saved_paths.append(path)
+                # Copies the spooled upload block by block, off the event loop
+                path, content_hash = await run_in_threadpool(self.blob_store.put_stream, upload.file, suffix)
+                saved.append((path, content_hash))
                 logging.info("Saved upload %s to %s", upload.filename, path)
             except Exception as e:
-                os.close(fd)
-                os.remove(path)
+                self._release_uploads([{"path": path} for path, _ in saved])
                 raise Exception(f"Failed to save {upload.filename}: {e}") from e
-        return saved_paths
+        return saved
 
-    def _prepare_docs_list(self, file_paths: List[str], url: Optional[str]) -> List[dict]:
-        """Prepare the documents list from file paths and URL."""
+    def _prepare_docs_list(
+        self, uploads: List[Tuple[str, str]], urls: List[str], sitemaps: List[str]
+    ) -> List[dict]:
+        """Prepare the documents list from stored uploads, URLs and sitemaps."""
         docs: List[dict] = []
-        if file_paths:
-            for p in file_paths:
-                docs.append({"path": p, "enabled": True})
-        if url:
+        for path, content_hash in uploads:
+            docs.append({"path": path, "enabled": True, "content_hash": content_hash})
+        for url in dict.fromkeys(urls):
             docs.append({"path": url, "enabled": True})
+        for sitemap in dict.fromkeys(sitemaps):
+            docs.append({"path": sitemap, "enabled": True, "sitemap": True})
         return docs
 
-    def _process_documents(self, docs: List[dict]) -> None:
+    def _is_indexed(self, docs: List[dict]) -> bool:
+        """
+        Whether `docs` is the document set already indexed. Web pages may have
+        changed since, so sets with URLs always go to the pipeline, which
+        revalidates them and re-embeds only the pages that changed.
+        """
+        return (
+            self.pipeline.vector_store is not None
+            and not any(is_url(doc.get("path", "")) for doc in docs)
+            and self._fingerprint(docs) == self.current_fingerprint
+        )
+
+    def _release_uploads(self, docs: List[dict]) -> None:
+        """Unpin the uploads of `docs` and delete blobs the indexed documents no longer use."""
+        self.blob_store.release(doc.get("path", "") for doc in docs)
+        try:
+            self.blob_store.collect(doc.get("path", "") for doc in self.documents_config)
+        except Exception as e:
+            logging.warning("Upload garbage collection failed: %s", e)
+
+    def _process_documents(self, docs: List[dict], release_uploads: bool = True) -> None:
         """Process documents and build vector store (runs in background)."""
         try:
             self.status = ProcessingStatus.PROCESSING
@@ -132,21 +141,19 @@ class PipelineState:
             new_fp = self._fingerprint(docs)
             logging.info("Document fingerprint: %s (current: %s)", new_fp, self.current_fingerprint)
             
-            if self.pipeline.vector_store is not None and new_fp == self.current_fingerprint:
+            if self._is_indexed(docs):
                 logging.info("Reusing existing vector store for unchanged documents.")
                 self.status = ProcessingStatus.READY
                 return
 
-            # Clear old vector store and retriever to prevent context leakage
-            logging.info("Clearing old vector store and creating new one...")
-            self.pipeline.vector_store = None
-            self.pipeline.retriever = None
-
-            # Override documents config dynamically
+            # Override documents config dynamically; the pipeline drops documents that are
+            # no longer listed (so no context leaks) and only embeds the new ones
             self.pipeline.config["documents"] = docs
             self.documents_config = docs
             self.pipeline.prepare_vector_store()
-            self.current_fingerprint = new_fp
+            failed = self.pipeline.ingestion_errors
+            # With failed documents, loading the same set again retries them
+            self.current_fingerprint = None if failed else new_fp
             self.status = ProcessingStatus.READY
             
             # Update loaded documents list for status endpoint
@@ -156,6 +163,7 @@ class PipelineState:
                     "path": doc.get("path", "unknown")
                 }
                 for doc in docs
+                if doc.get("path") not in failed
             ]
             
             logging.info("Vector store prepared successfully for %d document(s).", len(docs))
@@ -163,11 +171,19 @@ class PipelineState:
             self.status = ProcessingStatus.ERROR
             self.error_message = str(e)
             logging.exception("Failed to process documents: %s", e)
+        finally:
+            # release_uploads=False re-indexes documents whose uploads are no longer pinned
+            self._release_uploads(docs if release_uploads else [])
 
 
 state = PipelineState()
 
 
+@app.on_event("shutdown")
+def shutdown() -> None:
+    state.pipeline.reranker.close()
+
+
 @app.get("/health")
 def health() -> dict:
     return {"status": "ok"}
@@ -178,20 +194,33 @@ async def load_documents(
     background_tasks: BackgroundTasks,
     files: Optional[List[UploadFile]] = File(None),
     url: Optional[str] = Form(None),
+    urls: Optional[List[str]] = Form(None),
+    sitemap: Optional[str] = Form(None),
 ) -> dict:
+    """
+    Index uploaded files and web pages: `url` and any number of `urls` fields,
+    plus every page listed in a `sitemap`.
+    """
     try:
         # Save uploaded files immediately (before background processing)
-        file_paths = []
+        uploads = []
         if files:
-            file_paths = await state._persist_uploads_async(files)
+            uploads = await state._persist_uploads_async(files)
         
-        docs = state._prepare_docs_list(file_paths, url)
+        web_urls = [u.strip() for u in [url or "", *(urls or [])] if u and u.strip()]
+        sitemaps = [sitemap.strip()] if sitemap and sitemap.strip() else []
+        invalid = [u for u in web_urls + sitemaps if not is_url(u)]
+        if invalid:
+            state._release_uploads([{"path": path} for path, _ in uploads])
+            raise HTTPException(status_code=400, detail=f"Not an http(s) URL: {', '.join(invalid)}")
+
+        docs = state._prepare_docs_list(uploads, web_urls, sitemaps)
         if not docs:
-            raise HTTPException(status_code=400, detail="Provide at least one file or URL.")
+            raise HTTPException(status_code=400, detail="Provide at least one file, URL or sitemap.")
 
         # Check if we can reuse existing vector store
-        new_fp = state._fingerprint(docs)
-        if state.pipeline.vector_store is not None and new_fp == state.current_fingerprint:
+        if state._is_indexed(docs):
+            state._release_uploads(docs)
             return {
                 "status": "ready",
                 "message": "Documents already indexed. Ready for queries.",
@@ -217,12 +246,27 @@ def get_status() -> dict:
         "status": state.status.value,
         "loaded_documents": state.loaded_documents,
     }
+    if state.pipeline.ingestion_errors:
+        status_info["failed_documents"] = [
+            {"name": os.path.basename(path), "path": path, "error": error}
+            for path, error in state.pipeline.ingestion_errors.items()
+        ]
     if state.status == ProcessingStatus.ERROR:
         status_info["error"] = state.error_message
     elif state.status == ProcessingStatus.READY:
         status_info["message"] = "Ready for queries."
     elif state.status == ProcessingStatus.PROCESSING:
         status_info["message"] = "Processing documents..."
+    rerank_cache = state.pipeline.reranker.cache_stats()
+    if rerank_cache is not None:
+        status_info["rerank_cache"] = rerank_cache
+    query_embedding_cache = query_cache_stats()
+    if query_embedding_cache:
+        status_info["query_embedding_cache"] = query_embedding_cache
+    if state.pipeline.answer_cache is not None:
+        status_info["answer_cache"] = state.pipeline.answer_cache.stats()
+    if state.pipeline.cascade_paths:
+        status_info["cascade_paths"] = dict(state.pipeline.cascade_paths)
     return status_info
 
 
@@ -264,7 +308,8 @@ def query(payload: QueryRequest) -> QueryResponse:
         
         return QueryResponse(
             answer=result.get("answer", ""),
-            sources=sources
+            sources=sources,
+            cache_hit=result.get("cache_hit", False),
         )
     except HTTPException:
         raise
@@ -277,13 +322,21 @@ def query(payload: QueryRequest) -> QueryResponse:
 def cleanup() -> dict:
     """Clear the indexed context."""
     try:
-        state.pipeline.vector_store = None
         state.pipeline.retriever = None
+        if state.pipeline.vector_store is not None:
+            # Deletes the store's exact vector file; no retriever reads it any more
+            state.pipeline.faiss_store.release(state.pipeline.vector_store)
+        state.pipeline.vector_store = None
+        if state.pipeline.reranker.cache is not None:
+            state.pipeline.reranker.cache.set_fingerprint(None)
+        if state.pipeline.answer_cache is not None:
+            state.pipeline.answer_cache.set_fingerprint(None)
         state.current_fingerprint = None
         state.documents_config = []
         state.loaded_documents = []
         state.status = ProcessingStatus.IDLE
         state.error_message = None
+        state._release_uploads([])
         
         logging.info("Pipeline cleaned up successfully")
         return {"message": "All indexed documents and context have been cleared."}
@@ -298,7 +351,7 @@ class CleanupSelectedRequest(BaseModel):
 
 @app.post("/cleanup_selected")
 def cleanup_selected(req: CleanupSelectedRequest) -> dict:
-    """Remove selected indexed sources and rebuild the vector store."""
+    """Remove selected indexed sources from the vector store."""
     try:
         if not state.documents_config:
             raise HTTPException(status_code=400, detail="No documents indexed to clear.")
@@ -318,14 +371,11 @@ def cleanup_selected(req: CleanupSelectedRequest) -> dict:
                 **cleanup_resp,
             }
 
-        state.pipeline.vector_store = None
-        state.pipeline.retriever = None
-        state.current_fingerprint = None
-
-        state._process_documents(remaining_docs)
+        # Only the removed documents' vectors are deleted; the rest stay indexed
+        state._process_documents(remaining_docs, release_uploads=False)
 
         return {
-            "message": "Selected sources cleared and context rebuilt.",
+            "message": "Selected sources cleared and context updated.",
             "status": state.status,
             "loaded_documents": state.loaded_documents,
         }
@@ -0,0 +1,236 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+from src.exception import MyException
+from src.logger import logging
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+# Hits on entries used within this many seconds do not rewrite their last_access
+_TOUCH_INTERVAL = 600.0
+
+# Process-wide query embedding caches, one per model name
+_query_caches: Dict[str, "QueryEmbeddingCache"] = {}
+_query_caches_lock = threading.Lock()
+
+
+def text_hash(text: str) -> str:
+    """Content hash used as the cache key for a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, size-bounded embedding store keyed by (model name, text hash).
+
+    Vectors are stored as float32 blobs in a single SQLite table. When the table
+    grows beyond `max_entries`, the least recently used rows are evicted. A hit
+    only rewrites last_access when the stored one is older than `touch_interval`
+    seconds, so repeated lookups are read-only and LRU order is kept to that
+    granularity.
+    """
+
+    def __init__(self, path: str, max_entries: int | None = 200_000, touch_interval: float = _TOUCH_INTERVAL):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.path = path
+            self.max_entries = max_entries
+            self.touch_interval = touch_interval
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (model, key)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+            )
+            self._conn.commit()
+            logging.info("Embedding cache opened at %s", path)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def get_many(self, model: str, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for `keys`, marking stale ones as recently used."""
+        found: Dict[str, List[float]] = {}
+        if not keys:
+            return found
+        now = time.time()
+        stale: List[str] = []
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = list(keys[start:start + _SQL_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, last_access FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for key, blob, last_access in rows:
+                    found[key] = array("f", blob).tolist()
+                    if now - last_access >= self.touch_interval:
+                        stale.append(key)
+            if stale:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND key = ?",
+                    [(now, model, key) for key in stale],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        """Store vectors and evict the least recently used rows above max_entries."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, vector, last_access) VALUES (?, ?, ?, ?)",
+                [(model, key, array("f", vec).tobytes(), now) for key, vec in items.items()],
+            )
+            if self.max_entries:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+                        (overflow,),
+                    )
+                    logging.info("Evicted %d entries from the embedding cache", overflow)
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that only forwards cache misses to the underlying model.
+
+    Duplicate texts within one call are embedded once as well. Queries are not
+    persisted: they rarely repeat across restarts, and repeats within a process
+    are served by the in-memory QueryEmbeddingCache wrapped around this one.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model_name, list(dict.fromkeys(keys)))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        logging.info(
+            "Embedding cache: %d of %d texts cached, embedding %d",
+            sum(1 for key in keys if key in vectors),
+            len(texts),
+            len(missing),
+        )
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), new_vectors))
+            self.cache.put_many(self.model_name, fresh)
+            vectors.update(fresh)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class QueryEmbeddingCache:
+    """Thread-safe in-memory LRU of query vectors keyed by the exact query text."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> List[float] | None:
+        with self._lock:
+            vector = self._entries.get(text)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return list(vector)
+
+    def put(self, text: str, vector: List[float]) -> None:
+        with self._lock:
+            self._entries[text] = list(vector)
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def shared_query_cache(model_name: str, max_entries: int = 10_000) -> QueryEmbeddingCache:
+    """The process-wide query embedding cache for a model, created on first use."""
+    with _query_caches_lock:
+        cache = _query_caches.get(model_name)
+        if cache is None:
+            cache = _query_caches[model_name] = QueryEmbeddingCache(max_entries)
+        return cache
+
+
+def query_cache_stats() -> Dict[str, dict]:
+    """Hit/miss counters of every process-wide query embedding cache, by model name."""
+    with _query_caches_lock:
+        caches = dict(_query_caches)
+    return {model_name: cache.stats() for model_name, cache in caches.items()}
+
+
+class QueryCachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that answers repeated queries from a QueryEmbeddingCache,
+    saving the round trip to the embedding server. Documents pass straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: QueryEmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(text, vector)
+        return vector
@@ -1,26 +1,147 @@
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence
+
+from langchain_core.embeddings import Embeddings
 from langchain_ollama.embeddings import OllamaEmbeddings
+from src.embedding.cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    QueryCachedEmbeddings,
+    shared_query_cache,
+)
 from src.logger import logging
 from src.exception import MyException
 
 
+class EmbeddingExecutor(Embeddings):
+    """
+    Splits texts into fixed-size batches and embeds them concurrently.
+
+    Batches are spread round-robin over one client per Ollama endpoint with at
+    most `max_concurrency` requests in flight. A failed batch is retried on the
+    next endpoint with exponential backoff; output order always matches input order.
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[Embeddings],
+        batch_size: int = 64,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+    ):
+        if not clients:
+            raise ValueError("EmbeddingExecutor needs at least one embedding client.")
+        self.clients = list(clients)
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+
+    def _with_retries(self, slot: int, call):
+        """Run `call(client)`, moving to the next endpoint after each failure."""
+        for attempt in range(self.max_retries + 1):
+            client = self.clients[(slot + attempt) % len(self.clients)]
+            try:
+                return call(client)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                logging.warning(
+                    "Embedding request failed (attempt %d/%d): %s. Retrying in %.1fs",
+                    attempt + 1,
+                    self.max_retries + 1,
+                    e,
+                    delay,
+                )
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = [
+            texts[start:start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        started = time.perf_counter()
+        workers = min(self.max_concurrency, len(batches))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+            results = pool.map(
+                lambda item: self._with_retries(
+                    item[0], lambda client: client.embed_documents(item[1])
+                ),
+                enumerate(batches),
+            )
+            vectors = [vector for batch_vectors in results for vector in batch_vectors]
+
+        elapsed = time.perf_counter() - started
+        logging.info(
+            "Embedded %d chunks in %d batches over %d endpoint(s) in %.2fs (%.1f chunks/s)",
+            len(texts),
+            len(batches),
+            len(self.clients),
+            elapsed,
+            len(texts) / elapsed if elapsed > 0 else float("inf"),
+        )
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._with_retries(0, lambda client: client.embed_query(text))
+
+
 class OllamaEmbedder:
     """
     Thin wrapper around LangChain's OllamaEmbeddings to delay initialization
     until it is actually needed.
     """
 
-    def __init__(self, model_name: str = "embeddinggemma"):
+    def __init__(self, model_name: str = "embeddinggemma", config: dict | None = None):
         # Model name should eventually come from configuration/constants.
         self.model_name = model_name
+        self.config = config or {}
         self._embedder = None
 
-    def get_embedder(self) -> OllamaEmbeddings:
-        """Create (once) and return the Ollama embedding model."""
+    def get_embedder(self) -> Embeddings:
+        """
+        Create (once) and return the Ollama embedding model: a batched, concurrent
+        executor over the configured endpoints, wrapped in a persistent embedding
+        cache when one is enabled in the configuration, and in the process-wide
+        query embedding cache.
+        """
         if self._embedder is None:
             try:
                 logging.info("Initializing the Ollama embedder.")
-                self._embedder = OllamaEmbeddings(model=self.model_name)
+                base_urls = self.config.get("base_urls") or [None]
+                clients = [
+                    OllamaEmbeddings(model=self.model_name, base_url=url)
+                    if url else OllamaEmbeddings(model=self.model_name)
+                    for url in base_urls
+                ]
+                self._embedder = EmbeddingExecutor(
+                    clients,
+                    batch_size=self.config.get("batch_size", 64),
+                    max_concurrency=self.config.get("max_concurrency", 4),
+                    max_retries=self.config.get("max_retries", 3),
+                    retry_backoff=self.config.get("retry_backoff", 1.0),
+                )
+
+                cache_cfg = self.config.get("cache") or {}
+                if cache_cfg.get("enabled") and cache_cfg.get("path"):
+                    cache = EmbeddingCache(
+                        cache_cfg["path"],
+                        max_entries=cache_cfg.get("max_entries"),
+                        touch_interval=cache_cfg.get("touch_interval_seconds", 600),
+                    )
+                    self._embedder = CachedEmbeddings(self._embedder, cache, self.model_name)
+
+                query_cache_size = self.config.get("query_cache_size", 10_000)
+                if query_cache_size:
+                    self._embedder = QueryCachedEmbeddings(
+                        self._embedder, shared_query_cache(self.model_name, query_cache_size)
+                    )
             except Exception as e:
                 raise MyException(e, sys)
-        return self._embedder
\ No newline at end of file
+        return self._embedder
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import Counter
+from typing import BinaryIO, Iterable, List, Tuple
+
+from src.exception import MyException
+from src.logger import logging
+
+# Directory under the store root for uploads still being written
+_INCOMING_DIR = "incoming"
+
+
+class BlobStore:
+    """
+    Content-addressed store for uploaded documents.
+
+    Each file is stored once under its content hash, as
+    `<root>/<first two hex digits>/<md5><extension>`. The extension is kept
+    because loaders are picked by it. Uploads are copied in blocks and hashed
+    during the write, so neither the whole file nor a second read is needed.
+
+    Saved blobs stay pinned until `release()`d, so `collect()` never deletes an
+    upload that is still waiting to be indexed.
+    """
+
+    def __init__(self, root: str, block_size: int = 1024 * 1024):
+        try:
+            self.root = os.path.abspath(root)
+            self.block_size = block_size
+            self._pinned: Counter = Counter()
+            self._lock = threading.Lock()
+            incoming = os.path.join(self.root, _INCOMING_DIR)
+            # Partial writes of a previous run
+            shutil.rmtree(incoming, ignore_errors=True)
+            os.makedirs(incoming, exist_ok=True)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def blob_path(self, content_hash: str, extension: str = "") -> str:
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}{extension.lower()}")
+
+    def put_stream(self, stream: BinaryIO, extension: str = "") -> Tuple[str, str]:
+        """
+        Store the rest of `stream` and pin it.
+
+        Returns:
+            (path of the blob, md5 hex digest of its content)
+        """
+        try:
+            digest = hashlib.md5()
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, _INCOMING_DIR))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for block in iter(lambda: stream.read(self.block_size), b""):
+                        digest.update(block)
+                        f.write(block)
+                content_hash = digest.hexdigest()
+                path = self.blob_path(content_hash, extension)
+                with self._lock:
+                    if os.path.exists(path):
+                        os.remove(tmp_path)
+                        logging.info("Upload already stored as %s", path)
+                    else:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        os.replace(tmp_path, path)
+                    self._pinned[path] += 1
+                return path, content_hash
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def release(self, paths: Iterable[str]) -> None:
+        """Unpin blobs saved by put_stream() once their indexing has finished."""
+        with self._lock:
+            for path in paths:
+                if self._pinned[path] > 1:
+                    self._pinned[path] -= 1
+                else:
+                    self._pinned.pop(path, None)
+
+    def collect(self, referenced: Iterable[str]) -> int:
+        """
+        Delete blobs that are neither in `referenced` (paths of indexed documents)
+        nor pinned.
+
+        Returns:
+            Number of blobs deleted.
+        """
+        try:
+            keep = {os.path.abspath(path) for path in referenced}
+            removed: List[str] = []
+            freed = 0
+            with self._lock:
+                keep.update(self._pinned)
+                for entry in os.scandir(self.root):
+                    if not entry.is_dir() or entry.name == _INCOMING_DIR:
+                        continue
+                    for blob in os.scandir(entry.path):
+                        if blob.is_file() and blob.path not in keep:
+                            freed += blob.stat().st_size
+                            os.remove(blob.path)
+                            removed.append(blob.path)
+                    if not os.listdir(entry.path):
+                        os.rmdir(entry.path)
+            if removed:
+                logging.info("Removed %d unreferenced upload(s), %.1f MB", len(removed), freed / 1e6)
+            return len(removed)
+        except Exception as e:
+            raise MyException(e, sys)
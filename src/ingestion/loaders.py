@@ -1,12 +1,44 @@
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader, WebBaseLoader, UnstructuredMarkdownLoader
+from src.ingestion.pdf_pages import DEFAULT_MIN_PAGES, iter_pdf_pages
+from src.ingestion.web_fetcher import CachedPageLoader, WebCache, is_url
 from src.logger import logging
 from src.exception import MyException
 import sys
 
 class DocumentLoader:
-    def __init__(self):
-        pass
+    def __init__(self, pdf_page_workers=0, pdf_pages_per_task=32, web_cache_dir=None, pdf_parallel_min_pages=DEFAULT_MIN_PAGES):
+        """
+        Args:
+            pdf_page_workers (int): Worker processes extracting the pages of a local PDF
+                concurrently in lazy_load_document(); 0 or 1 reads them serially.
+            pdf_pages_per_task (int): Pages each worker extracts at a time.
+            pdf_parallel_min_pages (int): PDFs with fewer pages are read serially.
+            web_cache_dir (str): WebCache directory; URLs fetched into it (see WebFetcher)
+                are parsed from the cache instead of being downloaded again.
+        """
+        self.pdf_page_workers = pdf_page_workers
+        self.pdf_pages_per_task = pdf_pages_per_task
+        self.web_cache_dir = web_cache_dir
+        self.pdf_parallel_min_pages = pdf_parallel_min_pages
     
+    def _get_loader(self, document_path):
+        """Returns the Langchain loader for a path or URL."""
+        if is_url(document_path):
+            if self.web_cache_dir:
+                cache = WebCache(self.web_cache_dir)
+                if cache.get(document_path) is not None:
+                    return CachedPageLoader(cache, document_path)
+            return WebBaseLoader(document_path)
+        elif document_path.endswith('.pdf'):
+            return PyPDFLoader(document_path)
+        elif document_path.endswith(('.docx', '.doc')):
+            return Docx2txtLoader(document_path)
+        elif document_path.endswith('.txt'):
+            return TextLoader(document_path)
+        elif document_path.endswith('.md'):
+            return UnstructuredMarkdownLoader(document_path)
+        raise MyException(f"Unsupported document type: {document_path}. Please provide a PDF, DOCX, TXT file, .MD file or a URL.", sys)
+
     def load_document(self, document_path):
         """
         Loads a document from a given path or URL using the appropriate Langchain loader.
@@ -19,23 +51,36 @@ class DocumentLoader:
         """
         logging.info(f"Attempting to load document from: {document_path}")
         try:
-            if document_path.startswith(('http://', 'https://')):
-                loader = WebBaseLoader(document_path)
-            elif document_path.endswith('.pdf'):
-                loader = PyPDFLoader(document_path)
-            elif document_path.endswith(('.docx', '.doc')):
-                loader = Docx2txtLoader(document_path)
-            elif document_path.endswith('.txt'):
-                loader = TextLoader(document_path)
-            elif document_path.endswith('.md'):
-                loader = UnstructuredMarkdownLoader(document_path)
-            else:
-                raise MyException(f"Unsupported document type: {document_path}. Please provide a PDF, DOCX, TXT file, .MD file or a URL.", sys)
-
-            document = loader.load()
+            document = self._get_loader(document_path).load()
             logging.info(f"Successfully loaded {len(document)} pages/parts from {document_path}")
             return document
         except Exception as e:
             logging.info(f"Error loading document {document_path}: {e}")
             raise MyException(f"Could not load document {document_path}. Error: {e}", sys)
 
+    def lazy_load_document(self, document_path):
+        """
+        Yields the pages/parts of a document one at a time instead of loading them all.
+        Pages of a local PDF of at least pdf_parallel_min_pages pages are extracted by
+        pdf_page_workers processes when set, and
+        still yielded in order with the same metadata as PyPDFLoader.
+        Args:
+            document_path (str): The path to the document file or a URL.
+        Yields:
+            Document: the next loaded page/part.
+        """
+        logging.info(f"Lazily loading document from: {document_path}")
+        try:
+            count = 0
+            if self.pdf_page_workers > 1 and document_path.endswith('.pdf') and not is_url(document_path):
+                pages = iter_pdf_pages(
+                    document_path, self.pdf_page_workers, self.pdf_pages_per_task, self.pdf_parallel_min_pages
+                )
+            else:
+                pages = self._get_loader(document_path).lazy_load()
+            for count, page in enumerate(pages, 1):
+                yield page
+            logging.info(f"Successfully loaded {count} pages/parts from {document_path}")
+        except Exception as e:
+            logging.info(f"Error loading document {document_path}: {e}")
+            raise MyException(f"Could not load document {document_path}. Error: {e}", sys)
@@ -0,0 +1,237 @@
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from src.exception import MyException
+from src.ingestion.extractor import DocumentExtractor
+from src.ingestion.loaders import DocumentLoader
+from src.ingestion.pdf_pages import DEFAULT_MIN_PAGES
+from src.logger import logging
+from src.preprocessing.chunking import DocumentChunker
+from src.preprocessing.clean_normalize import DocumentNormalizationAndCleaning
+
+# Streamed per document, in order: (position, chunks, None) for each batch of chunks,
+# then (position, None, None) when the document is done or (position, None, error message)
+DocumentBatch = Tuple[int, Optional[List[dict]], Optional[str]]
+
+# How long a consumer waits on a queue before checking that its producer is still alive
+_POLL_SECONDS = 1.0
+
+
+def iter_document_chunks(
+    path: str, target_chunk_size: int, chunk_overlap: int, loader: DocumentLoader | None = None
+) -> Iterator[dict]:
+    """
+    Lazily run load -> extract -> clean -> chunk for one document: each page flows
+    through every stage before the next page is read.
+    """
+    pages = (loader or DocumentLoader()).lazy_load_document(path)
+    extracted = DocumentExtractor().iter_document_info(pages, path)
+    cleaned = DocumentNormalizationAndCleaning().iter_document_normalizer(extracted)
+    return DocumentChunker().iter_chunks(cleaned, target_chunk_size, chunk_overlap)
+
+
+def _produce(
+    position: int,
+    path: str,
+    target_chunk_size: int,
+    chunk_overlap: int,
+    batch_size: int,
+    out_queue,
+    loader: DocumentLoader | None = None,
+) -> None:
+    """
+    Put the chunks of one document on `out_queue` in batches of `batch_size`,
+    followed by an end marker. Errors are sent as text rather than raised:
+    MyException does not survive pickling back from a worker process, and one
+    bad document must not abort the others.
+    """
+    try:
+        batch: List[dict] = []
+        for chunk in iter_document_chunks(path, target_chunk_size, chunk_overlap, loader):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                out_queue.put((position, batch, None))
+                batch = []
+        if batch:
+            out_queue.put((position, batch, None))
+        out_queue.put((position, None, None))
+    except Exception as e:
+        out_queue.put((position, None, str(e) or type(e).__name__))
+
+
+class _ClosableQueue(queue.Queue):
+    """Bounded queue whose blocked producer gives up once the consumer closes it."""
+
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize)
+        self.closed = False
+
+    def put(self, item, block=True, timeout=None) -> None:
+        while not self.closed:
+            try:
+                super().put(item, timeout=_POLL_SECONDS)
+                return
+            except queue.Full:
+                pass
+        raise RuntimeError("The consumer stopped reading document batches.")
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _produce_all(
+    paths: Sequence[str],
+    target_chunk_size: int,
+    chunk_overlap: int,
+    batch_size: int,
+    out_queue: _ClosableQueue,
+    loader: DocumentLoader,
+) -> None:
+    try:
+        for position, path in enumerate(paths):
+            _produce(position, path, target_chunk_size, chunk_overlap, batch_size, out_queue, loader)
+    except RuntimeError:
+        if not out_queue.closed:
+            raise
+
+
+def _get(in_queue, producer_alive) -> DocumentBatch | None:
+    """Next message from `in_queue`, or None once the producer has died without sending one."""
+    while True:
+        try:
+            return in_queue.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            if not producer_alive():
+                return None
+
+
+def stream_documents(
+    paths: Sequence[str],
+    target_chunk_size: int,
+    chunk_overlap: int,
+    workers: int | None = None,
+    batch_size: int = 256,
+    queue_size: int = 4,
+    page_workers: int | None = None,
+    pages_per_task: int = 32,
+    web_cache_dir: str | None = None,
+    parallel_min_pages: int = DEFAULT_MIN_PAGES,
+) -> Iterator[DocumentBatch]:
+    """
+    Stream the chunks of documents in fixed-size batches while they are parsed.
+
+    Parsing runs ahead of the consumer by at most `queue_size` batches per
+    producer, so memory stays bounded however large the documents are, and the
+    consumer (embedding) works on early batches while later pages are parsed.
+
+    Args:
+        paths: Document paths or URLs.
+        target_chunk_size: Token target passed to the chunker.
+        chunk_overlap: Token overlap passed to the chunker.
+        workers: Worker processes; None uses every core, 0 or 1 parses the
+            documents one after another in a background thread.
+        batch_size: Chunks per batch.
+        queue_size: Batches buffered per producer.
+        page_workers: Worker processes extracting the pages of each PDF; None
+            gives each document worker its share of the cores it leaves idle,
+            so a single large PDF is still parsed on every core.
+        pages_per_task: Pages each page worker extracts at a time.
+        web_cache_dir: WebCache directory that URLs are read from when cached.
+        parallel_min_pages: PDFs with fewer pages are read serially by their document worker.
+
+    Yields:
+        DocumentBatch messages, grouped by document in the order of `paths`.
+    """
+    try:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        num_workers = min(workers, len(paths))
+        if page_workers is None:
+            page_workers = (os.cpu_count() or 1) // max(1, num_workers)
+        loader = DocumentLoader(
+            pdf_page_workers=page_workers,
+            pdf_pages_per_task=pages_per_task,
+            web_cache_dir=web_cache_dir,
+            pdf_parallel_min_pages=parallel_min_pages,
+        )
+        if num_workers <= 1:
+            yield from _stream_in_thread(paths, target_chunk_size, chunk_overlap, batch_size, queue_size, loader)
+        else:
+            yield from _stream_in_processes(
+                paths, target_chunk_size, chunk_overlap, num_workers, batch_size, queue_size, loader
+            )
+    except Exception as e:
+        raise MyException(e, sys)
+
+
+def _stream_in_thread(
+    paths: Sequence[str],
+    target_chunk_size: int,
+    chunk_overlap: int,
+    batch_size: int,
+    queue_size: int,
+    loader: DocumentLoader,
+) -> Iterator[DocumentBatch]:
+    out_queue = _ClosableQueue(maxsize=max(1, queue_size))
+    producer = threading.Thread(
+        target=_produce_all,
+        args=(paths, target_chunk_size, chunk_overlap, batch_size, out_queue, loader),
+        name="ingest-parse",
+        daemon=True,
+    )
+    producer.start()
+    try:
+        for position in range(len(paths)):
+            while True:
+                message = _get(out_queue, producer.is_alive)
+                if message is None:
+                    message = (position, None, "Parser thread stopped unexpectedly")
+                yield message
+                if message[1] is None:
+                    break
+    finally:
+        out_queue.close()
+
+
+def _stream_in_processes(
+    paths: Sequence[str],
+    target_chunk_size: int,
+    chunk_overlap: int,
+    num_workers: int,
+    batch_size: int,
+    queue_size: int,
+    loader: DocumentLoader,
+) -> Iterator[DocumentBatch]:
+    logging.info("Parsing %d documents in %d worker processes", len(paths), num_workers)
+    # spawn: the parent may already hold torch / ONNX Runtime thread pools that fork would copy
+    context = multiprocessing.get_context("spawn")
+    manager = context.Manager()
+    executor = ProcessPoolExecutor(max_workers=num_workers, mp_context=context)
+    try:
+        # One bounded queue per document: documents are consumed in order, and workers that
+        # run ahead block once their document's queue is full
+        queues = [manager.Queue(maxsize=max(1, queue_size)) for _ in paths]
+        futures: List[Future] = [
+            executor.submit(
+                _produce, position, path, target_chunk_size, chunk_overlap, batch_size, queues[position], loader
+            )
+            for position, path in enumerate(paths)
+        ]
+        for position, future in enumerate(futures):
+            while True:
+                message = _get(queues[position], lambda: not future.done())
+                if message is None:  # the worker itself died (e.g. out of memory)
+                    error = future.exception() if not future.cancelled() else None
+                    message = (position, None, f"Worker failed: {error}")
+                yield message
+                if message[1] is None:
+                    break
+    finally:
+        # Queues first: a worker blocked on a full queue would keep the pool from shutting down
+        manager.shutdown()
+        executor.shutdown(cancel_futures=True)
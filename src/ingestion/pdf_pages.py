@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from typing import Deque, Iterator, List, Tuple
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+from src.exception import MyException
+from src.logger import logging
+
+# PDFs with fewer pages are read serially: below a few hundred pages, handing ranges
+# to worker processes costs more than it saves (see benchmarks/bench_pdf_pages.py)
+DEFAULT_MIN_PAGES = 300
+
+# The PDF last opened by this worker process, keyed by (path, mtime, size): resolving
+# the page tree costs about as much as extracting a few dozen pages, so it is done
+# once per document and worker, not per task
+_reader_key: Tuple[str, int, int] | None = None
+_reader: PdfReader | None = None
+
+# One page pool per process, started on the first long PDF and reused for every
+# later one, so the spawn start-up cost is paid once rather than per document
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _extract_page_range(key: Tuple[str, int, int], start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop), extracted and stripped the way PyPDFLoader does it."""
+    global _reader_key, _reader
+    if key != _reader_key:
+        _reader, _reader_key = PdfReader(key[0]), key
+    return [_reader.pages[number].extract_text().strip() for number in range(start, stop)]
+
+
+def _page_pool(workers: int) -> ProcessPoolExecutor:
+    """The process's page pool, (re)started when missing, sized differently, or broken by a dead worker."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and (_pool_workers != workers or getattr(_pool, "_broken", False)):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            logging.info("Starting %d PDF page worker processes", workers)
+            # spawn, like the ingestion pool: fork would copy the parent's native thread pools
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_page_pool() -> None:
+    """Stop the page pool's worker processes; the next long PDF starts a new pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+# Runs at exit before multiprocessing closes its queues (priority 10) and joins the
+# process's children: otherwise a document worker that used the pool would wait
+# forever on its idle page workers
+Finalize(None, shutdown_page_pool, exitpriority=100)
+
+
+def iter_pdf_pages(
+    path: str, workers: int, pages_per_task: int = 32, min_pages: int = DEFAULT_MIN_PAGES
+) -> Iterator[Document]:
+    """
+    Yield the pages of a PDF in order, as PyPDFLoader(path).lazy_load() would,
+    while worker processes extract later page ranges concurrently.
+
+    The first page comes from PyPDFLoader itself; every other page reuses its
+    metadata with its own `page` and `page_label`, so the documents are identical
+    to the serial loader's. At most two ranges per worker are in flight, which
+    bounds the memory held for pages the consumer has not reached yet. The worker
+    processes are shared by every call in this process and outlive it.
+
+    Args:
+        path: Local PDF file.
+        workers: Worker processes; workers <= 1 reads the PDF serially.
+        pages_per_task: Pages extracted per task.
+        min_pages: PDFs with fewer pages (or fewer than two ranges) are read serially.
+    """
+    try:
+        reader = PdfReader(path)
+        num_pages = len(reader.pages)
+        pages_per_task = max(1, pages_per_task)
+        if workers <= 1 or num_pages < max(min_pages, 2 * pages_per_task):
+            yield from PyPDFLoader(path).lazy_load()
+            return
+        # Computed once: PdfReader.page_labels rebuilds the whole list on each access
+        labels = reader.page_labels
+        del reader
+
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        ranges = iter((start, min(start + pages_per_task, num_pages)) for start in range(1, num_pages, pages_per_task))
+        executor = _page_pool(workers)
+        num_in_flight = 2 * min(workers, -(-(num_pages - 1) // pages_per_task))
+        logging.info("Extracting %d pages of %s in %d worker processes", num_pages, path, workers)
+        pending: Deque[Tuple[int, Future]] = deque()
+
+        def submit_next() -> None:
+            page_range = next(ranges, None)
+            if page_range is not None:
+                pending.append((page_range[0], executor.submit(_extract_page_range, key, *page_range)))
+
+        try:
+            for _ in range(num_in_flight):
+                submit_next()
+            # The first page is read here while the workers extract the next ranges
+            loader_pages = PyPDFLoader(path).lazy_load()
+            first_page = next(loader_pages)
+            loader_pages.close()
+            yield first_page
+            while pending:
+                start, future = pending.popleft()
+                texts = future.result()
+                submit_next()
+                for number, text in enumerate(texts, start):
+                    yield Document(
+                        page_content=text,
+                        metadata={**first_page.metadata, "page": number, "page_label": labels[number]},
+                    )
+        finally:
+            # The consumer may stop early: drop its ranges that no worker has started
+            for _, future in pending:
+                future.cancel()
+    except Exception as e:
+        raise MyException(e, sys)
@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, Iterable, Iterator, Sequence
+from urllib.parse import urlsplit
+
+import charset_normalizer
+import httpx
+from bs4 import BeautifulSoup
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+from src.exception import MyException
+from src.logger import logging
+
+
+def is_url(path: str) -> bool:
+    return path.startswith(('http://', 'https://'))
+
+
+class WebCache:
+    """
+    On-disk HTTP cache: per URL, the last body received and a JSON entry holding
+    its validators (ETag, Last-Modified), charset and content hash. Both files
+    are replaced atomically, so worker processes reading the cache never see a
+    partial write. prune() evicts entries by age and total size.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _base_path(self, url: str) -> str:
+        return os.path.join(self.root, hashlib.md5(url.encode("utf-8")).hexdigest())
+
+    def body_path(self, url: str) -> str:
+        return self._base_path(url) + ".body"
+
+    def get(self, url: str) -> dict | None:
+        """The cache entry of `url`, or None when it was never fetched."""
+        try:
+            with open(self._base_path(url) + ".json", "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if os.path.exists(self.body_path(url)) else None
+
+    def put(self, url: str, body: bytes, headers: httpx.Headers, encoding: str | None) -> dict:
+        """Store a full response for `url` and return its new entry."""
+        self._write(self.body_path(url), body)
+        entry = {
+            "url": url,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "content_type": headers.get("content-type"),
+            "encoding": encoding,
+            "content_hash": hashlib.md5(body).hexdigest(),
+            "fetched_at": time.time(),
+        }
+        self._write_entry(url, entry)
+        return entry
+
+    def revalidated(self, url: str, entry: dict, headers: httpx.Headers) -> dict:
+        """Record a 304 for `url`, keeping any validators the server sent again."""
+        entry = {
+            **entry,
+            "etag": headers.get("etag") or entry.get("etag"),
+            "last_modified": headers.get("last-modified") or entry.get("last_modified"),
+            "fetched_at": time.time(),
+        }
+        self._write_entry(url, entry)
+        return entry
+
+    def prune(
+        self, max_age_seconds: float | None = None, max_bytes: int | None = None, keep: Iterable[str] = ()
+    ) -> int:
+        """
+        Evict entries not fetched (or revalidated) within `max_age_seconds`, then the
+        least recently fetched ones until the cached bodies fit in `max_bytes`.
+
+        Args:
+            max_age_seconds: Maximum entry age; None keeps entries of any age.
+            max_bytes: Maximum total body size; None means unlimited.
+            keep: URLs that are never evicted, e.g. the pages about to be ingested.
+
+        Returns:
+            The number of evicted entries.
+        """
+        kept = {self._base_path(url) for url in keep}
+        candidates = []
+        total_bytes = 0
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            base_path = os.path.join(self.root, name[:-len(".json")])
+            try:
+                with open(base_path + ".json", "r", encoding="utf-8") as f:
+                    fetched_at = json.load(f).get("fetched_at", 0)
+                size = os.path.getsize(base_path + ".body")
+            except (OSError, ValueError):
+                # Unreadable, or a body that is gone: the entry is unusable either way
+                fetched_at, size = 0, 0
+            total_bytes += size
+            if base_path not in kept:
+                candidates.append((fetched_at, size, base_path))
+
+        now = time.time()
+        evicted = 0
+        for fetched_at, size, base_path in sorted(candidates):
+            expired = max_age_seconds is not None and now - fetched_at > max_age_seconds
+            too_big = max_bytes is not None and total_bytes > max_bytes
+            if not (expired or too_big):
+                break
+            for suffix in (".json", ".body"):
+                if os.path.exists(base_path + suffix):
+                    os.remove(base_path + suffix)
+            total_bytes -= size
+            evicted += 1
+        if evicted:
+            logging.info("Evicted %d entries from the web cache (%d bytes left)", evicted, total_bytes)
+        return evicted
+
+    def _write_entry(self, url: str, entry: dict) -> None:
+        self._write(self._base_path(url) + ".json", json.dumps(entry).encode("utf-8"))
+
+    def _write(self, path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class WebFetcher:
+    """
+    Fetches web pages concurrently over one pooled async HTTP client and keeps
+    them in a WebCache.
+
+    Requests for a page that is already cached are conditional (If-None-Match /
+    If-Modified-Since), so an unchanged page costs a 304 and keeps its content
+    hash, which is what the pipeline keys documents on: it is then neither
+    downloaded nor embedded again. Connections are limited overall and per host.
+    After each fetch, cache entries older than `max_cache_age_days` are evicted,
+    then the oldest ones beyond `max_cache_mb`; the URLs just fetched are kept.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_connections: int = 32,
+        max_connections_per_host: int = 6,
+        timeout_seconds: float = 30.0,
+        max_sitemap_depth: int = 3,
+        user_agent: str | None = None,
+        max_cache_age_days: float | None = None,
+        max_cache_mb: float | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.cache = WebCache(cache_dir)
+        self.max_connections = max(1, max_connections)
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.timeout_seconds = timeout_seconds
+        self.max_sitemap_depth = max_sitemap_depth
+        self.user_agent = user_agent
+        self.max_cache_age_days = max_cache_age_days
+        self.max_cache_mb = max_cache_mb
+        # Custom transport for the HTTP client (e.g. httpx.MockTransport in tests)
+        self.transport = transport
+
+    def fetch(self, urls: Sequence[str], sitemaps: Sequence[str] = ()) -> Dict[str, dict]:
+        """
+        Fetch `urls` and every page listed in `sitemaps` (sitemap indexes are followed).
+
+        Returns:
+            A result per URL: {"content_hash", "status", "error"}, where status is
+            "downloaded", "not_modified", "stale" (the fetch failed but an earlier copy
+            is cached) or "error" (content_hash None). Sitemap results also hold
+            "pages", the page URLs they list.
+        """
+        try:
+            results = asyncio.run(self.fetch_async(urls, sitemaps))
+            self.cache.prune(
+                max_age_seconds=self.max_cache_age_days * 86400 if self.max_cache_age_days is not None else None,
+                max_bytes=int(self.max_cache_mb * 1_000_000) if self.max_cache_mb is not None else None,
+                keep=results,
+            )
+            return results
+        except Exception as e:
+            raise MyException(e, sys)
+
+    async def fetch_async(self, urls: Sequence[str], sitemaps: Sequence[str] = ()) -> Dict[str, dict]:
+        headers = {"User-Agent": self.user_agent} if self.user_agent else None
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        async with httpx.AsyncClient(
+            headers=headers,
+            limits=limits,
+            timeout=self.timeout_seconds,
+            follow_redirects=True,
+            transport=self.transport,
+        ) as client:
+            host_limits: Dict[str, asyncio.Semaphore] = {}
+            results: Dict[str, dict] = {}
+            sitemap_results = await asyncio.gather(
+                *(self._fetch_sitemap(client, host_limits, url, self.max_sitemap_depth) for url in sitemaps)
+            )
+            results.update(zip(sitemaps, sitemap_results))
+
+            pages = list(dict.fromkeys(
+                [*urls, *(page for result in sitemap_results for page in result.get("pages") or [])]
+            ))
+            started = time.perf_counter()
+            page_results = await asyncio.gather(*(self._fetch(client, host_limits, url) for url in pages))
+            results.update(zip(pages, page_results))
+
+        statuses = [result["status"] for result in page_results]
+        logging.info(
+            "Fetched %d web page(s) in %.1f s: %d downloaded, %d not modified, %d stale, %d failed",
+            len(pages),
+            time.perf_counter() - started,
+            statuses.count("downloaded"),
+            statuses.count("not_modified"),
+            statuses.count("stale"),
+            statuses.count("error"),
+        )
+        return results
+
+    async def _fetch(self, client: httpx.AsyncClient, host_limits: Dict[str, asyncio.Semaphore], url: str) -> dict:
+        entry = self.cache.get(url)
+        conditional = {}
+        if entry and entry.get("etag"):
+            conditional["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            conditional["If-Modified-Since"] = entry["last_modified"]
+        host_limit = host_limits.setdefault(urlsplit(url).netloc, asyncio.Semaphore(self.max_connections_per_host))
+        try:
+            async with host_limit:
+                response = await client.get(url, headers=conditional)
+            if response.status_code == 304 and entry:
+                entry = await asyncio.to_thread(self.cache.revalidated, url, entry, response.headers)
+                return {"content_hash": entry["content_hash"], "status": "not_modified", "error": None}
+            response.raise_for_status()
+            entry = await asyncio.to_thread(
+                self.cache.put, url, response.content, response.headers, response.charset_encoding
+            )
+            return {"content_hash": entry["content_hash"], "status": "downloaded", "error": None}
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if entry:
+                logging.warning("Fetching %s failed (%s); using the cached copy", url, error)
+                return {"content_hash": entry["content_hash"], "status": "stale", "error": error}
+            logging.warning("Fetching %s failed: %s", url, error)
+            return {"content_hash": None, "status": "error", "error": error}
+
+    async def _fetch_sitemap(
+        self, client: httpx.AsyncClient, host_limits: Dict[str, asyncio.Semaphore], url: str, depth: int
+    ) -> dict:
+        """Fetch a sitemap and collect the page URLs it lists, following nested sitemaps up to `depth`."""
+        result = await self._fetch(client, host_limits, url)
+        if result["content_hash"] is None:
+            return result
+        try:
+            with open(self.cache.body_path(url), "rb") as f:
+                root = ElementTree.fromstring(f.read())
+        except (OSError, ElementTree.ParseError) as e:
+            return {**result, "status": "error", "error": f"Invalid sitemap: {e}"}
+
+        locations = [
+            element.text.strip()
+            for entry in root
+            for element in entry
+            if _local_name(element.tag) == "loc" and element.text and element.text.strip()
+        ]
+        if _local_name(root.tag) != "sitemapindex":
+            return {**result, "pages": locations}
+        if depth <= 0:
+            logging.warning("Not following sitemaps nested deeper than %s", url)
+            return {**result, "pages": []}
+        nested = await asyncio.gather(
+            *(self._fetch_sitemap(client, host_limits, location, depth - 1) for location in locations)
+        )
+        for location, nested_result in zip(locations, nested):
+            if nested_result["error"] and not nested_result.get("pages"):
+                logging.warning("Skipping sitemap %s: %s", location, nested_result["error"])
+        return {**result, "pages": [page for nested_result in nested for page in nested_result.get("pages") or []]}
+
+
+class CachedPageLoader(BaseLoader):
+    """
+    Loads a page from the WebCache instead of downloading it, parsed the way
+    WebBaseLoader parses a live page (same text and metadata keys). Bodies are
+    decoded with the charset the server declared or, without one, the charset
+    detected from the bytes, as WebBaseLoader's requests.apparent_encoding does.
+    """
+
+    def __init__(self, cache: WebCache, url: str):
+        self.cache = cache
+        self.url = url
+
+    def lazy_load(self) -> Iterator[Document]:
+        entry = self.cache.get(self.url)
+        if entry is None:
+            raise MyException(f"{self.url} is not in the web cache.", sys)
+        with open(self.cache.body_path(self.url), "rb") as f:
+            body = f.read()
+        parser = "xml" if self.url.endswith(".xml") else "html.parser"
+        encoding = entry.get("encoding") or charset_normalizer.detect(body)["encoding"]
+        try:
+            markup = body.decode(encoding, errors="replace") if encoding else body
+        except LookupError:
+            # Unknown charset name: leave the detection to BeautifulSoup
+            markup = body
+        soup = BeautifulSoup(markup, parser)
+        yield Document(page_content=soup.get_text(), metadata=_page_metadata(soup, self.url))
+
+
+def _page_metadata(soup: BeautifulSoup, url: str) -> dict:
+    """The metadata WebBaseLoader builds for a page."""
+    metadata = {"source": url}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html := soup.find("html"):
+        metadata["language"] = html.get("lang", "No language found.")
+    return metadata
@@ -1,5 +1,6 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from src.utils.main_utils import num_tokens_from_string
+from src.preprocessing.token_splitter import TokenWindowSplitter
+from src.utils.main_utils import get_tokenizer
 from langchain_core.documents import Document
 from src.logger import logging
 from src.exception import MyException
@@ -70,7 +71,8 @@ class DocumentChunker:
     def length_based_refinement(self, structural_chunks: list, target_chunk_size: int, chunk_overlap: int) -> list:
         """
         Refines a list of structural chunks by further splitting any chunk exceeding a target
-        length using a RecursiveCharacterTextSplitter with token-based length function.
+        length. Each structural chunk is encoded once and oversized ones are cut into token
+        windows directly on that encoding (see TokenWindowSplitter).
 
         Args:
             structural_chunks (list): A list of dictionaries, each containing 'text' and 'metadata',
@@ -80,40 +82,41 @@ class DocumentChunker:
 
         Returns:
             list: A list of dictionaries, each representing a refined chunk with 'text' and 'metadata'.
+                  Each chunk's metadata carries its 'token_count'.
         """
         try:
             refined_chunks = []
+            structural_tokens = get_tokenizer().encode_batch(
+                [chunk['text'] for chunk in structural_chunks], disallowed_special=()
+            )
+            sub_splitter = TokenWindowSplitter(target_chunk_size, chunk_overlap)
 
             logging.info(f"Applying length-based refinement with target_chunk_size={target_chunk_size} and chunk_overlap={chunk_overlap}.")
 
             for i, structural_chunk in enumerate(structural_chunks):
                 text = structural_chunk['text']
                 metadata = structural_chunk['metadata'].copy()
-                current_chunk_tokens = num_tokens_from_string(text)
+                current_chunk_tokens = len(structural_tokens[i])
 
                 if current_chunk_tokens > target_chunk_size:
-                    print(f"  Chunk {i} (original tokens: {current_chunk_tokens}) exceeds target. Further splitting...")
-                    # Create a new splitter for this sub-splitting process
-                    sub_splitter = RecursiveCharacterTextSplitter(
-                        chunk_size=target_chunk_size,
-                        chunk_overlap=chunk_overlap,
-                        length_function=num_tokens_from_string, # Use token counting
-                        add_start_index=True
-                    )
-                    # Convert the structural chunk into a Document object for the splitter
-                    doc_to_split = Document(page_content=text, metadata=metadata)
-                    sub_documents = sub_splitter.split_documents([doc_to_split])
-
-                    for j, sub_doc in enumerate(sub_documents):
-                        sub_chunk_metadata = sub_doc.metadata.copy()
+                    logging.debug("Chunk %d (original tokens: %d) exceeds target. Further splitting...", i, current_chunk_tokens)
+                    # Cut token windows straight from the chunk's existing encoding
+                    sub_chunks = sub_splitter.split_text(text, tokens=structural_tokens[i])
+
+                    for j, (start_index, sub_text, sub_tokens) in enumerate(sub_chunks):
+                        sub_chunk_metadata = metadata.copy()
+                        # start_index is relative to the structural chunk, as before
+                        sub_chunk_metadata['start_index'] = start_index
                         # Update chunk_id to reflect it's a sub-chunk
                         sub_chunk_metadata['chunk_id'] = f"{metadata.get('chunk_id', i)}-{j}"
+                        sub_chunk_metadata['token_count'] = sub_tokens
                         refined_chunks.append({
-                            'text': sub_doc.page_content,
+                            'text': sub_text,
                             'metadata': sub_chunk_metadata
                         })
                 else:
-                    print(f"  Chunk {i} (tokens: {current_chunk_tokens}) is within target. Adding directly.")
+                    logging.debug("Chunk %d (tokens: %d) is within target. Adding directly.", i, current_chunk_tokens)
+                    structural_chunk['metadata']['token_count'] = current_chunk_tokens
                     refined_chunks.append(structural_chunk)
 
             logging.info(f"Total refined chunks after length-based refinement: {len(refined_chunks)}")
@@ -136,22 +139,34 @@ class DocumentChunker:
             list: A list of dictionaries, each representing a final chunk with 'text' and 'metadata'.
         """
         logging.info("Starting document chunking process...")
-        all_final_chunks = []
         try:
-            for i, extracted_doc_dict in enumerate(cleaned_doc_list):
-                print(f"Processing document {i+1}/{len(cleaned_doc_list)} for chunking...")
-                # Step 1: Perform structure-aware splitting
-                structural_chunks = self.structure_aware_splitter(extracted_doc_dict)
-
-                # Step 2: Perform length-based refinement
-                refined_chunks = self.length_based_refinement(
-                    structural_chunks,
-                    target_chunk_size=target_chunk_size,
-                    chunk_overlap=chunk_overlap
-                )
-                all_final_chunks.extend(refined_chunks)
-
+            all_final_chunks = list(self.iter_chunks(cleaned_doc_list, target_chunk_size, chunk_overlap))
             logging.info(f"Document chunking process completed. Generated {len(all_final_chunks)} total final chunks from all documents.")
             return all_final_chunks
         except Exception as e:
             raise MyException(e, sys)
+
+    def iter_chunks(self, cleaned_docs, target_chunk_size: int = 500, chunk_overlap: int = 100):
+        """
+        Same as chunk_document, but yields the final chunks of each cleaned document (page)
+        as soon as it is chunked, so `cleaned_docs` can be a lazy iterator.
+
+        Args:
+            cleaned_docs (Iterable): Dictionaries with 'text' and 'metadata' from the cleaned documents.
+            target_chunk_size (int): The desired maximum token length for refined chunks.
+            chunk_overlap (int): The number of tokens to overlap between sub-chunks.
+
+        Yields:
+            dict: the next final chunk with 'text' and 'metadata'.
+        """
+        for i, extracted_doc_dict in enumerate(cleaned_docs):
+            logging.debug("Processing document %d for chunking...", i + 1)
+            # Step 1: Perform structure-aware splitting
+            structural_chunks = self.structure_aware_splitter(extracted_doc_dict)
+
+            # Step 2: Perform length-based refinement
+            yield from self.length_based_refinement(
+                structural_chunks,
+                target_chunk_size=target_chunk_size,
+                chunk_overlap=chunk_overlap
+            )
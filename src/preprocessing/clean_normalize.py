@@ -1,8 +1,5 @@
-import re
-from bs4 import BeautifulSoup
 from src.logger import logging
-from src.exception import MyException
-import os, sys
+from src.preprocessing.text_cleaning import clean_structure, has_cleaner, normalize_text
 
 class DocumentNormalizationAndCleaning:
     def __init__(self):
@@ -18,24 +15,12 @@ class DocumentNormalizationAndCleaning:
 
         This should be applied AFTER structure-specific cleaning.
         """
-        # Normalize Windows-style newlines
-        text = text.replace("\r\n", "\n").replace("\r", "\n")
-        # Collapse tabs into spaces
-        text = re.sub(r"[ \t]+", " ", text)
-        # Collapse 3+ blank lines into just 2 (paragraph separation)
-        text = re.sub(r"\n\s*\n\s*\n+", "\n\n", text)
-        # Remove extra spaces around newlines
-        text = re.sub(r"[ \t]*\n[ \t]*", "\n", text)
-        # Finally, collapse multiple spaces again (in case we introduced any)
-        text = re.sub(r" {2,}", " ", text)
-        # Strip leading/trailing whitespace
-        text = text.strip()
-
-        return text
+        return normalize_text(text)
     
     def clean_document_structure(self, extracted_doc: list) -> list:
         """
-        Cleans the document text based on its document type.
+        Cleans the document text based on its document type, with the cleaner
+        registered for it in src.preprocessing.text_cleaning.
         Args:
             extracted_doc (list): A list of dictionaries, each containing 'text' and 'metadata'.
                                     'metadata' must contain 'doc_type'.
@@ -52,43 +37,15 @@ class DocumentNormalizationAndCleaning:
 
             raw_text = extracted_doc_dict['text']
             doc_type = extracted_doc_dict['metadata']['doc_type']
-            cleaned_text = raw_text # Initialize with raw text, cleaning methods will modify this
-
-            print(f"Cleaning document of type: {doc_type}")
-            print(f"Original text length: {len(raw_text)}")
-
-            if doc_type == 'md':
-                print("Applying Markdown specific cleaning...")
-                # Remove Markdown headers (e.g., # Header 1)
-                cleaned_text = re.sub(r'^#+\s*(.*)$', r'\1', cleaned_text, flags=re.MULTILINE)
-                # Remove bold and italic formatting
-                cleaned_text = re.sub(r'(\S*?)(\*{1,2}|_{1,2})(.*?)\2', r'\1\3', cleaned_text) # Bold/Italic
-                # Remove links (display text only)
-                cleaned_text = re.sub(r'\[(.*?)\]\(.*\)', r'\1', cleaned_text)
-                # Remove inline code blocks
-                cleaned_text = re.sub(r'`(.*?)`', r'\1', cleaned_text)
-                # Remove block quotes
-                cleaned_text = re.sub(r'^>\s?', '', cleaned_text, flags=re.MULTILINE)
-                # Remove list markers
-                cleaned_text = re.sub(r'^[\-*+]\s?', '', cleaned_text, flags=re.MULTILINE)
-                # Remove emojis
-                cleaned_text = re.sub(r'[^\x00-\x7F]+', '', cleaned_text)
-            elif doc_type == 'web':
-                print("Applying Web specific cleaning with BeautifulSoup...")
-                soup = BeautifulSoup(raw_text, 'html.parser')
-
-                # Remove script and style elements
-                for script_or_style in soup(['script', 'style']):
-                    script_or_style.extract() # Remove them from the soup
-
-                # Get text
-                cleaned_text = soup.get_text()
-            else: # General text (pdf, docx, txt). No specific structural cleaning needed before normalization.
-                print(f"No specific structural cleaning for {doc_type}. Applying general text normalization.")
-                cleaned_text = raw_text
+            logging.debug(
+                "Cleaning %s text of %d characters%s",
+                doc_type,
+                len(raw_text),
+                "" if has_cleaner(doc_type) else " (no structural cleaning)",
+            )
 
             # Update the text in the current dictionary and append to the new list
-            extracted_doc_dict['text'] = cleaned_text
+            extracted_doc_dict['text'] = clean_structure(raw_text, doc_type)
             cleaned_document_list.append(extracted_doc_dict)
 
         return cleaned_document_list
@@ -100,3 +57,11 @@ class DocumentNormalizationAndCleaning:
         for cleaned_doc_dict in cleaned_document:
             cleaned_doc_dict["text"] = self.normalize_text(cleaned_doc_dict["text"])
         return cleaned_document
+
+    def iter_document_normalizer(self, extracted_docs):
+        """
+        Cleans and normalizes pages one at a time, yielding each as soon as it is done,
+        so `extracted_docs` can be a lazy iterator of extracted page dictionaries.
+        """
+        for extracted_doc_dict in extracted_docs:
+            yield self.initialize_document_normalizer([extracted_doc_dict])[0]
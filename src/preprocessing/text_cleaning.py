@@ -0,0 +1,90 @@
+import re
+from typing import Callable, Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+# A substitution applied with pattern.sub(replacement, text)
+CleaningRule = Tuple[re.Pattern, str]
+
+# doc_type -> structural cleaner run before normalize_text(); unregistered types are left as they are
+_CLEANERS: Dict[str, Callable[[str], str]] = {}
+
+
+def register_cleaner(*doc_types: str) -> Callable[[Callable[[str], str]], Callable[[str], str]]:
+    """Decorator registering a `text -> text` structural cleaner for the given doc types."""
+    def register(cleaner: Callable[[str], str]) -> Callable[[str], str]:
+        for doc_type in doc_types:
+            _CLEANERS[doc_type] = cleaner
+        return cleaner
+    return register
+
+
+def has_cleaner(doc_type: str) -> bool:
+    return doc_type in _CLEANERS
+
+
+def clean_structure(text: str, doc_type: str) -> str:
+    """Remove the markup specific to `doc_type`."""
+    cleaner = _CLEANERS.get(doc_type)
+    return cleaner(text) if cleaner is not None else text
+
+
+def apply_rules(text: str, rules: List[CleaningRule]) -> str:
+    for pattern, replacement in rules:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+_MARKDOWN_RULES: List[CleaningRule] = [
+    # Headers (e.g. "# Header 1"), keeping their text
+    (re.compile(r'^#+\s*(.*)$', re.MULTILINE), r'\1'),
+    # Bold and italic formatting. Same matches as r'(\S*?)(\*{1,2}|_{1,2})(.*?)\2' -> r'\1\3',
+    # whose leading lazy group is put back unchanged but is tried from every position
+    (re.compile(r'(\*{1,2}|_{1,2})(.*?)\1'), r'\2'),
+    # Links (display text only)
+    (re.compile(r'\[(.*?)\]\(.*\)'), r'\1'),
+    # Inline code
+    (re.compile(r'`(.*?)`'), r'\1'),
+    # Block quote markers, then the list marker of what was quoted, in one pass
+    (re.compile(r'^(?:>\s?)?(?:[\-*+]\s?)?', re.MULTILINE), ''),
+]
+
+
+@register_cleaner('md')
+def clean_markdown(text: str) -> str:
+    text = apply_rules(text, _MARKDOWN_RULES)
+    # Drop emojis and every other non-ASCII character, like re.sub(r'[^\x00-\x7F]+', '', text)
+    return text.encode('ascii', 'ignore').decode('ascii')
+
+
+@register_cleaner('web')
+def clean_html(text: str) -> str:
+    soup = BeautifulSoup(text, 'html.parser')
+    for script_or_style in soup(['script', 'style']):
+        script_or_style.extract()
+    return soup.get_text()
+
+
+_SPACE_RUNS = re.compile(r' {2,}')
+_PARAGRAPH_BREAKS = re.compile(r'\n\s*\n\s*\n+')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Unify line breaks, collapse runs of spaces and tabs, collapse 3+ line breaks
+    into a paragraph break, drop spaces around line breaks and trim the text.
+
+    Only the rare matches go through regular expressions: a `[ \t]+` or
+    `[ \t]*\n[ \t]*` substitution also matches (and replaces) every single space
+    or line break. Once tabs are spaces and space runs are collapsed, at most one
+    space is left on each side of a line break, which str.replace removes. The
+    substitutions commute, so the result is the same as applying them in the
+    documented order.
+    """
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = text.replace('\t', ' ')
+    if '  ' in text:
+        text = _SPACE_RUNS.sub(' ', text)
+    text = _PARAGRAPH_BREAKS.sub('\n\n', text)
+    return text.replace(' \n', '\n').replace('\n ', '\n').strip()
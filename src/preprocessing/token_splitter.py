@@ -0,0 +1,173 @@
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.main_utils import get_tokenizer
+
+# Boundary strengths, strongest first; a window end snaps to the strongest one in reach.
+# _INSIDE marks tokens that start inside a multi-byte character, where no cut is possible.
+_PARAGRAPH, _LINE, _SENTENCE, _WORD, _NONE, _INSIDE = 4, 3, 2, 1, 0, -1
+
+
+@lru_cache(maxsize=None)
+def _token_byte_lengths(model_name: str) -> np.ndarray:
+    """Byte length of every token id of the encoding (0 for unused ids)."""
+    encoding = get_tokenizer(model_name)
+    lengths = np.zeros(encoding.n_vocab, dtype=np.int64)
+    for token in range(encoding.n_vocab):
+        try:
+            lengths[token] = len(encoding.decode_single_token_bytes(token))
+        except KeyError:
+            pass
+    return lengths
+
+
+def _char_offsets(
+    text: str, tokens: Sequence[int], byte_lengths: np.ndarray
+) -> Tuple[List[int], np.ndarray] | None:
+    """
+    Character offset in `text` at which each token starts, plus len(text), and a
+    mask of the tokens that start on a character boundary. None when the tokens
+    do not line up with the UTF-8 bytes of `text`.
+
+    Vectorized replacement for Encoding.decode_with_offsets; a token starting
+    inside a multi-byte character maps to the end of that character.
+    """
+    byte_offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+    np.cumsum(byte_lengths[np.asarray(tokens, dtype=np.int64)], out=byte_offsets[1:])
+    if text.isascii():
+        if byte_offsets[-1] != len(text):
+            return None
+        return byte_offsets.tolist(), np.ones(len(byte_offsets), dtype=bool)
+    try:
+        raw = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+    except UnicodeEncodeError:  # lone surrogates, which tiktoken replaces
+        return None
+    if byte_offsets[-1] != len(raw):
+        return None
+    # Characters started before each byte position: count of non-continuation bytes
+    is_char_start = np.append((raw & 0xC0) != 0x80, True)
+    chars_before = np.zeros(len(raw) + 1, dtype=np.int64)
+    np.cumsum(is_char_start[:-1], out=chars_before[1:])
+    return chars_before[byte_offsets].tolist(), is_char_start[byte_offsets]
+
+
+# Character classes as bit flags, looked up by code point. Every Unicode whitespace
+# character is below U+3001, so higher code points share the last (empty) entry.
+_SPACE, _NEWLINE, _SENTENCE_END = 1, 2, 4
+_CHAR_CLASSES = np.zeros(0x3002, dtype=np.uint8)
+_CHAR_CLASSES[[c for c in range(0x3001) if chr(c).isspace()]] = _SPACE
+_CHAR_CLASSES[ord("\n")] |= _NEWLINE
+_CHAR_CLASSES[[ord(c) for c in ".!?"]] = _SENTENCE_END
+
+
+def _boundary_levels(text: str, offsets: List[int]) -> np.ndarray:
+    """How natural it is to cut `text` at each of the character positions `offsets`."""
+    positions = np.asarray(offsets, dtype=np.int64)
+    # Two characters of padding on each side, so every position has two neighbours per side
+    code_points = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    classes = np.zeros(len(text) + 4, dtype=np.uint8)
+    classes[2:-2] = _CHAR_CLASSES[np.minimum(code_points, len(_CHAR_CLASSES) - 1)]
+    before2, before, after, after2 = (classes[positions + shift] for shift in range(4))
+
+    newline_before, newline_after = (before & _NEWLINE) > 0, (after & _NEWLINE) > 0
+    paragraph = (
+        (newline_before & newline_after)
+        | (newline_before & ((before2 & _NEWLINE) > 0))
+        | (newline_after & ((after2 & _NEWLINE) > 0))
+        | (positions <= 0)
+        | (positions >= len(text))
+    )
+    sentence = ((before & _SENTENCE_END) > 0) | (((before & _SPACE) > 0) & ((before2 & _SENTENCE_END) > 0))
+
+    levels = np.full(len(positions), _NONE, dtype=np.int8)
+    levels[((before | after) & _SPACE) > 0] = _WORD
+    levels[sentence] = _SENTENCE
+    levels[newline_before | newline_after] = _LINE
+    levels[paragraph] = _PARAGRAPH
+    return levels
+
+
+class TokenWindowSplitter:
+    """
+    Splits text into windows of at most `chunk_size` tokens with `chunk_overlap`
+    tokens of overlap, cutting directly on the token array.
+
+    The text is encoded once. Each window end moves back (by at most half a
+    window) to the strongest nearby boundary: paragraph, line, sentence, then
+    word. Overlapping starts move forward to a word boundary. Each chunk is
+    encoded once more to report its exact token count, so work stays linear in
+    the text length, unlike re-measuring candidate substrings with a token
+    length function.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int = 0, model_name: str = "cl100k_base"):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive.")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap must be >= 0 and smaller than chunk_size.")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding = get_tokenizer(model_name)
+        self.byte_lengths = _token_byte_lengths(model_name)
+
+    def split_text(self, text: str, tokens: Sequence[int] | None = None) -> List[Tuple[int, str, int]]:
+        """
+        Split `text` into (start_index, chunk_text, token_count) triples, where
+        start_index is the character offset of the chunk in `text`. Pass `tokens`
+        when the text has already been encoded with the same encoding.
+        """
+        if tokens is None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+        num_tokens = len(tokens)
+        if num_tokens == 0:
+            return []
+        aligned = _char_offsets(text, tokens, self.byte_lengths)
+        if aligned is not None:
+            offsets, on_char_boundary = aligned
+        else:
+            _, offsets = self.encoding.decode_with_offsets(list(tokens))
+            offsets = list(offsets) + [len(text)]
+            on_char_boundary = np.ones(len(offsets), dtype=bool)
+        levels = _boundary_levels(text, offsets)
+        levels[~on_char_boundary] = _INSIDE
+
+        chunks: List[Tuple[int, str, int]] = []
+        start = 0
+        while start < num_tokens:
+            end = min(start + self.chunk_size, num_tokens)
+            low = start + max(1, self.chunk_size // 2)
+            if end < num_tokens:
+                end = self._snap_back(levels, low, end)
+            while True:
+                piece = text[offsets[start]:offsets[end]]
+                stripped = piece.strip()
+                # A piece encoded on its own can take a token or two more than its
+                # window did (whitespace merges differently at the edges)
+                token_count = len(self.encoding.encode(stripped, disallowed_special=()))
+                if token_count <= self.chunk_size or end - 1 <= start:
+                    break
+                end = self._snap_back(levels, min(low, end - 1), end - 1)
+            if stripped:
+                chunks.append((offsets[start] + len(piece) - len(piece.lstrip()), stripped, token_count))
+            if end >= num_tokens:
+                break
+
+            next_start = max(end - self.chunk_overlap, start + 1)
+            if self.chunk_overlap:
+                next_start = self._snap_forward(levels, next_start, end)
+            start = next_start
+        return chunks
+
+    @staticmethod
+    def _snap_back(levels: np.ndarray, low: int, high: int) -> int:
+        """Latest token index in [low, high] whose start is the strongest boundary."""
+        # argmax returns the first maximum, so search the range backwards
+        return high - int(np.argmax(levels[low:high + 1][::-1]))
+
+    @staticmethod
+    def _snap_forward(levels: np.ndarray, low: int, high: int) -> int:
+        """First token index in [low, high) that starts at a word boundary, else `low`."""
+        candidates = np.flatnonzero(levels[low:high] >= _WORD)
+        return low + int(candidates[0]) if len(candidates) else low
@@ -0,0 +1,147 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def normalize_question(query: str) -> str:
+    """Case-folded, whitespace-collapsed question without trailing punctuation."""
+    return _TRAILING_PUNCTUATION.sub("", " ".join(query.split()).casefold())
+
+
+class AnswerCache:
+    """
+    LRU/TTL cache of generated answers for the current document set.
+
+    A lookup first tries the normalized question text, then the cosine
+    similarity of the query embedding to every cached question, accepting the
+    best match at or above `similarity_threshold`. Binding a different document
+    fingerprint clears the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float | None = None,
+        similarity_threshold: float | None = 0.95,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.fingerprint: str | None = None
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        # normalized question -> (result, unit query vector or None, stored at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._matrix: np.ndarray | None = None
+        self._matrix_keys: List[str] = []
+        self._lock = threading.Lock()
+
+    def set_fingerprint(self, fingerprint: str | None) -> None:
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                self._entries.clear()
+                self._matrix = None
+                self.fingerprint = fingerprint
+
+    def lookup(
+        self, query: str, embed: Callable[[str], np.ndarray] | None = None
+    ) -> Tuple[Dict[str, Any] | None, np.ndarray | None]:
+        """
+        Find a cached result for the query.
+
+        The query is only embedded (with `embed`) when there is no exact match and
+        similarity lookups are enabled. The vector is returned either way so the
+        caller can reuse it for retrieval and put().
+        """
+        result = self._get_exact(query)
+        if result is not None:
+            return result, None
+        query_vec = None
+        if self.similarity_threshold is not None and embed is not None:
+            query_vec = np.asarray(embed(query), dtype=np.float32)
+            result = self._get_similar(query_vec)
+        if result is None:
+            with self._lock:
+                self.misses += 1
+        return result, query_vec
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds
+
+    def _get_exact(self, query: str) -> Dict[str, Any] | None:
+        """Cached result for the same normalized question, or None."""
+        key = normalize_question(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[2]):
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return copy.deepcopy(entry[0])
+
+    def _get_similar(self, query_vec: np.ndarray) -> Dict[str, Any] | None:
+        """Cached result of the most similar earlier question above the threshold, or None."""
+        with self._lock:
+            if self._entries:
+                if self._matrix is None:
+                    self._matrix_keys = [key for key, entry in self._entries.items() if entry[1] is not None]
+                    self._matrix = (
+                        np.vstack([self._entries[key][1] for key in self._matrix_keys])
+                        if self._matrix_keys else None
+                    )
+                if self._matrix is not None:
+                    similarities = self._matrix @ _unit(query_vec)
+                    for idx in np.argsort(-similarities):
+                        if similarities[idx] < self.similarity_threshold:
+                            break
+                        key = self._matrix_keys[idx]
+                        entry = self._entries[key]
+                        if self._expired(entry[2]):
+                            continue
+                        self._entries.move_to_end(key)
+                        self.semantic_hits += 1
+                        return copy.deepcopy(entry[0])
+            return None
+
+    def put(self, query: str, query_vec: np.ndarray | None, result: Dict[str, Any], fingerprint: str | None) -> bool:
+        """
+        Cache a result generated against the documents of `fingerprint`. It is
+        dropped (and False returned) when the cache has been bound to another
+        document set since, so an answer from replaced documents is never served.
+        """
+        key = normalize_question(query)
+        vector = _unit(query_vec) if query_vec is not None else None
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                return False
+            self._entries[key] = (copy.deepcopy(result), vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
@@ -1,27 +1,40 @@
 import os
 import sys
-from typing import Dict, List, Sequence, Any
+import uuid
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple, Any
 
+from langchain_community.vectorstores import FAISS
 from langchain_ollama import ChatOllama
 from langchain_core.documents import Document
 from langchain_core.messages import SystemMessage, HumanMessage
 
 from src.exception import MyException
-from src.ingestion.extractor import DocumentExtractor
-from src.ingestion.loaders import DocumentLoader
+from src.ingestion.parallel import stream_documents
+from src.ingestion.web_fetcher import WebFetcher, is_url
 from src.logger import logging
-from src.preprocessing.clean_normalize import DocumentNormalizationAndCleaning
-from src.preprocessing.chunking import DocumentChunker
 from src.rag import prompts
+from src.rag.answer_cache import AnswerCache
 from src.retrieval.reranker import CrossEncoderReranker
 from src.retrieval.retriever import RerankMMRRetriever
+from src.retrieval.score_cache import ScoreCache
 from src.utils.main_utils import (
     num_tokens_from_string,
     load_configs,
     build_context,
     extract_sources,
+    count_documents,
+    document_fingerprint,
+    documents_fingerprint,
+)
+from src.vectorstore.faiss_store import (
+    FaissVectorStore,
+    exact_vectors_of,
+    index_kind,
+    index_precision,
+    lexical_index_of,
+    tombstones_of,
 )
-from src.vectorstore.faiss_store import FaissVectorStore
 
 
 class RAGPipeline:
@@ -48,18 +61,71 @@ class RAGPipeline:
         self.llm = ChatOllama(**llm_kwargs)
 
         retr_cfg = self.config.get("retrieval", {})
+        score_cache_cfg = retr_cfg.get("score_cache") or {}
         self.reranker = CrossEncoderReranker(
-            model_name=retr_cfg.get("reranker_model")
+            model_name=retr_cfg.get("reranker_model"),
+            backend=retr_cfg.get("reranker_backend", "torch"),
+            onnx_options=retr_cfg.get("onnx"),
+            batch_size=retr_cfg.get("rerank_batch_size", 32),
+            max_length=retr_cfg.get("rerank_max_length", 512),
+            workers=retr_cfg.get("rerank_workers", 0),
+            worker_options={
+                "threads_per_worker": retr_cfg.get("rerank_threads_per_worker"),
+                "max_batch_pairs": retr_cfg.get("rerank_max_batch_pairs", 256),
+                "max_wait_ms": retr_cfg.get("rerank_max_wait_ms", 5.0),
+            },
+            cache=ScoreCache(
+                max_entries=score_cache_cfg.get("max_entries", 50_000),
+                ttl_seconds=score_cache_cfg.get("ttl_seconds"),
+            ) if score_cache_cfg.get("enabled") else None,
+        )
+
+        web_cfg = self.config.get("pipeline", {}).get("web_fetch") or {}
+        self.web_fetcher = WebFetcher(
+            cache_dir=web_cfg.get("cache_dir") or "artifacts/web_cache",
+            max_connections=web_cfg.get("max_connections", 32),
+            max_connections_per_host=web_cfg.get("max_connections_per_host", 6),
+            timeout_seconds=web_cfg.get("timeout_seconds", 30),
+            max_sitemap_depth=web_cfg.get("max_sitemap_depth", 3),
+            user_agent=web_cfg.get("user_agent"),
+            max_cache_age_days=web_cfg.get("max_cache_age_days"),
+            max_cache_mb=web_cfg.get("max_cache_mb"),
         )
 
+        self.faiss_store = FaissVectorStore(
+            self.config.get("embedding", {}), self.config.get("vectorstore", {})
+        )
         self.vector_store = None
         self.retriever = None
+        self.fingerprint = None
+        # doc fingerprint -> {"path": ..., "ids": [docstore ids of its chunks]}
+        self.document_index: Dict[str, Dict[str, Any]] = {}
+        self._deleted_since_compaction = 0
+        # path -> error message of documents that failed in the last prepare_vector_store()
+        self.ingestion_errors: Dict[str, str] = {}
+        # Counts of cascade rerank paths taken, kept across retriever rebuilds
+        self.cascade_paths: Counter = Counter()
+
+        answer_cache_cfg = gen_cfg.get("answer_cache") or {}
+        self.answer_cache = AnswerCache(
+            max_entries=answer_cache_cfg.get("max_entries", 1000),
+            ttl_seconds=answer_cache_cfg.get("ttl_seconds"),
+            similarity_threshold=answer_cache_cfg.get("similarity_threshold"),
+        ) if answer_cache_cfg.get("enabled") else None
 
     # ----------------------------
     # Data preparation
     # ----------------------------
     def prepare_vector_store(self) -> None:
-        """Load documents, clean, chunk, and build FAISS vector store."""
+        """
+        Load documents, clean, chunk, and build FAISS vector store.
+
+        If a vector store already exists, only documents added to or removed from
+        the configured set are processed; unchanged documents keep their vectors.
+        Documents that fail to process are skipped and listed in `ingestion_errors`;
+        they are retried on the next call. Web pages are revalidated first, so a page
+        that changed is re-embedded and one that did not is kept.
+        """
         try:
             docs_cfg = self.config.get("documents", [])
             if not docs_cfg:
@@ -69,54 +135,304 @@ class RAGPipeline:
             target_chunk_size = chunk_cfg.get("target_chunk_size")
             chunk_overlap = chunk_cfg.get("chunk_overlap")
             
+            docs_cfg, fetch_errors = self._fetch_web_documents(docs_cfg)
             logging.info("Starting vector store preparation with %d document(s)", len(docs_cfg))
 
-            # Initialize processing components
-            loader = DocumentLoader()
-            extractor = DocumentExtractor()
-            cleaner = DocumentNormalizationAndCleaning()
-            chunker = DocumentChunker()
+            pipeline_cfg = self.config.get("pipeline", {})
+            rebuild = pipeline_cfg.get("rebuild_vectorstore", False)
+            artifacts_dir = pipeline_cfg.get("artifacts_dir")
 
-            # Process each document
-            all_chunks = []
-            for idx, doc_info in enumerate(docs_cfg, 1):
-                if not doc_info.get("enabled", True):
+            # Key each enabled document by its content fingerprint. Disabled documents are
+            # not read at all: they are not indexed, so they do not change the fingerprint either
+            enabled_docs = []
+            for doc_info in docs_cfg:
+                if doc_info.get("enabled", True):
+                    enabled_docs.append(doc_info)
+                else:
                     logging.info("Skipping disabled document: %s", doc_info.get("path", "unknown"))
+            doc_keys = {doc.get("path", ""): document_fingerprint(doc) for doc in enabled_docs}
+            fingerprint = documents_fingerprint(enabled_docs, known=doc_keys)
+            target_docs: Dict[str, dict] = {}
+            for doc_info in enabled_docs:
+                if doc_info.get("path", "") in fetch_errors:
                     continue
-                
-                path = doc_info["path"]
-                logging.info("[%d/%d] Processing document: %s", idx, len(docs_cfg), path)
-
-                try:
-                    # Pipeline: load -> extract -> clean -> chunk
-                    loaded = loader.load_document(path)
-                    extracted = extractor.extract_document_info(loaded, path)
-                    cleaned = cleaner.initialize_document_normalizer(extracted)
-                    chunks = chunker.chunk_document(cleaned, target_chunk_size, chunk_overlap)
-                    
-                    logging.info("Generated %d chunks from document: %s", len(chunks), path)
-                    all_chunks.extend(chunks)
-                except Exception as e:
-                    logging.error("Failed to process document %s: %s", path, e)
-                    raise MyException(f"Error processing document {path}: {e}", sys)
-
-            if not all_chunks:
+                target_docs.setdefault(doc_keys[doc_info.get("path", "")], doc_info)
+
+            if (
+                self.vector_store is not None
+                and fingerprint == self.fingerprint
+                and not rebuild
+                and not self.ingestion_errors
+            ):
+                logging.info("Document set unchanged; reusing the current vector store.")
+                return
+
+            artifact_dir = (
+                FaissVectorStore.artifact_path(artifacts_dir, fingerprint) if artifacts_dir else None
+            )
+            artifact_settings = {
+                "fingerprint": fingerprint,
+                "target_chunk_size": target_chunk_size,
+                "chunk_overlap": chunk_overlap,
+            }
+
+            self.ingestion_errors = dict(fetch_errors)
+            # Reuse a persisted index for the same document set instead of re-embedding
+            loaded_artifact = None
+            if artifact_dir and not rebuild:
+                loaded_artifact = self.faiss_store.load_vector_store(artifact_dir, artifact_settings)
+            outdated = False
+            if loaded_artifact is not None:
+                outdated = self.faiss_store.is_outdated(*loaded_artifact)
+                if outdated and not self.faiss_store.rebuilds_exactly(loaded_artifact[0]):
+                    # Rebuilding from lossy codes would carry their error into the new index
+                    logging.info("Index settings changed and the artifact holds only compressed vectors; re-embedding")
+                    self.faiss_store.release(loaded_artifact[0])
+                    loaded_artifact = None
+            if loaded_artifact is not None:
+                self.vector_store, manifest = loaded_artifact
+                self.document_index = manifest.get("document_index", {})
+                # Deletes saved as HNSW tombstones still count towards the next compaction
+                self._deleted_since_compaction = len(tombstones_of(self.vector_store))
+                logging.info("Vector store loaded from artifact with %d chunks", manifest.get("num_chunks", 0))
+                if not outdated:
+                    self._activate_index(fingerprint)
+                    return
+                # Same documents, other index settings: rebuild from the stored vectors and save again
+                logging.info("Index settings changed since the artifact was saved; rebuilding the index")
+                self.faiss_store.compact(self.vector_store)
+            elif self.vector_store is not None and not rebuild:
+                self._update_vector_store(target_docs, target_chunk_size, chunk_overlap)
+            else:
+                self._build_vector_store(target_docs, target_chunk_size, chunk_overlap)
+
+            num_chunks = count_documents(self.vector_store)
+            if num_chunks == 0:
                 raise MyException("No chunks generated; check document config and ensure documents are enabled.", sys)
 
-            # Create vector store and retriever
-            logging.info("Creating vector store with %d total chunks...", len(all_chunks))
-            self.vector_store = FaissVectorStore().create_vector_store(all_chunks)
-            self.retriever = RerankMMRRetriever(self.vector_store, self.reranker)
-            logging.info("Vector store prepared successfully with %d chunks", len(all_chunks))
+            self._activate_index(fingerprint)
+            logging.info("Vector store prepared successfully with %d chunks", num_chunks)
+
+            if self.ingestion_errors:
+                # The artifact is keyed by the full document set, which this index does not hold
+                logging.warning(
+                    "%d document(s) failed; not persisting the vector store", len(self.ingestion_errors)
+                )
+            elif artifact_dir:
+                self.faiss_store.save_vector_store(
+                    self.vector_store,
+                    artifact_dir,
+                    {
+                        **artifact_settings,
+                        "num_chunks": num_chunks,
+                        "index_type": index_kind(self.vector_store.index),
+                        "vector_precision": index_precision(self.vector_store.index),
+                        "documents": [doc.get("path") for doc in docs_cfg],
+                        "document_index": self.document_index,
+                    },
+                )
+                FaissVectorStore.prune_artifacts(
+                    artifacts_dir, fingerprint, pipeline_cfg.get("keep_previous_artifacts", 1)
+                )
         except Exception as e:
             logging.exception("Failed to prepare vector store: %s", e)
             raise MyException(e, sys)
 
+    def _fetch_web_documents(self, docs_cfg: List[dict]) -> Tuple[List[dict], Dict[str, str]]:
+        """
+        Fetch the enabled URL documents concurrently through the web cache. A sitemap
+        entry (`{"path": <sitemap url>, "sitemap": true}`) stands for every page it lists.
+
+        Returns:
+            The documents, with sitemaps replaced by their pages and each fetched page
+            carrying the `content_hash` of its body (unchanged pages cost a 304 and keep
+            their hash, hence their key), and path -> error of what could not be fetched.
+        """
+        web_docs = [doc for doc in docs_cfg if doc.get("enabled", True) and is_url(doc.get("path", ""))]
+        if not web_docs:
+            return docs_cfg, {}
+        results = self.web_fetcher.fetch(
+            [doc["path"] for doc in web_docs if not doc.get("sitemap")],
+            [doc["path"] for doc in web_docs if doc.get("sitemap")],
+        )
+
+        resolved: List[dict] = []
+        errors: Dict[str, str] = {}
+        for doc in docs_cfg:
+            path = doc.get("path", "")
+            if not (doc.get("enabled", True) and is_url(path)):
+                resolved.append(doc)
+                continue
+            page_docs = [doc]
+            if doc.get("sitemap"):
+                if "pages" not in results[path]:
+                    errors[path] = results[path]["error"]
+                    resolved.append(doc)
+                    continue
+                page_docs = [{"path": page, "enabled": True} for page in results[path]["pages"]]
+            for page_doc in page_docs:
+                result = results[page_doc["path"]]
+                if result["content_hash"] is None:
+                    errors[page_doc["path"]] = result["error"]
+                    resolved.append(page_doc)
+                else:
+                    resolved.append({**page_doc, "content_hash": result["content_hash"]})
+        return resolved, errors
+
+    def _activate_index(self, fingerprint: str) -> None:
+        """
+        Serve queries from the current vector store, built for the given document-set
+        fingerprint. Exact vector files of the store served before, or replaced by
+        rebuilds, are closed once the new retriever is in place.
+        """
+        previous = self.retriever.vector_store if self.retriever is not None else None
+        self.retriever = self._make_retriever()
+        self.faiss_store.release(previous if previous is not self.vector_store else None)
+        self.fingerprint = fingerprint
+        # Cached rerank scores and answers belong to the previous document set
+        if self.reranker.cache is not None:
+            self.reranker.cache.set_fingerprint(fingerprint)
+        if self.answer_cache is not None:
+            self.answer_cache.set_fingerprint(fingerprint)
+
+    def _make_retriever(self) -> RerankMMRRetriever:
+        """Create the retriever over the current vector store."""
+        vs_cfg = self.config.get("vectorstore", {})
+        return RerankMMRRetriever(
+            self.vector_store,
+            self.reranker,
+            exact_vectors=exact_vectors_of(self.vector_store),
+            rescore_oversample=vs_cfg.get("rescore_oversample", 3),
+            lexical_index=lexical_index_of(self.vector_store),
+            cascade_paths=self.cascade_paths,
+        )
+
+    def _ingest_documents(
+        self, vector_store: FAISS | None, docs: Dict[str, dict], target_chunk_size: int, chunk_overlap: int
+    ) -> Tuple[FAISS | None, Dict[str, List[str]]]:
+        """
+        Stream load -> extract -> clean -> chunk for each document into `vector_store`.
+
+        Pages are parsed by worker processes (pipeline.ingestion_workers) or a background
+        thread, the pages of long PDFs by pipeline.pdf_page_workers processes, and their chunks are embedded and added in batches of
+        pipeline.ingestion_batch_size while later pages are still being parsed. A new
+        store starts as an exact flat index and is rebuilt as the configured index type
+        once everything is added. A document that fails is logged, recorded in
+        `ingestion_errors` and its already added chunks are removed again.
+
+        Returns:
+            The store (created when `vector_store` is None and anything was added) and
+            the docstore ids of each document that was processed, keyed like `docs`.
+        """
+        pipeline_cfg = self.config.get("pipeline", {})
+        keys = list(docs)
+        paths = [docs[key]["path"] for key in keys]
+        creating = vector_store is None
+        ids_by_doc: Dict[str, List[str]] = {}
+        logging.info("Processing %d document(s)", len(paths))
+
+        for position, chunks, error in stream_documents(
+            paths,
+            target_chunk_size,
+            chunk_overlap,
+            workers=pipeline_cfg.get("ingestion_workers"),
+            batch_size=pipeline_cfg.get("ingestion_batch_size", 256),
+            queue_size=pipeline_cfg.get("ingestion_queue_size", 4),
+            page_workers=pipeline_cfg.get("pdf_page_workers"),
+            pages_per_task=pipeline_cfg.get("pdf_pages_per_task", 32),
+            web_cache_dir=self.web_fetcher.cache.root,
+            parallel_min_pages=pipeline_cfg.get("pdf_parallel_min_pages", 300),
+        ):
+            doc_key, path = keys[position], paths[position]
+            doc_ids = ids_by_doc.setdefault(doc_key, [])
+            if chunks:
+                ids = [str(uuid.uuid4()) for _ in chunks]
+                if vector_store is None:
+                    # Flat until the final size is known; IVF/SQ8/PQ also need it for training
+                    vector_store = self.faiss_store.create_vector_store(
+                        chunks, ids=ids, index_type="flat", precision="fp32"
+                    )
+                else:
+                    self.faiss_store.add_documents(vector_store, chunks, ids=ids)
+                doc_ids.extend(ids)
+            elif error is not None:
+                logging.error("[%d/%d] Failed to process document %s: %s", position + 1, len(paths), path, error)
+                self.ingestion_errors[path] = error
+                del ids_by_doc[doc_key]
+                if doc_ids:
+                    self.faiss_store.delete_documents(vector_store, doc_ids)
+            else:
+                logging.info(
+                    "[%d/%d] Added %d chunks from document: %s", position + 1, len(paths), len(doc_ids), path
+                )
+
+        if creating and vector_store is not None and self.faiss_store.needs_rebuild(vector_store):
+            self.faiss_store.compact(vector_store)
+        return vector_store, ids_by_doc
+
+    def _build_vector_store(
+        self, docs: Dict[str, dict], target_chunk_size: int, chunk_overlap: int
+    ) -> None:
+        """Build a fresh vector store over all documents, recording which ids each one owns."""
+        vector_store, ids_by_doc = self._ingest_documents(None, docs, target_chunk_size, chunk_overlap)
+        if vector_store is None or count_documents(vector_store) == 0:
+            if self.ingestion_errors:
+                failures = "; ".join(f"{path}: {error}" for path, error in self.ingestion_errors.items())
+                raise MyException(f"Every document failed to process. {failures}", sys)
+            raise MyException("No chunks generated; check document config and ensure documents are enabled.", sys)
+
+        logging.info("Built vector store with %d total chunks", count_documents(vector_store))
+        self.vector_store = vector_store
+        self.document_index = {
+            doc_key: {"path": docs[doc_key]["path"], "ids": ids} for doc_key, ids in ids_by_doc.items()
+        }
+        self._deleted_since_compaction = 0
+
+    def _update_vector_store(
+        self, docs: Dict[str, dict], target_chunk_size: int, chunk_overlap: int
+    ) -> None:
+        """Apply the difference between the indexed and the configured documents in place."""
+        removed_keys = [key for key in self.document_index if key not in docs]
+        added_docs = {key: doc for key, doc in docs.items() if key not in self.document_index}
+        logging.info(
+            "Incremental update: %d document(s) to add, %d to remove, %d unchanged",
+            len(added_docs),
+            len(removed_keys),
+            len(docs) - len(added_docs),
+        )
+
+        # Unchanged documents may have been re-uploaded under a new path
+        for key, doc in docs.items():
+            if key in self.document_index:
+                self.document_index[key]["path"] = doc["path"]
+
+        removed_ids: List[str] = []
+        for key in removed_keys:
+            removed_ids.extend(self.document_index.pop(key)["ids"])
+        self.faiss_store.delete_documents(self.vector_store, removed_ids)
+        self._deleted_since_compaction += len(removed_ids)
+
+        _, ids_by_doc = self._ingest_documents(self.vector_store, added_docs, target_chunk_size, chunk_overlap)
+        for doc_key, ids in ids_by_doc.items():
+            self.document_index[doc_key] = {"path": docs[doc_key]["path"], "ids": ids}
+
+        # Periodically rebuild the index once enough of it has been deleted, or when the
+        # corpus has grown past the point where a different index type is configured
+        threshold = self.config.get("pipeline", {}).get("compaction_threshold")
+        live = count_documents(self.vector_store)
+        too_many_deleted = (
+            threshold is not None
+            and self._deleted_since_compaction > threshold * (live + self._deleted_since_compaction)
+        )
+        if too_many_deleted or self.faiss_store.needs_rebuild(self.vector_store):
+            self.faiss_store.compact(self.vector_store)
+            self._deleted_since_compaction = 0
+
     # ----------------------------
     # Retrieval + Routing
     # ----------------------------
-    def retrieve(self, query: str) -> List[Document]:
-        """Retrieve relevant documents for a query."""
+    def retrieve(self, query: str, query_vec: Any = None) -> List[Document]:
+        """Retrieve relevant documents for a query (optionally with its precomputed embedding)."""
         if self.retriever is None:
             raise MyException("Retriever not initialized. Call prepare_vector_store().", sys)
 
@@ -127,12 +443,16 @@ class RAGPipeline:
         retrieve_kwargs = {}
         
         # Add retrieval parameters if present in config
-        optional_keys = ["lambda_mult", "initial_k", "rerank_k", "mmr_k", "initial_pct", "rerank_pct", "mmr_pct", "min_chunk"]
+        optional_keys = [
+            "lambda_mult", "initial_k", "rerank_k", "mmr_k", "initial_pct", "rerank_pct", "mmr_pct", "min_chunk",
+            "initial_k_min", "initial_k_max", "rerank_k_min", "rerank_k_max", "mmr_k_min", "mmr_k_max",
+            "min_similarity", "fusion_k", "rrf_k", "cascade", "cascade_margin", "cascade_band",
+        ]
         for key in optional_keys:
             if key in retr_cfg:
                 retrieve_kwargs[key] = retr_cfg[key]
 
-        documents = self.retriever.retrieve(query, **retrieve_kwargs)
+        documents = self.retriever.retrieve(query, query_vec=query_vec, **retrieve_kwargs)
         logging.info("Retrieved %d documents for query", len(documents))
         return documents
 
@@ -142,23 +462,42 @@ class RAGPipeline:
         return result.get("answer", "")
 
     def answer_with_sources(self, query: str) -> Dict[str, Any]:
-        """Retrieve context and generate an answer with sources."""
+        """
+        Retrieve context and generate an answer with sources.
+
+        Answers to the same or a near-identical earlier question about the current
+        document set come from the answer cache; "cache_hit" says which it was.
+        """
         try:
             query_preview = query[:100] if len(query) > 100 else query
             logging.info("Generating answer for query: %s", query_preview)
-            
-            documents = self.retrieve(query)
+
+            query_vec = None
+            if self.answer_cache is not None:
+                # The document set the answer is generated against; re-indexing may replace it meanwhile
+                fingerprint = self.answer_cache.fingerprint
+                cached, query_vec = self.answer_cache.lookup(query, self.faiss_store.embedder.embed_query)
+                if cached is not None:
+                    logging.info("Answer cache hit for query: %s", query_preview)
+                    return {**cached, "cache_hit": True}
+
+            documents = self.retrieve(query, query_vec=query_vec)
             if not documents:
                 logging.warning("No documents retrieved for query: %s", query)
                 return {
                     "answer": "I don't have enough information to answer this question based on the provided documents.",
-                    "sources": []
+                    "sources": [],
+                    "cache_hit": False,
                 }
 
             gen_cfg = self.config.get("generation", {})
             token_limit = gen_cfg.get("stuff_context_token_limit")
             
-            total_tokens = sum(num_tokens_from_string(doc.page_content) for doc in documents)
+            # Chunks carry their token count from ingestion; older artifacts are counted here
+            total_tokens = sum(
+                doc.metadata.get("token_count") or num_tokens_from_string(doc.page_content)
+                for doc in documents
+            )
             logging.info("Total context tokens: %d (limit: %d)", total_tokens, token_limit)
             
             # Choose strategy based on token count
@@ -170,7 +509,10 @@ class RAGPipeline:
             sources = extract_sources(documents, answer_text=answer)
             logging.info("Answer generated successfully (length: %d chars, sources: %d)", len(answer), len(sources))
             
-            return {"answer": answer, "sources": sources}
+            if self.answer_cache is not None:
+                if not self.answer_cache.put(query, query_vec, {"answer": answer, "sources": sources}, fingerprint):
+                    logging.info("Documents changed while answering; the answer is not cached")
+            return {"answer": answer, "sources": sources, "cache_hit": False}
         except Exception as e:
             logging.exception("Failed to generate answer: %s", e)
             raise MyException(e, sys)
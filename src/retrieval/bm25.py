@@ -0,0 +1,110 @@
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+BM25_FILE = "bm25.json"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens used for both indexing and querying."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index, keyed by docstore id.
+
+    Postings map each term to {doc_id: term frequency}, so a query only touches
+    the documents that contain one of its terms. Documents can be added and
+    removed one chunk at a time, which keeps the index in step with the vectors.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    @classmethod
+    def load(cls, directory: str) -> "BM25Index | None":
+        """Load an index saved with save(); None if the directory has none."""
+        path = os.path.join(directory, BM25_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.postings = data["postings"]
+        index.doc_lengths = data["doc_lengths"]
+        index._total_length = sum(index.doc_lengths.values())
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, ids: Sequence[str], texts: Iterable[str]) -> None:
+        for doc_id, text in zip(ids, texts):
+            if doc_id in self.doc_lengths:
+                self.remove([doc_id])
+            tokens = tokenize(text)
+            for term, freq in Counter(tokens).items():
+                self.postings.setdefault(term, {})[doc_id] = freq
+            self.doc_lengths[doc_id] = len(tokens)
+            self._total_length += len(tokens)
+
+    def remove(self, ids: Sequence[str]) -> None:
+        doomed = {doc_id for doc_id in ids if doc_id in self.doc_lengths}
+        if not doomed:
+            return
+        for term in list(self.postings):
+            docs = self.postings[term]
+            for doc_id in doomed.intersection(docs):
+                del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+        for doc_id in doomed:
+            self._total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top `k` (doc_id, score) pairs for the query, best first."""
+        num_docs = len(self.doc_lengths)
+        if num_docs == 0 or k <= 0:
+            return []
+        avg_length = self._total_length / num_docs or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, freq in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, directory: str) -> None:
+        with open(os.path.join(directory, BM25_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {"k1": self.k1, "b": self.b, "postings": self.postings, "doc_lengths": self.doc_lengths},
+                f,
+            )
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked id lists by reciprocal rank: each list adds 1 / (k + rank) to an id.
+
+    Returns (id, score) pairs, best first; ties keep first-seen order.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,70 @@
+from typing import List
+
+import numpy as np
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row; all-zero rows stay zero (cosine similarity 0)."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def cosine_similarities(query_vec: np.ndarray, doc_vecs: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every candidate row in `doc_vecs` to `query_vec`."""
+    doc_vecs = np.asarray(doc_vecs, dtype=np.float32)
+    if doc_vecs.ndim != 2 or doc_vecs.shape[0] == 0:
+        return np.empty(0, dtype=np.float32)
+    query = _normalize_rows(np.asarray(query_vec, dtype=np.float32).reshape(1, -1))[0]
+    return _normalize_rows(doc_vecs) @ query
+
+
+def maximal_marginal_relevance(
+    query_vec: np.ndarray,
+    doc_vecs: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Select `k` candidate indices by maximal marginal relevance.
+
+    Vectors are normalized once and all cosine similarities come from two
+    matrix products (candidates x query, candidates x candidates). A running
+    per-candidate max-similarity to the selected set turns every selection
+    step into a single vectorized argmax.
+
+    Args:
+        query_vec: Query embedding, shape (d,).
+        doc_vecs: Candidate embeddings, shape (n, d).
+        k: Number of candidates to select.
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0).
+
+    Returns:
+        Indices into `doc_vecs` in selection order.
+    """
+    doc_vecs = np.asarray(doc_vecs, dtype=np.float32)
+    n = doc_vecs.shape[0] if doc_vecs.ndim == 2 else 0
+    if n == 0 or k <= 0:
+        return []
+
+    docs = _normalize_rows(doc_vecs)
+    query = _normalize_rows(np.asarray(query_vec, dtype=np.float32).reshape(1, -1))[0]
+    relevance = docs @ query
+    similarity = docs @ docs.T
+
+    # The first pick is the most relevant candidate
+    first = int(np.argmax(relevance))
+    selected = [first]
+    max_similarity = similarity[first].copy()
+    available = np.ones(n, dtype=bool)
+    available[first] = False
+
+    relevance_term = lambda_mult * relevance
+    for _ in range(1, min(k, n)):
+        scores = relevance_term - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        available[chosen] = False
+        np.maximum(max_similarity, similarity[chosen], out=max_similarity)
+
+    return selected
@@ -0,0 +1,141 @@
+import inspect
+import os
+import sys
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.exception import MyException
+from src.logger import logging
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+
+def onnx_model_dir(cache_dir: str, model_name: str) -> str:
+    """Directory holding the exported ONNX files and tokenizer for a Hugging Face model."""
+    return os.path.join(cache_dir, model_name.replace("/", "--"))
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True) -> str:
+    """
+    Export a sequence-classification cross-encoder to ONNX, optionally with dynamic
+    int8 quantization of its weights, and save its tokenizer next to it.
+
+    Needs torch, transformers, onnx and onnxruntime; they are imported here so the
+    torch backend does not depend on the ONNX toolchain.
+
+    Returns:
+        str: path of the model file to load.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    logging.info("Exporting %s to ONNX in %s", model_name, output_dir)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["what is rag"], ["retrieval augmented generation"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes={
+                **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                "logits": {0: "batch"},
+            },
+            opset_version=14,
+            # Newer torch defaults to the dynamo exporter, which needs onnxscript
+            **({"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}),
+        )
+    tokenizer.save_pretrained(output_dir)
+    if not quantize:
+        return fp32_path
+
+    int8_path = os.path.join(output_dir, INT8_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    logging.info(
+        "Quantized ONNX model to int8: %.1f MB -> %.1f MB",
+        os.path.getsize(fp32_path) / 1e6,
+        os.path.getsize(int8_path) / 1e6,
+    )
+    return int8_path
+
+
+def ensure_onnx_model(model_name: str, cache_dir: str = "artifacts/onnx", quantize: bool = True) -> str:
+    """Path of the cached ONNX model, exporting it first if it is not there yet."""
+    model_path = os.path.join(onnx_model_dir(cache_dir, model_name), INT8_FILE if quantize else FP32_FILE)
+    if os.path.exists(model_path):
+        return model_path
+    return export_onnx(model_name, onnx_model_dir(cache_dir, model_name), quantize=quantize)
+
+
+class OnnxCrossEncoder:
+    """
+    CPU cross-encoder served by ONNX Runtime, with the same predict() contract
+    as sentence-transformers' CrossEncoder.
+
+    The model is exported (and int8-quantized) on first use and cached under
+    `cache_dir`, so later starts only load the ONNX file. Single-logit models
+    get a sigmoid, like CrossEncoder's default activation.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: str = "artifacts/onnx",
+        quantize: bool = True,
+        max_length: int = 512,
+        batch_size: int = 32,
+        num_threads: int | None = None,
+    ):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+
+            model_path = ensure_onnx_model(model_name, cache_dir, quantize)
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            self.session = ort.InferenceSession(
+                model_path, options, providers=["CPUExecutionProvider"]
+            )
+            self.input_names = [node.name for node in self.session.get_inputs()]
+            self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(model_path))
+            self.max_length = max_length
+            self.batch_size = max(1, batch_size)
+            logging.info("Loaded ONNX reranker from %s", model_path)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int | None = None) -> np.ndarray:
+        batch_size = batch_size or self.batch_size
+        outputs: List[np.ndarray] = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            encoded = self.tokenizer(
+                [query for query, _ in batch],
+                [text for _, text in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            outputs.append(self.session.run(None, feeds)[0])
+        if not outputs:
+            return np.empty(0, dtype=np.float32)
+
+        logits = np.concatenate(outputs).astype(np.float32)
+        if logits.shape[1] == 1:
+            return 1.0 / (1.0 + np.exp(-logits[:, 0]))
+        return logits
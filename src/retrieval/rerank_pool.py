@@ -0,0 +1,223 @@
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.exception import MyException
+from src.logger import logging
+
+# Reranker living in each worker process, loaded once by _init_worker
+_worker_reranker = None
+
+
+def _init_worker(reranker_kwargs: dict, threads: int) -> None:
+    """Load the model in a worker process, limited to `threads` compute threads."""
+    global _worker_reranker
+    # Set before torch / ONNX Runtime are imported so their thread pools honour it
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    kwargs = dict(reranker_kwargs)
+    if kwargs.get("backend") == "onnx":
+        kwargs["onnx_options"] = {**(kwargs.get("onnx_options") or {}), "num_threads": threads}
+
+    from src.retrieval.reranker import CrossEncoderReranker
+
+    _worker_reranker = CrossEncoderReranker(**kwargs)
+    if kwargs.get("backend", "torch") == "torch":
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def _score_pairs(pairs: List[Tuple[str, str]]) -> np.ndarray:
+    if not pairs:
+        return np.empty(0, dtype=np.float32)
+    return _worker_reranker._predict(pairs)
+
+
+class RerankWorkerPool:
+    """
+    Cross-encoder scoring spread over worker processes, each holding its own model.
+
+    predict() can be called from many threads at once. A dispatcher thread takes
+    pending requests, merges their pairs into one batch (up to `max_batch_pairs`,
+    waiting at most `max_wait_ms` for more) and sends it to the next free worker,
+    so concurrent queries share forward passes instead of queueing on one model.
+
+    If a worker dies (e.g. killed for memory), the pool is restarted once and the
+    affected batches are scored again; after a second failure, every batch is
+    scored by a CrossEncoderReranker loaded in this process instead.
+    """
+
+    def __init__(
+        self,
+        reranker_kwargs: dict,
+        num_workers: int,
+        threads_per_worker: int | None = None,
+        max_batch_pairs: int = 256,
+        max_wait_ms: float = 5.0,
+    ):
+        try:
+            self.num_workers = max(1, num_workers)
+            self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+            self.max_batch_pairs = max(1, max_batch_pairs)
+            self.max_wait = max_wait_ms / 1000
+            self.reranker_kwargs = reranker_kwargs
+            self.restarts_left = 1
+
+            if reranker_kwargs.get("backend") == "onnx":
+                # Export once here rather than racing the export in every worker
+                from src.retrieval.onnx_reranker import ensure_onnx_model
+
+                options = reranker_kwargs.get("onnx_options") or {}
+                ensure_onnx_model(
+                    reranker_kwargs["model_name"],
+                    options.get("cache_dir", "artifacts/onnx"),
+                    options.get("quantize", True),
+                )
+
+            self._executor: ProcessPoolExecutor | None = self._start_executor()
+            self._executor_lock = threading.Lock()
+            # In-process reranker used once the pool has failed for good, loaded on first use
+            self._local_reranker = None
+            self._local_lock = threading.Lock()
+            self._requests: "queue.Queue" = queue.Queue()
+            self._free_workers = threading.Semaphore(self.num_workers)
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="rerank-dispatch", daemon=True)
+            self._dispatcher.start()
+            logging.info(
+                "Started %d rerank worker processes with %d threads each",
+                self.num_workers,
+                self.threads_per_worker,
+            )
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.reranker_kwargs, self.threads_per_worker),
+        )
+        try:
+            # Starts every worker (spawned processes are created together) and waits for the models
+            executor.submit(_score_pairs, []).result()
+        except Exception:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        return executor
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int | None = None) -> np.ndarray:
+        """Scores for `pairs`, in order. Batch sizes are decided by the worker's reranker."""
+        if not pairs:
+            return np.empty(0, dtype=np.float32)
+        future: Future = Future()
+        self._requests.put((list(pairs), future))
+        return future.result()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            # While every worker is busy, new requests pile up and join this batch
+            self._free_workers.acquire()
+            batch = [request]
+            num_pairs = len(request[0])
+            deadline = time.monotonic() + self.max_wait
+            while num_pairs < self.max_batch_pairs:
+                try:
+                    request = self._requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._requests.put(None)
+                    break
+                batch.append(request)
+                num_pairs += len(request[0])
+
+            if len(batch) > 1:
+                logging.debug("Merged %d rerank requests into one batch of %d pairs", len(batch), num_pairs)
+            self._submit(batch)
+
+    def _submit(self, batch: list) -> None:
+        """Send a batch to the pool, or score it here once the pool has been given up."""
+        merged = [pair for pairs, _ in batch for pair in pairs]
+        executor = self._executor
+        if executor is None:
+            self._score_locally(batch, merged)
+            return
+        try:
+            job = executor.submit(_score_pairs, merged)
+        except BrokenProcessPool as e:
+            job = Future()
+            job.set_exception(e)
+        job.add_done_callback(partial(self._complete, batch, executor))
+
+    def _complete(self, batch: list, executor: ProcessPoolExecutor, job: Future) -> None:
+        error = job.exception()
+        if isinstance(error, BrokenProcessPool):
+            # Recovery restarts processes and may load a model: not on the pool's own thread
+            threading.Thread(target=self._recover, args=(batch, executor), name="rerank-recover", daemon=True).start()
+            return
+        self._free_workers.release()
+        if error is not None:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        self._resolve(batch, job.result())
+
+    def _recover(self, batch: list, broken: ProcessPoolExecutor) -> None:
+        """Replace the broken pool (once; afterwards fall back to local scoring) and retry the batch."""
+        with self._executor_lock:
+            # Every batch in flight fails with the pool: only the first one replaces it
+            if self._executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                if self.restarts_left > 0:
+                    self.restarts_left -= 1
+                    logging.warning("A rerank worker process died; restarting the pool")
+                    try:
+                        self._executor = self._start_executor()
+                    except Exception as e:
+                        logging.warning("Could not restart the rerank pool: %s", e)
+                if self._executor is None:
+                    logging.warning("Rerank worker pool failed; scoring in this process from now on")
+        self._submit(batch)
+
+    def _score_locally(self, batch: list, merged: List[Tuple[str, str]]) -> None:
+        try:
+            with self._local_lock:
+                if self._local_reranker is None:
+                    from src.retrieval.reranker import CrossEncoderReranker
+
+                    self._local_reranker = CrossEncoderReranker(**self.reranker_kwargs)
+                scores = self._local_reranker._predict(merged)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self._free_workers.release()
+        self._resolve(batch, scores)
+
+    @staticmethod
+    def _resolve(batch: list, scores: np.ndarray) -> None:
+        offset = 0
+        for pairs, future in batch:
+            future.set_result(scores[offset:offset + len(pairs)])
+            offset += len(pairs)
+
+    def close(self) -> None:
+        self._requests.put(None)
+        self._dispatcher.join(timeout=5)
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
@@ -1,63 +1,160 @@
 import sys
-from typing import List, Sequence
+from typing import List, Sequence, Tuple
 
+import numpy as np
 from langchain_core.documents import Document
-from sentence_transformers import CrossEncoder
 
 from src.exception import MyException
 from src.logger import logging
-
+from src.retrieval.score_cache import ScoreCache, content_hash, normalize_query
 
 class CrossEncoderReranker:
     """
     Lightweight cross-encoder based reranker.
 
     Performs re-ranking on a list of retrieved documents using a
-    sentence-transformers CrossEncoder model. Returns documents ordered
-    by the cross-encoder relevance score.
+    sentence-transformers CrossEncoder model (backend "torch") or the same
+    model exported to int8 ONNX and run by ONNX Runtime (backend "onnx").
+    Returns documents ordered by the cross-encoder relevance score. With a
+    ScoreCache, only (query, chunk) pairs that have not been scored before are
+    sent to the model. Pairs are scored in length-sorted batches, so each batch
+    pads to chunks of similar length. With `workers` > 0 the model runs in a
+    pool of worker processes instead (see RerankWorkerPool).
     """
 
     def __init__(
         self,
         model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
         device: str | None = None,
+        cache: ScoreCache | None = None,
+        backend: str = "torch",
+        onnx_options: dict | None = None,
+        batch_size: int = 32,
+        max_length: int | None = 512,
+        workers: int = 0,
+        worker_options: dict | None = None,
     ):
+        self.cache = cache
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
         try:
-            logging.info("Loading cross-encoder reranker model: %s", model_name)
-            self.model = CrossEncoder(model_name, device=device)
+            logging.info("Loading cross-encoder reranker model: %s (backend: %s)", model_name, backend)
+            if workers > 0:
+                from src.retrieval.rerank_pool import RerankWorkerPool
+
+                self.model = RerankWorkerPool(
+                    {
+                        "model_name": model_name,
+                        "device": device,
+                        "backend": backend,
+                        "onnx_options": onnx_options,
+                        "batch_size": batch_size,
+                        "max_length": max_length,
+                    },
+                    num_workers=workers,
+                    **(worker_options or {}),
+                )
+            elif backend == "torch":
+                from sentence_transformers import CrossEncoder
+
+                self.model = CrossEncoder(model_name, device=device, max_length=max_length)
+            elif backend == "onnx":
+                from src.retrieval.onnx_reranker import OnnxCrossEncoder
+
+                self.model = OnnxCrossEncoder(
+                    model_name, **{"max_length": max_length or 512, **(onnx_options or {})}
+                )
+            else:
+                raise ValueError(f"Unsupported reranker_backend '{backend}'. Expected 'torch' or 'onnx'.")
         except Exception as e:
             raise MyException(e, sys)
 
-    def rerank(
-        self, query: str, documents: Sequence[Document], top_k: int | None = None
-    ) -> List[Document]:
+    def rank(self, query: str, documents: Sequence[Document]) -> List[Tuple[int, float]]:
         """
-        Score and reorder candidate documents.
+        Score candidate documents against the query.
 
         Args:
             query: User query string.
             documents: Candidate documents to score.
-            top_k: Optional cap on number of documents to return.
 
         Returns:
-            Documents ordered by cross-encoder score (highest first).
+            (position in `documents`, score) pairs ordered by score (highest first),
+            so callers can carry per-candidate data alongside the ranking.
         """
         if not documents:
             return []
 
         try:
-            pairs = [(query, doc.page_content) for doc in documents]
-            scores = self.model.predict(pairs)
-            scored = sorted(
-                zip(documents, scores), key=lambda item: item[1], reverse=True
+            if self.cache is None:
+                scores = self._predict([(query, doc.page_content) for doc in documents])
+            else:
+                scores = self._cached_scores(query, documents)
+            return sorted(
+                ((idx, float(score)) for idx, score in enumerate(scores)),
+                key=lambda item: item[1],
+                reverse=True,
             )
-            if top_k is not None:
-                scored = scored[:top_k]
-            reranked_docs = [doc for doc, _ in scored]
-            logging.debug(
-                "Reranked %d documents, returning %d", len(documents), len(reranked_docs)
-            )
-            return reranked_docs
         except Exception as e:
             raise MyException(e, sys)
 
+    def _predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """
+        Score pairs in order of chunk length, so every batch of `batch_size` holds
+        chunks of similar length, then put the scores back in input order. Pairs
+        longer than max_length tokens are truncated by the model's tokenizer.
+        """
+        order = sorted(range(len(pairs)), key=lambda idx: len(pairs[idx][1]))
+        sorted_scores = self.model.predict([pairs[idx] for idx in order], batch_size=self.batch_size)
+        scores = np.empty(len(pairs), dtype=np.float32)
+        scores[order] = np.asarray(sorted_scores, dtype=np.float32).reshape(len(pairs))
+        return scores
+
+    def _cached_scores(self, query: str, documents: Sequence[Document]) -> List[float]:
+        """Scores for every document, predicting only the pairs missing from the cache."""
+        query_key = normalize_query(query)
+        keys = [content_hash(doc.page_content) for doc in documents]
+        texts = dict(zip(keys, (doc.page_content for doc in documents)))
+        scores = self.cache.get_many(query_key, texts)
+        missing = [key for key in texts if key not in scores]
+        if missing:
+            predicted = self._predict([(query, texts[key]) for key in missing])
+            new_scores = {key: float(score) for key, score in zip(missing, predicted)}
+            self.cache.put_many(query_key, new_scores)
+            scores.update(new_scores)
+        logging.debug(
+            "Rerank cache: %d of %d pairs scored by the model", len(missing), len(texts)
+        )
+        return [scores[key] for key in keys]
+
+    def cache_stats(self) -> dict | None:
+        """Hit/miss counters of the score cache, or None when caching is off."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def close(self) -> None:
+        """Stop the worker processes, if the model runs in a pool."""
+        if hasattr(self.model, "close"):
+            self.model.close()
+
+    def rerank(
+        self, query: str, documents: Sequence[Document], top_k: int | None = None
+    ) -> List[Document]:
+        """
+        Score and reorder candidate documents.
+
+        Args:
+            query: User query string.
+            documents: Candidate documents to score.
+            top_k: Optional cap on number of documents to return.
+
+        Returns:
+            Documents ordered by cross-encoder score (highest first).
+        """
+        scored = self.rank(query, documents)
+        if top_k is not None:
+            scored = scored[:top_k]
+        reranked_docs = [documents[idx] for idx, _ in scored]
+        logging.debug(
+            "Reranked %d documents, returning %d", len(documents), len(reranked_docs)
+        )
+        return reranked_docs
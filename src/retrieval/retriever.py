@@ -1,6 +1,8 @@
 import sys
-from typing import List, Sequence
+from collections import Counter
+from typing import List, Sequence, Tuple
 
+import faiss
 import numpy as np
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
@@ -8,14 +10,23 @@ from langchain_community.vectorstores import FAISS
 
 from src.exception import MyException
 from src.logger import logging
+from src.retrieval.bm25 import BM25Index, reciprocal_rank_fusion
+from src.retrieval.mmr import cosine_similarities, maximal_marginal_relevance
 from src.retrieval.reranker import CrossEncoderReranker
 from src.utils.main_utils import compute_k, count_documents
+from src.vectorstore.exact_vectors import ExactVectorStore
+from src.vectorstore.faiss_store import reconstruct_vectors, search_index
 
 
 class RerankMMRRetriever:
     """
     Retrieve -> rerank -> diversify (MMR) pipeline built around FAISS.
 
+    With a BM25 lexical index, the first stage is hybrid: vector and BM25 rankings
+    are fused by reciprocal rank, and only the top of the fused list is reranked.
+    In cascade mode, the cross-encoder only scores candidates whose vector
+    similarity is too close to the rerank cut-off to call.
+
     Usage:
         retriever = RerankMMRRetriever(vector_store, reranker)
         docs = retriever.retrieve("query")
@@ -26,10 +37,24 @@ class RerankMMRRetriever:
         vector_store: FAISS,
         reranker: CrossEncoderReranker,
         embedder: Embeddings | None = None,
+        exact_vectors: ExactVectorStore | None = None,
+        rescore_oversample: int = 3,
+        lexical_index: BM25Index | None = None,
+        cascade_paths: Counter | None = None,
     ):
         self.vector_store = vector_store
         self.reranker = reranker
         self.embedder = embedder or getattr(vector_store, "embedding_function", None)
+        # Full-precision vectors used to re-score candidates from a compressed index
+        self.exact_vectors = exact_vectors
+        self.rescore_oversample = max(1, rescore_oversample)
+        self.lexical_index = lexical_index
+        # How often each cascade path (skipped / partial / full) was taken
+        self.cascade_paths = cascade_paths if cascade_paths is not None else Counter()
+        self._positions_by_id = (
+            {doc_id: position for position, doc_id in vector_store.index_to_docstore_id.items()}
+            if lexical_index is not None else {}
+        )
 
         if self.embedder is None:
             raise MyException("No embedding function available for MMR.", sys)
@@ -43,9 +68,25 @@ class RerankMMRRetriever:
         mmr_pct: float | None = None,
         lambda_mult: float = 0.5,
         min_chunk: int | None = None,
+        initial_k: int | None = None,
+        rerank_k: int | None = None,
+        mmr_k: int | None = None,
+        initial_k_min: int | None = None,
+        initial_k_max: int | None = None,
+        rerank_k_min: int | None = None,
+        rerank_k_max: int | None = None,
+        mmr_k_min: int | None = None,
+        mmr_k_max: int | None = None,
+        min_similarity: float | None = None,
+        fusion_k: int | None = None,
+        rrf_k: int = 60,
+        cascade: bool = False,
+        cascade_margin: float = 0.08,
+        cascade_band: float = 0.05,
+        query_vec: np.ndarray | None = None,
     ) -> List[Document]:
         """
-        Run vector search -> rerank -> MMR over the reranked set.
+        Run vector search (fused with BM25 when available) -> rerank -> MMR over the reranked set.
 
         Args:
             query: Search query.
@@ -54,6 +95,22 @@ class RerankMMRRetriever:
             mmr_pct: Percentage of rerank_k to keep after MMR.
             lambda_mult: Trade-off for MMR (1.0 = purely relevance).
             min_chunk: If total chunks <= min_chunk, skip rerank/MMR and return all.
+            initial_k / rerank_k / mmr_k: Absolute stage sizes; override the percentages.
+            *_k_min / *_k_max: Floors and caps applied to each stage size, so per-query
+                cost stays bounded as the corpus grows.
+            min_similarity: Drop first-stage candidates whose cosine similarity to
+                the query is below this before they reach the reranker.
+            fusion_k: Hybrid only: number of fused candidates passed to the reranker
+                (defaults to initial_k). BM25 and vector search each return initial_k.
+            rrf_k: Hybrid only: reciprocal-rank-fusion constant; larger values flatten
+                the advantage of top ranks.
+            cascade: Rank candidates by vector similarity first and only send the
+                uncertain ones to the cross-encoder.
+            cascade_margin: Skip the cross-encoder when the similarity gap at the
+                rerank_k cut-off is at least this large.
+            cascade_band: Candidates within this similarity distance of the cut-off
+                are reranked; those clearly above or below it keep their vector rank.
+            query_vec: Embedding of `query` when the caller already has it.
         """
         try:
             total_docs = count_documents(self.vector_store)
@@ -62,6 +119,11 @@ class RerankMMRRetriever:
             if total_docs == 0:
                 logging.warning("Vector store is empty. No documents to retrieve.")
                 return []
+
+            # The query is embedded once; the same vector drives search and MMR
+            if query_vec is None:
+                query_vec = self._embed_query(query)
+            query_vec = np.asarray(query_vec, dtype=np.float32)
             
             # Short-circuit for small corpora
             if min_chunk is not None and total_docs <= min_chunk:
@@ -70,22 +132,35 @@ class RerankMMRRetriever:
                     total_docs,
                     min_chunk,
                 )
-                return self.vector_store.similarity_search(query, k=total_docs)
+                docs, _ = self._vector_search(query_vec, total_docs)
+                return docs
             
             initial_k_final = compute_k(
                 total=total_docs,
                 pct=initial_pct,
                 upper_bound=total_docs,
+                k=initial_k,
+                k_min=initial_k_min,
+                k_max=initial_k_max,
             )
+            candidate_k = initial_k_final
+            if self.lexical_index is not None and fusion_k is not None:
+                candidate_k = max(1, min(fusion_k, initial_k_final))
             rerank_k_final = compute_k(
-                total=initial_k_final,
+                total=candidate_k,
                 pct=rerank_pct,
-                upper_bound=initial_k_final,
+                upper_bound=candidate_k,
+                k=rerank_k,
+                k_min=rerank_k_min,
+                k_max=rerank_k_max,
             )
             mmr_k_final = compute_k(
                 total=rerank_k_final,
                 pct=mmr_pct,
                 upper_bound=rerank_k_final,
+                k=mmr_k,
+                k_min=mmr_k_min,
+                k_max=mmr_k_max,
             )
 
             if initial_k_final <= 0:
@@ -100,16 +175,46 @@ class RerankMMRRetriever:
                 logging.warning("Computed mmr_k is 0. Adjusting to use at least 1 document.")
                 mmr_k_final = min(1, rerank_k_final)
 
-            initial_docs = self.vector_store.similarity_search(query, k=initial_k_final)
+            initial_docs, initial_positions = self._vector_search(query_vec, initial_k_final)
             logging.info(
                 "Initial vector search returned %d docs (k=%d)",
                 len(initial_docs),
                 initial_k_final,
             )
+            if self.lexical_index is not None:
+                initial_docs, initial_positions = self._fuse_lexical(
+                    query, initial_docs, initial_positions, initial_k_final, candidate_k, rrf_k
+                )
+                logging.info(
+                    "Hybrid fusion kept %d candidates (fusion_k=%d, rrf_k=%d)",
+                    len(initial_docs),
+                    candidate_k,
+                    rrf_k,
+                )
 
-            reranked_docs = self.reranker.rerank(
-                query, initial_docs, top_k=rerank_k_final
-            )
+            initial_vecs = self._get_vectors(initial_positions)
+            if min_similarity is not None and initial_docs:
+                keep = np.flatnonzero(
+                    cosine_similarities(query_vec, initial_vecs) >= min_similarity
+                )
+                initial_docs = [initial_docs[idx] for idx in keep]
+                initial_vecs = initial_vecs[keep]
+                logging.info(
+                    "%d docs passed the similarity cutoff (min_similarity=%.3f)",
+                    len(initial_docs),
+                    min_similarity,
+                )
+                if not initial_docs:
+                    return []
+
+            if cascade:
+                ranked = self._cascade_rank(
+                    query, query_vec, initial_docs, initial_vecs, rerank_k_final, cascade_margin, cascade_band
+                )
+            else:
+                ranked = self.reranker.rank(query, initial_docs)[:rerank_k_final]
+            reranked_docs = [initial_docs[idx] for idx, _ in ranked]
+            reranked_vecs = initial_vecs[[idx for idx, _ in ranked]]
             logging.info(
                 "Reranked docs down to %d (rerank_k=%d)",
                 len(reranked_docs),
@@ -117,7 +222,11 @@ class RerankMMRRetriever:
             )
 
             diversified_docs = self._apply_mmr(
-                query, reranked_docs, k=mmr_k_final, lambda_mult=lambda_mult
+                query_vec,
+                reranked_docs,
+                reranked_vecs,
+                k=mmr_k_final,
+                lambda_mult=lambda_mult,
             )
             logging.info(
                 "MMR selected %d docs (mmr_k=%d)", len(diversified_docs), mmr_k_final
@@ -126,46 +235,159 @@ class RerankMMRRetriever:
         except Exception as e:
             raise MyException(e, sys)
 
-    def _apply_mmr(
-        self, query: str, candidates: Sequence[Document], k: int, lambda_mult: float
-    ) -> List[Document]:
-        """Apply maximal marginal relevance over reranked candidates."""
-        if not candidates or k <= 0:
-            return []
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed the query once so every retrieval stage can reuse the vector."""
+        return np.asarray(self.embedder.embed_query(query), dtype=np.float32)
 
-        query_vec = np.array(self.embedder.embed_query(query), dtype=np.float32)
-        doc_vecs = [
-            np.array(vec, dtype=np.float32)
-            for vec in self.embedder.embed_documents(
-                [doc.page_content for doc in candidates]
-            )
-        ]
+    def _vector_search(self, query_vec: np.ndarray, k: int) -> Tuple[List[Document], List[int]]:
+        """
+        Search the FAISS index with a precomputed query vector.
 
-        selected: list[int] = []
-        remaining = list(range(len(candidates)))
+        Returns the matching documents together with their positions in the
+        index, so their stored vectors can be looked up later without re-embedding.
+        With exact vectors available, `rescore_oversample * k` candidates are read
+        from the compressed index and re-ranked by their exact distance.
+        """
+        query = query_vec.reshape(1, -1).copy()
+        if getattr(self.vector_store, "_normalize_L2", False):
+            norm = np.linalg.norm(query)
+            if norm > 0:
+                query /= norm
 
-        def cosine(a: np.ndarray, b: np.ndarray) -> float:
-            denom = (np.linalg.norm(a) * np.linalg.norm(b))
-            if denom == 0:
-                return 0.0
-            return float(np.dot(a, b) / denom)
+        fetch_k = k * self.rescore_oversample if self.exact_vectors is not None else k
+        _, indices = search_index(self.vector_store, query, fetch_k)
+        docs: List[Document] = []
+        positions: List[int] = []
+        for position in indices[0]:
+            if position == -1:
+                continue
+            doc_id = self.vector_store.index_to_docstore_id[int(position)]
+            doc = self.vector_store.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                logging.warning("Could not find document for id %s in docstore", doc_id)
+                continue
+            docs.append(doc)
+            positions.append(int(position))
 
-        while remaining and len(selected) < k:
-            if not selected:
-                # pick best relevance to query
-                chosen = max(remaining, key=lambda idx: cosine(query_vec, doc_vecs[idx]))
+        if self.exact_vectors is not None and len(docs) > 1:
+            exact = self._get_vectors(positions)
+            if self.vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                order = np.argsort(-(exact @ query[0]), kind="stable")
             else:
-                chosen = max(
-                    remaining,
-                    key=lambda idx: lambda_mult * cosine(query_vec, doc_vecs[idx])
-                    - (1 - lambda_mult)
-                    * max(
-                        cosine(doc_vecs[idx], doc_vecs[sel_idx])
-                        for sel_idx in selected
-                    ),
-                )
-            selected.append(chosen)
-            remaining.remove(chosen)
+                order = np.argsort(((exact - query[0]) ** 2).sum(axis=1), kind="stable")
+            docs = [docs[idx] for idx in order]
+            positions = [positions[idx] for idx in order]
+        return docs[:k], positions[:k]
 
-        return [candidates[idx] for idx in selected]
+    def _cascade_rank(
+        self,
+        query: str,
+        query_vec: np.ndarray,
+        docs: List[Document],
+        vecs: np.ndarray,
+        k: int,
+        margin: float,
+        band: float,
+    ) -> List[Tuple[int, float]]:
+        """
+        Pick the top `k` candidates, calling the cross-encoder only where the
+        vector similarity cannot decide.
+
+        Candidates clearly above the cut-off between rank k and k+1 are kept, those
+        clearly below it are dropped, and the cross-encoder fills the remaining
+        slots from the band around the cut-off; slots the band cannot fill go to
+        the next candidates by similarity, so k are always returned when there
+        are k. Returns (index, score) pairs like CrossEncoderReranker.rank.
+        """
+        similarity = cosine_similarities(query_vec, vecs)
+        order = [int(idx) for idx in np.argsort(-similarity, kind="stable")]
+        path = "skipped"
+        if len(order) <= k:
+            # Nothing is cut, so the full pass could not change the selection
+            ranked = [(idx, float(similarity[idx])) for idx in order]
+        elif similarity[order[k - 1]] - similarity[order[k]] >= margin:
+            ranked = [(idx, float(similarity[idx])) for idx in order[:k]]
+        else:
+            cutoff = (similarity[order[k - 1]] + similarity[order[k]]) / 2
+            certain = [idx for idx in order if similarity[idx] > cutoff + band]
+            uncertain = [idx for idx in order if abs(similarity[idx] - cutoff) <= band]
+            ranked = [(idx, float(similarity[idx])) for idx in certain]
+            slots = k - len(certain)
+            if slots > 0 and uncertain:
+                path = "full" if len(uncertain) == len(order) else "partial"
+                scored = self.reranker.rank(query, [docs[idx] for idx in uncertain])
+                ranked += [(uncertain[local_idx], score) for local_idx, score in scored[:slots]]
+            if len(ranked) < k:
+                # Rounding can leave a candidate exactly `band` above the cut-off (e.g. with
+                # band == gap / 2) in neither set: fill its slot by vector similarity
+                chosen = {idx for idx, _ in ranked}
+                ranked += [(idx, float(similarity[idx])) for idx in order if idx not in chosen][: k - len(ranked)]
+
+        self.cascade_paths[path] += 1
+        logging.info(
+            "Cascade rerank path: %s (totals: skipped=%d partial=%d full=%d)",
+            path,
+            self.cascade_paths["skipped"],
+            self.cascade_paths["partial"],
+            self.cascade_paths["full"],
+        )
+        return ranked
+
+    def _fuse_lexical(
+        self,
+        query: str,
+        docs: List[Document],
+        positions: List[int],
+        lexical_k: int,
+        fusion_k: int,
+        rrf_k: int,
+    ) -> Tuple[List[Document], List[int]]:
+        """Fuse vector hits with the top BM25 hits by reciprocal rank and keep the best `fusion_k`."""
+        index_to_id = self.vector_store.index_to_docstore_id
+        found = {index_to_id[position]: (doc, position) for doc, position in zip(docs, positions)}
+        lexical_ids = []
+        for doc_id, _ in self.lexical_index.search(query, lexical_k):
+            if doc_id not in found:
+                position = self._positions_by_id.get(doc_id)
+                doc = self.vector_store.docstore.search(doc_id)
+                if position is None or not isinstance(doc, Document):
+                    continue
+                found[doc_id] = (doc, position)
+            lexical_ids.append(doc_id)
+
+        fused = reciprocal_rank_fusion(
+            [[index_to_id[position] for position in positions], lexical_ids], k=rrf_k
+        )[:fusion_k]
+        return [found[doc_id][0] for doc_id, _ in fused], [found[doc_id][1] for doc_id, _ in fused]
 
+    def _get_vectors(self, positions: Sequence[int]) -> np.ndarray:
+        """
+        Look up stored vectors: exact ones from disk when kept next to a compressed
+        index, otherwise rebuilt straight from the FAISS index.
+        """
+        if self.exact_vectors is not None:
+            ids = [self.vector_store.index_to_docstore_id[position] for position in positions]
+            exact = self.exact_vectors.get(ids)
+            if exact is not None:
+                if getattr(self.vector_store, "_normalize_L2", False):
+                    norms = np.linalg.norm(exact, axis=1, keepdims=True)
+                    exact = np.divide(exact, norms, out=np.zeros_like(exact), where=norms > 0)
+                return exact
+        return reconstruct_vectors(self.vector_store.index, positions)
+
+    def _apply_mmr(
+        self,
+        query_vec: np.ndarray,
+        candidates: Sequence[Document],
+        candidate_vecs: np.ndarray,
+        k: int,
+        lambda_mult: float,
+    ) -> List[Document]:
+        """Apply maximal marginal relevance over reranked candidates using their stored vectors."""
+        if not candidates or k <= 0:
+            return []
+
+        selected = maximal_marginal_relevance(
+            query_vec, candidate_vecs, k=k, lambda_mult=lambda_mult
+        )
+        return [candidates[idx] for idx in selected]
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Tuple
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace so trivially different spellings of a query share cache entries."""
+    return " ".join(query.split())
+
+
+def content_hash(text: str) -> str:
+    """Short content hash identifying a chunk independently of its docstore id."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ScoreCache:
+    """
+    In-memory LRU cache of reranker scores with an optional time-to-live.
+
+    Keys are (normalized query, chunk content hash). The cache is tied to an
+    index fingerprint: switching to a different fingerprint drops every entry,
+    so scores never outlive the document set they were computed for.
+    """
+
+    def __init__(self, max_entries: int = 50_000, ttl_seconds: float | None = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.fingerprint: str | None = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_fingerprint(self, fingerprint: str | None) -> None:
+        """Bind the cache to an index fingerprint, clearing it when the fingerprint changes."""
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.fingerprint = fingerprint
+
+    def get_many(self, query: str, chunk_keys: Iterable[Hashable]) -> Dict[Hashable, float]:
+        """Cached scores for the given chunk hashes; missing or expired keys are left out."""
+        now = time.monotonic()
+        found: Dict[Hashable, float] = {}
+        with self._lock:
+            for chunk_key in chunk_keys:
+                entry = self._entries.get((query, chunk_key))
+                if entry is not None and self.ttl_seconds is not None and now - entry[1] > self.ttl_seconds:
+                    del self._entries[(query, chunk_key)]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end((query, chunk_key))
+                found[chunk_key] = entry[0]
+                self.hits += 1
+        return found
+
+    def put_many(self, query: str, scores: Dict[Hashable, float]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for chunk_key, score in scores.items():
+                self._entries[(query, chunk_key)] = (score, now)
+                self._entries.move_to_end((query, chunk_key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
@@ -89,6 +89,8 @@ if "status" not in st.session_state:
     st.session_state["status"] = "idle"
 if "loaded_documents" not in st.session_state:
     st.session_state["loaded_documents"] = []
+if "failed_documents" not in st.session_state:
+    st.session_state["failed_documents"] = []
 if "messages" not in st.session_state:
     st.session_state["messages"] = []
 if "tmp_dir" not in st.session_state:
@@ -274,6 +276,7 @@ def cleanup_resources():
 
             st.session_state["status"] = "idle"
             st.session_state["loaded_documents"] = []
+            st.session_state["failed_documents"] = []
             st.session_state["messages"] = [] # Also clear chat history on full cleanup
             st.success("All indexed documents and chat history cleared.")
             st.rerun()
@@ -308,11 +311,17 @@ def sidebar():
         accept_multiple_files=True
     )
 
-    url_input = st.sidebar.text_input("Or provide a URL (optional):", placeholder="https://example.com/report.pdf")
+    url_input = st.sidebar.text_area(
+        "Or provide URLs, one per line (optional):", placeholder="https://example.com/report.html"
+    )
+    sitemap_input = st.sidebar.text_input(
+        "Or index every page of a sitemap (optional):", placeholder="https://example.com/sitemap.xml"
+    )
+    urls = list(dict.fromkeys(line.strip() for line in url_input.splitlines() if line.strip()))
 
     if st.sidebar.button("🚀 Index Documents", type="primary", use_container_width=True):
-        if not uploaded_files and not url_input.strip():
-            st.sidebar.warning("Please upload at least one file or provide a URL.")
+        if not uploaded_files and not urls and not sitemap_input.strip():
+            st.sidebar.warning("Please upload at least one file or provide a URL or sitemap.")
             return
         
         with st.spinner("Starting document indexing... this may take a moment."):
@@ -339,24 +348,36 @@ def sidebar():
                 if file_paths:
                     # Use the original filename for display by removing the UUID prefix when present
                     docs.extend({"path": p, "enabled": True, "name": display_name_from_path(p)} for p in file_paths)
-                if url_input.strip():
-                    docs.append({"path": url_input.strip(), "enabled": True, "name": url_input.strip()})
+                docs.extend({"path": url, "enabled": True, "name": url} for url in urls)
+                if sitemap_input.strip():
+                    docs.append(
+                        {"path": sitemap_input.strip(), "enabled": True, "sitemap": True, "name": sitemap_input.strip()}
+                    )
 
                 # Override pipeline documents config and run preparation synchronously
                 pipeline.config["documents"] = docs
                 st.session_state["status"] = "processing"
                 pipeline.prepare_vector_store()
 
-                st.sidebar.success("Documents indexed successfully!")
+                # Failed documents are skipped by the pipeline (and retried on the next run)
+                failed = getattr(pipeline, "ingestion_errors", {})
+                names = {d["path"]: d["name"] for d in docs}
                 st.session_state["status"] = "ready"
                 st.session_state["loaded_documents"] = [
-                    {"name": d["name"], "path": d["path"]} for d in docs
+                    {"name": d["name"], "path": d["path"]} for d in docs if d["path"] not in failed
+                ]
+                # Pages of a sitemap are not in `docs` and are listed by URL
+                st.session_state["failed_documents"] = [
+                    {"name": names.get(path, path), "path": path, "error": error}
+                    for path, error in failed.items()
                 ]
 
             except Exception as e:
                 logging.exception("Indexing failed: %s", e)
                 st.sidebar.error(f"Indexing failed: {e}")
                 st.session_state["status"] = "error"
+                st.session_state["loaded_documents"] = []
+                st.session_state["failed_documents"] = []
         st.rerun() # Rerun to update status display
 
 
@@ -367,8 +388,13 @@ def sidebar():
     
     status_msg = st.session_state.get("status", "idle")
     loaded_docs = st.session_state.get("loaded_documents", [])
+    failed_docs = st.session_state.get("failed_documents", [])
     
-    if status_msg == "ready":
+    if status_msg == "ready" and failed_docs:
+        st.sidebar.warning(
+            f"Context Ready: {len(loaded_docs)} source(s) indexed, {len(failed_docs)} failed."
+        )
+    elif status_msg == "ready":
         st.sidebar.success(f"Context Ready: {len(loaded_docs)} source(s) indexed.")
     elif status_msg == "processing":
         st.sidebar.info("Indexing in Progress...")
@@ -383,6 +409,9 @@ def sidebar():
                 doc_name = d.get("name", d.get("path", "Unknown Source"))
                 st.caption(f"📃 {doc_name}")
 
+    for d in failed_docs:
+        st.sidebar.error(f"❌ {d['name']}: {d['error']}")
+
     st.sidebar.markdown("---")
 
     # --- 3. Cleanup ---
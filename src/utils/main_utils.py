@@ -1,7 +1,9 @@
+import hashlib
 import math
 import os
 import re
 import sys
+from functools import lru_cache
 from typing import Dict, List, Sequence
 
 import yaml
@@ -12,17 +14,27 @@ from src.exception import MyException
 from src.logger import logging
 
 
-def num_tokens_from_string(text: str, model_name: str = "cl100k_base") -> int:
+@lru_cache(maxsize=None)
+def get_tokenizer(model_name: str = "cl100k_base") -> tiktoken.Encoding:
     """
-    Returns the number of tokens in a text string.
+    Returns the tiktoken encoding for an encoding name (e.g. "cl100k_base") or a
+    model name, loaded once per process.
     """
+    if model_name in tiktoken.list_encoding_names():
+        return tiktoken.get_encoding(model_name)
     try:
-        encoding = tiktoken.encoding_for_model(model_name)
+        return tiktoken.encoding_for_model(model_name)
     except KeyError:
         # Fallback to a common encoding if model_name is not directly supported
-        encoding = tiktoken.get_encoding("cl100k_base")
-    num_tokens = len(encoding.encode(text))
-    return num_tokens
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def num_tokens_from_string(text: str, model_name: str = "cl100k_base") -> int:
+    """
+    Returns the number of tokens in a text string.
+    """
+    # Special-token strings inside documents are counted as plain text instead of raising
+    return len(get_tokenizer(model_name).encode(text, disallowed_special=()))
 
 
 def read_yaml_file(file_path: str) -> dict:
@@ -38,7 +50,7 @@ def load_configs(config_dir: str) -> Dict:
     """Load all configuration files from the specified directory."""
     try:
         configs = {}
-        for name in ["ingestion", "chunking", "retrieval", "generation", "pipeline"]:
+        for name in ["ingestion", "chunking", "embedding", "vectorstore", "retrieval", "generation", "pipeline"]:
             path = os.path.join(config_dir, f"{name}.yaml")
             if os.path.exists(path):
                 configs.update(read_yaml_file(path) or {})
@@ -49,20 +61,83 @@ def load_configs(config_dir: str) -> Dict:
         raise MyException(e, sys) from e
 
 
-def compute_k(*, total: int, pct: float | None, upper_bound: int) -> int:
+def file_content_hash(path: str, block_size: int = 1024 * 1024) -> str:
+    """Return the md5 hex digest of a file, reading it in fixed-size blocks."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def document_fingerprint(doc: dict) -> str:
+    """
+    Fingerprint a single configured document.
+
+    Files are identified by their content hash (so the same content under a
+    different temp path gets the same fingerprint); URLs and missing files
+    fall back to their path. A `content_hash` already known for the document
+    (e.g. computed while an upload was written) is used instead of re-reading it.
+    """
+    path = doc.get("path", "")
+    enabled = doc.get("enabled", True)
+    if doc.get("content_hash"):
+        return f"{doc['content_hash']}|{enabled}"
+    if os.path.exists(path) and os.path.isfile(path):
+        try:
+            return f"{file_content_hash(path)}|{enabled}"
+        except Exception as e:
+            logging.warning("Could not hash file %s: %s, using path instead", path, e)
+    return f"{path}|{enabled}"
+
+
+def documents_fingerprint(docs: Sequence[dict], known: Dict[str, str] | None = None) -> str:
+    """
+    Create a fingerprint for a whole document set based on content hashes.
+
+    `known` maps paths to already computed document fingerprints so callers that
+    need both the per-document and the set fingerprint only hash each file once.
+    """
+    known = known or {}
+    key_parts = [
+        known.get(doc.get("path", "")) or document_fingerprint(doc)
+        for doc in sorted(docs, key=lambda x: x.get("path", ""))
+    ]
+    joined = "|".join(key_parts)
+    return hashlib.md5(joined.encode("utf-8")).hexdigest()
+
+
+def compute_k(
+    *,
+    total: int,
+    pct: float | None,
+    upper_bound: int,
+    k: int | None = None,
+    k_min: int | None = None,
+    k_max: int | None = None,
+) -> int:
     """
     Convert a percentage to an integer k, clamped to available docs.
 
     - Uses ceil to avoid losing small fractions.
+    - An explicit `k` takes precedence over the percentage.
+    - `k_max` caps and `k_min` floors the result.
     - Ensures the value is >= 0 and <= upper_bound.
     """
     if total <= 0 or upper_bound <= 0:
         return 0
 
-    if pct is None:
+    if k is not None:
+        calculated = int(k)
+    elif pct is None:
         return 0
+    else:
+        calculated = int(math.ceil(total * pct))
 
-    calculated = int(math.ceil(total * pct))
+    if k_max is not None:
+        calculated = min(calculated, k_max)
+    if k_min is not None:
+        calculated = max(calculated, k_min)
     return max(0, min(calculated, upper_bound))
 
 
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+VECTORS_FILE = "exact_vectors.f32"
+ROWS_FILE = "exact_vectors.json"
+
+
+class ExactVectorStore:
+    """
+    Full-precision float32 vectors kept in a file on disk, keyed by docstore id.
+
+    Used next to a compressed FAISS index (fp16/SQ8/PQ) to re-score the top
+    candidates exactly. Rows are appended to a raw float32 file and read back
+    through a memory map, so the vectors do not have to stay in RAM. Deleted
+    ids only drop out of the row map until compact() rewrites the file.
+    """
+
+    def __init__(self, dim: int, path: str | None = None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="exact_vectors_", suffix=".f32")
+            os.close(fd)
+        else:
+            open(path, "wb").close()
+        self.path = path
+        self.dim = dim
+        self.rows: Dict[str, int] = {}
+        self._num_rows = 0
+        self._mmap: np.memmap | None = None
+
+    @classmethod
+    def load(cls, directory: str) -> "ExactVectorStore | None":
+        """Open a working copy of vectors saved with save(); None if the directory has none."""
+        rows_path = os.path.join(directory, ROWS_FILE)
+        if not os.path.exists(rows_path):
+            return None
+        with open(rows_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        store = cls(meta["dim"])
+        shutil.copyfile(os.path.join(directory, VECTORS_FILE), store.path)
+        store.rows = meta["rows"]
+        store._num_rows = meta["num_rows"]
+        return store
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def append(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with open(self.path, "ab") as f:
+            f.write(vectors.tobytes())
+        for offset, doc_id in enumerate(ids):
+            self.rows[doc_id] = self._num_rows + offset
+        self._num_rows += len(vectors)
+        self._mmap = None
+
+    def get(self, ids: Sequence[str]) -> np.ndarray | None:
+        """Vectors for `ids` in order, or None if any of them is unknown."""
+        rows: List[int] = []
+        for doc_id in ids:
+            row = self.rows.get(doc_id)
+            if row is None:
+                return None
+            rows.append(row)
+        if not rows:
+            return np.empty((0, self.dim), dtype=np.float32)
+        if self._mmap is None:
+            self._mmap = np.memmap(self.path, dtype=np.float32, mode="r", shape=(self._num_rows, self.dim))
+        return np.asarray(self._mmap[rows])
+
+    def remove(self, ids: Sequence[str]) -> None:
+        for doc_id in ids:
+            self.rows.pop(doc_id, None)
+
+    def compact(self) -> None:
+        """Rewrite the file with only the live rows."""
+        live_ids = sorted(self.rows, key=self.rows.get)
+        vectors = self.get(live_ids)
+        self._mmap = None
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        os.replace(tmp_path, self.path)
+        self.rows = {doc_id: row for row, doc_id in enumerate(live_ids)}
+        self._num_rows = len(live_ids)
+
+    def save(self, directory: str) -> None:
+        shutil.copyfile(self.path, os.path.join(directory, VECTORS_FILE))
+        with open(os.path.join(directory, ROWS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "num_rows": self._num_rows, "rows": self.rows}, f)
+
+    def close(self) -> None:
+        """Delete the working file."""
+        self._mmap = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
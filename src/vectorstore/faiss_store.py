@@ -1,20 +1,345 @@
+import json
+import math
+import os
+import shutil
+import sys
+import uuid
+from datetime import datetime
+from typing import List, Sequence
+
+import faiss
+import numpy as np
 from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from src.embedding.embedder import OllamaEmbedder
+from src.retrieval.bm25 import BM25Index
+from src.vectorstore.exact_vectors import ExactVectorStore
 from src.exception import MyException
-import sys
+from src.logger import logging
+
+# Bump whenever the on-disk layout or its contents change incompatibly.
+ARTIFACT_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+PRECISIONS = ("fp32", "fp16", "sq8", "pq")
+# vectorstore config keys that shape a built index (search-time knobs like nprobe do not)
+INDEX_SETTINGS = (
+    "index_type",
+    "auto_threshold",
+    "auto_index_type",
+    "hnsw_m",
+    "ef_construction",
+    "nlist",
+    "pq_m",
+    "pq_nbits",
+    "train_sample_size",
+    "vector_precision",
+)
+
+
+def resolve_index_type(num_vectors: int, config: dict) -> str:
+    """
+    Pick the concrete index type for a corpus size.
+
+    `auto` keeps exact flat search for small corpora and switches to
+    `auto_index_type` once the chunk count reaches `auto_threshold`.
+    """
+    index_type = config.get("index_type", "flat")
+    if index_type == "auto":
+        threshold = config.get("auto_threshold", 20000)
+        index_type = config.get("auto_index_type", "hnsw") if num_vectors >= threshold else "flat"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unsupported index_type '{index_type}'. Expected one of {INDEX_TYPES} or 'auto'.")
+    return index_type
+
+
+def index_kind(index: faiss.Index) -> str:
+    """Name the index type of an existing FAISS index, using the INDEX_TYPES vocabulary."""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def resolve_precision(index_type: str, config: dict) -> str:
+    """Storage precision for an index type; ivf_pq is always product-quantized."""
+    precision = "pq" if index_type == "ivf_pq" else config.get("vector_precision", "fp32")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unsupported vector_precision '{precision}'. Expected one of {PRECISIONS}.")
+    return precision
+
+
+def fit_to_corpus(num_vectors: int, index_type: str, precision: str, config: dict) -> tuple[str, str]:
+    """
+    Index type and precision that can actually be trained on `num_vectors` vectors.
+
+    Product quantization trains 2**pq_nbits centroids per sub-quantizer and FAISS
+    refuses fewer training points than centroids, so below that size PQ storage
+    falls back to SQ8 (ivf_pq to ivf_flat over SQ8 codes), the same way nlist is
+    clamped for IVF.
+    """
+    if precision == "pq":
+        training_points = min(num_vectors, int(config.get("train_sample_size", 50000)))
+        if training_points < 2 ** int(config.get("pq_nbits", 8)):
+            return ("ivf_flat" if index_type == "ivf_pq" else index_type), "sq8"
+    return index_type, precision
+
+
+def index_precision(index: faiss.Index) -> str:
+    """Storage precision of an existing FAISS index, using the PRECISIONS vocabulary."""
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    return "fp32"
+
+
+def bytes_per_vector(index: faiss.Index) -> int:
+    """Size of one stored vector code (excluding graph links and list ids)."""
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, faiss.IndexIVF):
+        return index.code_size
+    return index.sa_code_size()
+
+
+def apply_search_params(index: faiss.Index, config: dict) -> None:
+    """Set query-time knobs (nprobe for IVF, efSearch for HNSW) from config."""
+    params = faiss.ParameterSpace()
+    kind = index_kind(index)
+    if kind == "hnsw" and config.get("ef_search"):
+        params.set_index_parameter(index, "efSearch", int(config["ef_search"]))
+    elif kind in ("ivf_flat", "ivf_pq") and config.get("nprobe"):
+        params.set_index_parameter(index, "nprobe", int(config["nprobe"]))
+
+
+def build_faiss_index(
+    vectors: np.ndarray,
+    config: dict,
+    metric: int = faiss.METRIC_L2,
+    index_type: str | None = None,
+    precision: str | None = None,
+) -> faiss.Index:
+    """
+    Create an empty, trained FAISS index suited to `vectors`.
+
+    Indexes that need training (IVF, SQ8, PQ) are trained on a random sample
+    of at most `train_sample_size` vectors. The caller adds the vectors afterwards.
+
+    Args:
+        vectors: The corpus vectors, shape (n, d); used for sizing and training.
+        config: The `vectorstore` config section.
+        metric: FAISS metric type (L2 unless the store uses inner product).
+        index_type: Concrete type to build; resolved from config when omitted.
+        precision: Storage precision; resolved from config when omitted.
+    """
+    num_vectors, dim = vectors.shape
+    index_type = index_type or resolve_index_type(num_vectors, config)
+    precision = precision or resolve_precision(index_type, config)
+    fitted_type, fitted_precision = fit_to_corpus(num_vectors, index_type, precision, config)
+    if (fitted_type, fitted_precision) != (index_type, precision):
+        logging.info(
+            "%d vectors are too few to train a %s/%s index (PQ%sx%s needs %d); building %s/%s instead",
+            num_vectors,
+            index_type,
+            precision,
+            config.get("pq_m", 16),
+            config.get("pq_nbits", 8),
+            2 ** int(config.get("pq_nbits", 8)),
+            fitted_type,
+            fitted_precision,
+        )
+        index_type, precision = fitted_type, fitted_precision
+    storage = {
+        "fp32": "Flat",
+        "fp16": "SQfp16",
+        "sq8": "SQ8",
+        "pq": f"PQ{config.get('pq_m', 16)}x{config.get('pq_nbits', 8)}",
+    }[precision]
+
+    if index_type == "flat":
+        if precision == "fp32":
+            return faiss.IndexFlat(dim, metric)
+        index = faiss.index_factory(dim, storage, metric)
+    elif index_type == "hnsw":
+        hnsw = f"HNSW{config.get('hnsw_m', 32)}"
+        index = faiss.index_factory(dim, hnsw if precision == "fp32" else f"{hnsw},{storage}", metric)
+        index.hnsw.efConstruction = int(config.get("ef_construction", 200))
+    else:
+        # IVF: roughly 4*sqrt(n) lists, while keeping >= 39 training points per list
+        nlist = config.get("nlist") or int(4 * math.sqrt(num_vectors))
+        nlist = max(1, min(nlist, num_vectors // 39 or 1))
+        index = faiss.index_factory(dim, f"IVF{nlist},{storage}", metric)
+
+    if not index.is_trained:
+        sample_size = min(num_vectors, int(config.get("train_sample_size", 50000)))
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(num_vectors, size=sample_size, replace=False)]
+        logging.info("Training %s/%s index on %d vectors", index_type, precision, sample_size)
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    if isinstance(index, faiss.IndexIVF):
+        # Keep vectors reconstructible by position (used by MMR and rebuilds)
+        index.make_direct_map()
+    apply_search_params(index, config)
+    return index
+
+
+def reconstruct_vectors(index: faiss.Index, positions: Sequence[int] | None = None) -> np.ndarray:
+    """Read vectors back out of an index, either all of them or the given positions."""
+    if positions is None:
+        positions = range(index.ntotal)
+    keys = np.asarray(list(positions), dtype=np.int64)
+    if keys.size == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    return np.asarray(index.reconstruct_batch(keys), dtype=np.float32)
+
+
+def exact_vectors_of(vector_store: FAISS) -> ExactVectorStore | None:
+    """
+    Full-precision copies of the vectors of `vector_store`, kept for re-scoring a
+    compressed index.
+
+    Like the lexical index, they are attached to the vector store they belong to,
+    so building or loading another store never changes the one being served.
+    """
+    return getattr(vector_store, "exact_vectors", None)
+
+
+def lexical_index_of(vector_store: FAISS) -> BM25Index | None:
+    """BM25 index over the chunks of `vector_store`, for hybrid retrieval."""
+    return getattr(vector_store, "lexical_index", None)
+
+
+def tombstones_of(vector_store: FAISS) -> frozenset:
+    """
+    Positions of deleted vectors that an HNSW index still holds.
+
+    HNSW cannot remove vectors, so deletes only drop their docstore entries and
+    search_index() skips them until compaction rebuilds the index.
+    """
+    return getattr(vector_store, "tombstones", frozenset())
+
+
+def _set_tombstones(vector_store: FAISS, positions) -> None:
+    """Record the tombstoned positions of `vector_store` with the selector that excludes them from searches."""
+    vector_store.tombstones = frozenset(positions)
+    vector_store.tombstone_selector = None
+    if vector_store.tombstones:
+        dead = faiss.IDSelectorBatch(np.fromiter(vector_store.tombstones, dtype=np.int64))
+        vector_store.tombstone_selector = faiss.IDSelectorNot(dead)
+        # IDSelectorNot only points at the batch selector
+        vector_store.tombstone_selector.referenced_objects = [dead]
+
+
+def search_index(vector_store: FAISS, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Search the index of `vector_store` like Index.search, never returning tombstoned positions."""
+    index = vector_store.index
+    selector = getattr(vector_store, "tombstone_selector", None)
+    if selector is None:
+        return index.search(queries, k)
+    params = faiss.SearchParametersHNSW()
+    params.efSearch = index.hnsw.efSearch
+    params.sel = selector
+    return index.search(queries, k, params=params)
+
+
+def remove_ivf_positions(index: faiss.IndexIVF, positions: Sequence[int]) -> None:
+    """
+    Remove vectors from an IVF index in place and renumber the rest densely.
+
+    FAISS keeps the original labels of the remaining vectors, while the docstore
+    mapping (and FAISS.add_embeddings) expect positions 0..ntotal-1, so every
+    label above a removed one is shifted down. No list is retrained.
+    """
+    removed = np.unique(np.asarray(positions, dtype=np.int64))
+    if removed.size == 0:
+        return
+    # remove_ids is not supported with the array direct map built for reconstruct()
+    index.set_direct_map_type(faiss.DirectMap.NoMap)
+    index.remove_ids(removed)
+    invlists = index.invlists
+    for list_no in range(index.nlist):
+        size = invlists.list_size(list_no)
+        if not size:
+            continue
+        labels = faiss.rev_swig_ptr(invlists.get_ids(list_no), size).copy()
+        labels -= np.searchsorted(removed, labels)
+        invlists.update_entries(list_no, 0, size, faiss.swig_ptr(labels), invlists.get_codes(list_no))
+    index.make_direct_map()
+
 
 class FaissVectorStore:
-    def __init__(self):
+    def __init__(self, embedding_config: dict | None = None, vectorstore_config: dict | None = None):
         """
         Initialize the Ollama Embedder
         """
-        self.embedder = OllamaEmbedder().get_embedder()
-        
-    def create_vector_store(self, documents: list) -> FAISS:
+        embedding_config = embedding_config or {}
+        self.model_name = embedding_config.get("model_name", "embeddinggemma")
+        self.embedder = OllamaEmbedder(model_name=self.model_name, config=embedding_config).get_embedder()
+        self.config = vectorstore_config or {}
+        # Exact vector files replaced by rebuilds, closed by release() once no retriever reads them
+        self._retired: List[ExactVectorStore] = []
+
+    def _keeps_exact_vectors(self, index: faiss.Index) -> bool:
+        return bool(self.config.get("rescore")) and index_precision(index) != "fp32"
+
+    def _set_exact_vectors(self, vector_store: FAISS, store: ExactVectorStore | None) -> None:
+        """Attach `store` to `vector_store`; the file it replaces stays open until release()."""
+        previous = exact_vectors_of(vector_store)
+        if previous is not None and previous is not store:
+            self._retired.append(previous)
+        vector_store.exact_vectors = store
+
+    def release(self, vector_store: FAISS | None = None) -> None:
+        """
+        Close the exact vector files of `vector_store`, a store that no longer serves
+        queries, and those replaced by rebuilds. Call once the retriever has been
+        switched to the store that replaces them.
+        """
+        if vector_store is not None:
+            self._set_exact_vectors(vector_store, None)
+        while self._retired:
+            self._retired.pop().close()
+
+    def _new_lexical_index(self) -> BM25Index | None:
+        if not self.config.get("bm25_index", True):
+            return None
+        return BM25Index(k1=self.config.get("bm25_k1", 1.5), b=self.config.get("bm25_b", 0.75))
+
+    @staticmethod
+    def _to_langchain_documents(documents: list) -> List[Document]:
+        """Validate chunk dictionaries and convert them into LangChain Documents."""
+        langchain_documents = []
+        for i, doc in enumerate(documents):
+            if not isinstance(doc, dict):
+                raise TypeError(f"Expected a dictionary for document item {i}, but got {type(doc)}. Item: {doc}")
+            if 'text' not in doc or 'metadata' not in doc:
+                raise ValueError(f"Document item {i} is missing 'text' or 'metadata' key. Item: {doc}")
+            langchain_documents.append(Document(page_content=doc['text'], metadata=doc['metadata']))
+        return langchain_documents
+
+    def create_vector_store(
+        self,
+        documents: list,
+        ids: List[str] | None = None,
+        index_type: str | None = None,
+        precision: str | None = None,
+    ) -> FAISS:
             """This function create a FAISS vector store and return it.
             Args:
                 documents (list): an list of chunk documents (dictionaries with 'text' and 'metadata')
+                ids (List[str] | None): optional docstore ids, one per chunk, so callers can
+                    later delete the chunks of a single source document
+                index_type (str | None): index type to build instead of the configured one;
+                    e.g. "flat" when the store is filled in batches and rebuilt at the end
+                precision (str | None): storage precision to use instead of the configured one
 
             Raises:
                 Exception: return an exception when, fails to initialise the vector store
@@ -24,15 +349,368 @@ class FaissVectorStore:
             """
             try:
                 # Convert list of dictionaries to list of Document objects
-                langchain_documents = []
-                for i, doc in enumerate(documents):
-                    if not isinstance(doc, dict):
-                        raise TypeError(f"Expected a dictionary for document item {i}, but got {type(doc)}. Item: {doc}")
-                    if 'text' not in doc or 'metadata' not in doc:
-                        raise ValueError(f"Document item {i} is missing 'text' or 'metadata' key. Item: {doc}")
-                    langchain_documents.append(Document(page_content=doc['text'], metadata=doc['metadata']))
-
-                vector_store = FAISS.from_documents(langchain_documents, self.embedder)
+                langchain_documents = self._to_langchain_documents(documents)
+                texts = [doc.page_content for doc in langchain_documents]
+                metadatas = [doc.metadata for doc in langchain_documents]
+                vectors = np.asarray(self.embedder.embed_documents(texts), dtype=np.float32)
+
+                index = build_faiss_index(vectors, self.config, index_type=index_type, precision=precision)
+                logging.info("Building %s index over %d vectors", index_kind(index), len(vectors))
+                vector_store = FAISS(
+                    embedding_function=self.embedder,
+                    index=index,
+                    docstore=InMemoryDocstore(),
+                    index_to_docstore_id={},
+                )
+                added_ids = vector_store.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+
+                _set_tombstones(vector_store, ())
+                vector_store.exact_vectors = None
+                if self._keeps_exact_vectors(index):
+                    vector_store.exact_vectors = ExactVectorStore(index.d)
+                    vector_store.exact_vectors.append(added_ids, vectors)
+                vector_store.lexical_index = self._new_lexical_index()
+                if vector_store.lexical_index is not None:
+                    vector_store.lexical_index.add(added_ids, texts)
+                logging.info(
+                    "Stored %d vectors as %s (%d bytes/vector)",
+                    index.ntotal,
+                    index_precision(index),
+                    bytes_per_vector(index),
+                )
                 return vector_store
             except Exception as e:
-                raise MyException(e, sys)
\ No newline at end of file
+                raise MyException(e, sys)
+
+    def add_documents(self, vector_store: FAISS, documents: list, ids: List[str] | None = None) -> List[str]:
+        """
+        Embed and append chunks to an existing vector store.
+
+        Args:
+            vector_store (FAISS): store to extend in place.
+            documents (list): chunk dictionaries with 'text' and 'metadata'.
+            ids (List[str] | None): optional docstore ids, one per chunk.
+
+        Returns:
+            List[str]: the docstore ids of the added chunks.
+        """
+        try:
+            if not documents:
+                return []
+            langchain_documents = self._to_langchain_documents(documents)
+            texts = [doc.page_content for doc in langchain_documents]
+            metadatas = [doc.metadata for doc in langchain_documents]
+            vectors = np.asarray(self.embedder.embed_documents(texts), dtype=np.float32)
+            added_ids = self._add_embeddings(vector_store, texts, vectors, metadatas, ids)
+            exact_vectors, lexical_index = exact_vectors_of(vector_store), lexical_index_of(vector_store)
+            if exact_vectors is not None:
+                exact_vectors.append(added_ids, vectors)
+            if lexical_index is not None:
+                lexical_index.add(added_ids, texts)
+            logging.info("Added %d chunks to the vector store", len(added_ids))
+            return added_ids
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @staticmethod
+    def _add_embeddings(
+        vector_store: FAISS, texts: List[str], vectors: np.ndarray, metadatas: List[dict], ids: List[str] | None
+    ) -> List[str]:
+        """
+        Append embedded chunks at positions index.ntotal onwards.
+
+        FAISS.add_embeddings numbers new vectors from the size of the docstore
+        mapping, which falls behind index.ntotal while an HNSW index holds
+        tombstoned vectors; those stores are appended to here instead.
+        """
+        if not tombstones_of(vector_store):
+            return vector_store.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Duplicate ids found in the ids list.")
+        vectors = np.array(vectors, dtype=np.float32)
+        if vector_store._normalize_L2:
+            faiss.normalize_L2(vectors)
+        start = vector_store.index.ntotal
+        vector_store.index.add(vectors)
+        vector_store.docstore.add({
+            doc_id: Document(id=doc_id, page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+        })
+        vector_store.index_to_docstore_id.update({start + offset: doc_id for offset, doc_id in enumerate(ids)})
+        return ids
+
+    def delete_documents(self, vector_store: FAISS, ids: List[str]) -> None:
+        """
+        Remove chunks by docstore id from the index, the docstore and the exact and lexical stores.
+
+        The index goes first: flat indexes through FAISS.delete and IVF indexes drop the
+        vectors from their lists in place. HNSW cannot remove vectors: their positions
+        are tombstoned and skipped by search_index() until compact() rebuilds the index,
+        which the pipeline does once compaction_threshold of it was deleted. The other
+        stores are only changed once that succeeded, so a failure leaves them all in sync.
+        """
+        try:
+            if not ids:
+                return
+            index = vector_store.index
+            if index_kind(index) == "flat":
+                vector_store.delete(ids)
+            else:
+                doomed = set(ids)
+                keep: List[int] = []
+                removed: List[int] = []
+                for position, doc_id in sorted(vector_store.index_to_docstore_id.items()):
+                    (removed if doc_id in doomed else keep).append(position)
+                removed_ids = [vector_store.index_to_docstore_id[position] for position in removed]
+                if isinstance(index, faiss.IndexIVF):
+                    remove_ivf_positions(index, removed)
+                    vector_store.index_to_docstore_id = {
+                        new_position: vector_store.index_to_docstore_id[old_position]
+                        for new_position, old_position in enumerate(keep)
+                    }
+                else:
+                    for position in removed:
+                        del vector_store.index_to_docstore_id[position]
+                    _set_tombstones(vector_store, tombstones_of(vector_store).union(removed))
+                if removed_ids:
+                    vector_store.docstore.delete(removed_ids)
+            exact_vectors, lexical_index = exact_vectors_of(vector_store), lexical_index_of(vector_store)
+            if exact_vectors is not None:
+                exact_vectors.remove(ids)
+            if lexical_index is not None:
+                lexical_index.remove(ids)
+            logging.info("Deleted %d chunks from the vector store", len(ids))
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def _rebuild_index(self, vector_store: FAISS, keep: Sequence[int] | None = None) -> None:
+        """
+        Replace the store's index with a freshly built one holding the vectors at `keep`.
+
+        No text is re-embedded: vectors come from the exact vector file when there
+        is one, otherwise they are reconstructed from the current index, which for
+        fp16/SQ8/PQ storage means decoded codes that are quantized again (see
+        rebuilds_exactly()). The index
+        type and precision are re-resolved for the new corpus size. The new index is
+        built and filled before anything on the store changes, so a failed build
+        leaves the store as it was.
+        """
+        old_index = vector_store.index
+        if keep is None:
+            keep = sorted(vector_store.index_to_docstore_id)
+        keep = list(keep)
+        vectors = None
+        exact_vectors = exact_vectors_of(vector_store)
+        if exact_vectors is not None:
+            vectors = exact_vectors.get(
+                [vector_store.index_to_docstore_id[position] for position in keep]
+            )
+        if vectors is None:
+            if index_precision(old_index) != "fp32":
+                logging.info(
+                    "Rebuilding from decoded %s codes (no exact vectors); their quantization error is kept",
+                    index_precision(old_index),
+                )
+            vectors = reconstruct_vectors(old_index, keep)
+
+        if len(vectors):
+            index = build_faiss_index(vectors, self.config, metric=old_index.metric_type)
+            index.add(vectors)
+        else:
+            index = faiss.IndexFlat(old_index.d, old_index.metric_type)
+        kept_ids = {vector_store.index_to_docstore_id[position] for position in keep}
+        dropped_ids = [doc_id for doc_id in vector_store.index_to_docstore_id.values() if doc_id not in kept_ids]
+        vector_store.index = index
+        vector_store.index_to_docstore_id = {
+            new_position: vector_store.index_to_docstore_id[old_position]
+            for new_position, old_position in enumerate(keep)
+        }
+        _set_tombstones(vector_store, ())
+
+        if self._keeps_exact_vectors(index):
+            if exact_vectors is None:
+                exact_vectors = ExactVectorStore(index.d)
+                exact_vectors.append(list(vector_store.index_to_docstore_id.values()), vectors)
+                self._set_exact_vectors(vector_store, exact_vectors)
+            else:
+                exact_vectors.remove(dropped_ids)
+                exact_vectors.compact()
+        else:
+            self._set_exact_vectors(vector_store, None)
+
+    def needs_rebuild(self, vector_store: FAISS) -> bool:
+        """True when the configured index type or precision for the current size differs from the built one."""
+        index = vector_store.index
+        # Tombstoned HNSW vectors do not count towards the corpus size
+        num_vectors = len(vector_store.index_to_docstore_id)
+        index_type = resolve_index_type(num_vectors, self.config)
+        index_type, precision = fit_to_corpus(
+            num_vectors, index_type, resolve_precision(index_type, self.config), self.config
+        )
+        return index_kind(index) != index_type or index_precision(index) != precision
+
+    def rebuilds_exactly(self, vector_store: FAISS) -> bool:
+        """True when the store's full-precision vectors are at hand: an fp32 index or exact vectors."""
+        return index_precision(vector_store.index) == "fp32" or exact_vectors_of(vector_store) is not None
+
+    def index_settings(self) -> dict:
+        """The configured settings an index is built with, as recorded in artifact manifests."""
+        return {key: self.config.get(key) for key in INDEX_SETTINGS}
+
+    def is_outdated(self, vector_store: FAISS, manifest: dict) -> bool:
+        """
+        True when a loaded store was built with other index settings than the
+        configured ones, or its index type or precision no longer fits its size.
+        """
+        return manifest.get("index_settings") != self.index_settings() or self.needs_rebuild(vector_store)
+
+    def compact(self, vector_store: FAISS) -> None:
+        """
+        Rebuild the FAISS index from its live vectors.
+
+        Deleting ids shrinks the index but not the memory FAISS reserved for it, and
+        leaves deleted HNSW vectors in the graph as tombstones; rebuilding drops them,
+        reclaims that space, retrains IVF lists on the current data and lets `auto`
+        switch index type as the corpus grows. Live vectors keep their order.
+        """
+        try:
+            self._rebuild_index(vector_store)
+            logging.info(
+                "Compacted FAISS %s index to %d vectors",
+                index_kind(vector_store.index),
+                vector_store.index.ntotal,
+            )
+        except Exception as e:
+            raise MyException(e, sys)
+
+    @staticmethod
+    def artifact_path(artifacts_dir: str, fingerprint: str) -> str:
+        """Directory holding the persisted vector store for a document-set fingerprint."""
+        return os.path.join(artifacts_dir, "vectorstore", fingerprint)
+
+    @staticmethod
+    def prune_artifacts(artifacts_dir: str, current: str, keep_previous: int = 1) -> None:
+        """
+        Delete the vector store artifacts superseded by the one for `current`.
+
+        Every change to the document set is saved under a new fingerprint, so old
+        artifacts would otherwise pile up. The `keep_previous` most recently written
+        ones are kept besides the current one, so switching back to an earlier
+        document set can still load instead of re-embedding.
+        """
+        root = os.path.join(artifacts_dir, "vectorstore")
+        try:
+            entries = [entry for entry in os.scandir(root) if entry.is_dir() and entry.name != current]
+        except FileNotFoundError:
+            return
+        # Leftover temp dirs of interrupted saves are never worth keeping
+        previous = sorted(
+            (entry for entry in entries if not entry.name.endswith(".tmp")),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+        kept = {entry.name for entry in previous[:max(0, keep_previous)]}
+        for entry in entries:
+            if entry.name not in kept:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                logging.info("Removed superseded vector store artifact %s", entry.path)
+
+    def save_vector_store(self, vector_store: FAISS, artifact_dir: str, manifest: dict) -> None:
+        """
+        Persist the FAISS index, docstore (with chunk metadata) and a manifest.
+
+        The artifact is written to a sibling temp directory first and then moved
+        into place, so a crash mid-write never leaves a half-written artifact
+        that a later run would try to load.
+
+        Args:
+            vector_store (FAISS): the vector store to persist.
+            artifact_dir (str): target directory, usually from artifact_path().
+            manifest (dict): settings the artifact was built with; compared on load.
+        """
+        try:
+            tmp_dir = f"{artifact_dir}.tmp"
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+            os.makedirs(tmp_dir, exist_ok=True)
+
+            vector_store.save_local(tmp_dir)
+            exact_vectors, lexical_index = exact_vectors_of(vector_store), lexical_index_of(vector_store)
+            if exact_vectors is not None:
+                exact_vectors.save(tmp_dir)
+            if lexical_index is not None:
+                lexical_index.save(tmp_dir)
+            full_manifest = {
+                **manifest,
+                "version": ARTIFACT_VERSION,
+                "embedding_model": self.model_name,
+                "index_settings": self.index_settings(),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(full_manifest, f, indent=2)
+
+            if os.path.exists(artifact_dir):
+                shutil.rmtree(artifact_dir)
+            os.replace(tmp_dir, artifact_dir)
+            logging.info("Saved vector store artifact to %s", artifact_dir)
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def load_vector_store(self, artifact_dir: str, expected: dict) -> tuple[FAISS, dict] | None:
+        """
+        Load a persisted vector store if it exists and was built with matching settings.
+
+        Args:
+            artifact_dir (str): directory written by save_vector_store().
+            expected (dict): manifest entries that must match (fingerprint, chunking, ...).
+
+        Returns:
+            tuple[FAISS, dict] | None: the loaded store and its manifest, or None when
+            there is no usable artifact and the caller has to rebuild.
+        """
+        manifest_path = os.path.join(artifact_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            required = {**expected, "version": ARTIFACT_VERSION, "embedding_model": self.model_name}
+            mismatched = [key for key, value in required.items() if manifest.get(key) != value]
+            if mismatched:
+                logging.info("Ignoring stale vector store artifact at %s (changed: %s)", artifact_dir, mismatched)
+                return None
+
+            # The pickle inside the artifact was written by this application, not uploaded by a user.
+            vector_store = FAISS.load_local(
+                artifact_dir, self.embedder, allow_dangerous_deserialization=True
+            )
+            apply_search_params(vector_store.index, self.config)
+            # Positions missing from the mapping were deleted from an HNSW index after its last compaction
+            _set_tombstones(
+                vector_store, set(range(vector_store.index.ntotal)).difference(vector_store.index_to_docstore_id)
+            )
+            vector_store.exact_vectors = None
+            if self._keeps_exact_vectors(vector_store.index):
+                vector_store.exact_vectors = ExactVectorStore.load(artifact_dir)
+                if vector_store.exact_vectors is None:
+                    # Saved with rescore off: the vectors it needs only come from embedding again
+                    logging.info("Ignoring vector store artifact at %s: no exact vectors to re-score with", artifact_dir)
+                    return None
+            vector_store.lexical_index = None
+            if self.config.get("bm25_index", True):
+                vector_store.lexical_index = BM25Index.load(artifact_dir)
+                if vector_store.lexical_index is None:
+                    # Artifact saved without a lexical index: index the stored chunk texts
+                    vector_store.lexical_index = self._new_lexical_index()
+                    ids = list(vector_store.index_to_docstore_id.values())
+                    vector_store.lexical_index.add(
+                        ids, (vector_store.docstore.search(doc_id).page_content for doc_id in ids)
+                    )
+            logging.info("Loaded vector store artifact from %s", artifact_dir)
+            return vector_store, manifest
+        except Exception as e:
+            logging.warning("Could not load vector store artifact %s: %s", artifact_dir, e)
+            return None
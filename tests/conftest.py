@@ -0,0 +1,142 @@
+import hashlib
+import os
+from typing import List
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage
+
+from src.rag import pipelines
+from src.utils.main_utils import get_tokenizer, load_configs
+from src.vectorstore.faiss_store import FaissVectorStore
+
+DIM = 64
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "configs")
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic offline embeddings: a random unit vector seeded by the text."""
+
+    def __init__(self):
+        self.documents_embedded = 0
+        self.queries_embedded = 0
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(DIM)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.documents_embedded += len(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.queries_embedded += 1
+        return self._embed(text)
+
+
+class StubCrossEncoder:
+    """Stands in for sentence-transformers' CrossEncoder: scores the share of query words in the text."""
+
+    def __init__(self, model_name: str = "stub", device: str | None = None, max_length: int | None = None):
+        self.pairs_scored = 0
+
+    def predict(self, pairs, batch_size: int = 32) -> np.ndarray:
+        self.pairs_scored += len(pairs)
+        scores = []
+        for query, text in pairs:
+            words = set(query.lower().split())
+            scores.append(len(words & set(text.lower().split())) / max(1, len(words)))
+        return np.asarray(scores, dtype=np.float32)
+
+
+class StubLLM:
+    """Stands in for ChatOllama; numbers its answers so repeated generations are told apart."""
+
+    def __init__(self, **kwargs):
+        self.calls = 0
+
+    def invoke(self, messages) -> AIMessage:
+        self.calls += 1
+        return AIMessage(content=f"Answer {self.calls}")
+
+
+@pytest.fixture
+def tokenizer():
+    """The chunking tokenizer; tests that chunk text are skipped where it cannot be loaded (offline)."""
+    try:
+        return get_tokenizer()
+    except Exception as e:
+        pytest.skip(f"tiktoken encoding is not available: {e}")
+
+
+@pytest.fixture
+def make_faiss_store():
+    """FaissVectorStore factory over HashEmbeddings, so no Ollama server is needed."""
+    def make(**vectorstore_config) -> FaissVectorStore:
+        store = FaissVectorStore({}, vectorstore_config)
+        store.embedder = HashEmbeddings()
+        return store
+    return make
+
+
+@pytest.fixture
+def stub_cross_encoder(monkeypatch):
+    """Make rerankers built in this process load StubCrossEncoder instead of a real model."""
+    import sentence_transformers
+
+    monkeypatch.setattr(sentence_transformers, "CrossEncoder", StubCrossEncoder)
+
+
+@pytest.fixture
+def make_pipeline(tmp_path, monkeypatch, tokenizer, stub_cross_encoder):
+    """
+    RAGPipeline factory over the repo configs with HashEmbeddings, a stub cross-encoder
+    model and a stub LLM; every artifact and cache is written under tmp_path. Keyword
+    arguments update config sections, e.g. make_pipeline(vectorstore={"index_type": "hnsw"}).
+    """
+    monkeypatch.setattr(pipelines, "ChatOllama", StubLLM)
+
+    def make(**sections) -> pipelines.RAGPipeline:
+        config = load_configs(CONFIG_DIR)
+        config["embedding"]["cache"] = {"enabled": False}
+        config["pipeline"].update(
+            artifacts_dir=str(tmp_path / "artifacts"),
+            uploads_dir=str(tmp_path / "uploads"),
+            ingestion_workers=0,
+            pdf_page_workers=0,
+            web_fetch={"cache_dir": str(tmp_path / "web_cache")},
+        )
+        for name, values in sections.items():
+            config.setdefault(name, {}).update(values)
+        monkeypatch.setattr(pipelines, "load_configs", lambda config_dir: config)
+        pipeline = pipelines.RAGPipeline()
+        pipeline.faiss_store.embedder = HashEmbeddings()
+        return pipeline
+    return make
+
+
+@pytest.fixture
+def write_documents(tmp_path):
+    """Write text documents under tmp_path/docs and return their pipeline config entries."""
+    def write(texts: dict) -> List[dict]:
+        os.makedirs(tmp_path / "docs", exist_ok=True)
+        docs = []
+        for name, text in texts.items():
+            path = tmp_path / "docs" / name
+            path.write_text(text, encoding="utf-8")
+            docs.append({"path": str(path), "enabled": True})
+        return docs
+    return write
+
+
+@pytest.fixture
+def topic_text():
+    """Text generator: a few paragraphs about a topic, enough for several chunks."""
+    def text(topic: str, paragraphs: int = 6) -> str:
+        return "\n\n".join(
+            f"Section {i} on {topic}. " + " ".join(f"{topic} detail {i}-{j} is described here." for j in range(40))
+            for i in range(paragraphs)
+        )
+    return text
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from src.rag.answer_cache import AnswerCache
+
+
+def answer(text: str) -> dict:
+    return {"answer": text, "sources": []}
+
+
+def test_similarity_threshold_decides_semantic_hits():
+    cache = AnswerCache(similarity_threshold=0.9)
+    cache.put("How do solar panels work?", np.array([1.0, 0.0]), answer("cached"), None)
+
+    close = np.array([0.95, np.sqrt(1 - 0.95**2)])
+    far = np.array([0.8, np.sqrt(1 - 0.8**2)])
+    assert cache.lookup("Explain photovoltaics", lambda query: close)[0] == answer("cached")
+    assert cache.lookup("Explain tides", lambda query: far)[0] is None
+    assert (cache.stats()["semantic_hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_answer_for_a_replaced_document_set_is_not_cached():
+    cache = AnswerCache()
+    cache.set_fingerprint("old")
+    cache.set_fingerprint("new")
+
+    assert not cache.put("question", None, answer("stale"), "old")
+    assert cache.lookup("question")[0] is None
+    assert cache.put("question", None, answer("fresh"), "new")
+    assert cache.lookup("question")[0] == answer("fresh")
+
+
+@pytest.fixture
+def pipeline(make_pipeline, write_documents, topic_text):
+    pipeline = make_pipeline(generation={"answer_cache": {"enabled": True, "similarity_threshold": 0.95}})
+    pipeline.config["documents"] = write_documents({"solar.txt": topic_text("solar")})
+    pipeline.prepare_vector_store()
+    return pipeline
+
+
+def test_repeated_question_is_answered_from_the_cache(pipeline):
+    first = pipeline.answer_with_sources("What is solar detail 1-2?")
+    calls = pipeline.llm.calls
+    second = pipeline.answer_with_sources("what is solar detail 1-2")
+
+    assert (first["cache_hit"], second["cache_hit"]) == (False, True)
+    assert second["answer"] == first["answer"]
+    assert pipeline.llm.calls == calls
+
+
+def test_different_question_misses_the_cache(pipeline):
+    first = pipeline.answer_with_sources("What is solar detail 1-2?")
+    second = pipeline.answer_with_sources("What is solar detail 3-4?")
+
+    assert not second["cache_hit"]
+    assert second["answer"] != first["answer"]
+
+
+def test_changing_the_documents_invalidates_cached_answers(pipeline, write_documents, topic_text):
+    first = pipeline.answer_with_sources("What is solar detail 1-2?")
+
+    pipeline.config["documents"] = write_documents(
+        {"solar.txt": topic_text("solar"), "tides.txt": topic_text("tides")}
+    )
+    pipeline.prepare_vector_store()
+
+    second = pipeline.answer_with_sources("What is solar detail 1-2?")
+    assert not second["cache_hit"]
+    assert second["answer"] != first["answer"]
+
+
+def test_answer_is_not_cached_when_documents_change_during_generation(pipeline, monkeypatch):
+    retrieve = pipeline.retrieve
+
+    def retrieve_then_reindex(query, query_vec=None):
+        documents = retrieve(query, query_vec=query_vec)
+        # Another request re-indexes while this answer is being generated
+        pipeline.answer_cache.set_fingerprint("re-indexed")
+        return documents
+
+    monkeypatch.setattr(pipeline, "retrieve", retrieve_then_reindex)
+    assert not pipeline.answer_with_sources("What is solar detail 1-2?")["cache_hit"]
+    assert pipeline.answer_cache.stats()["entries"] == 0
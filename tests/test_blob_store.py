@@ -0,0 +1,67 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from src.ingestion.blob_store import BlobStore
+from src.utils.main_utils import file_content_hash
+
+CONTENT = os.urandom(10_000)
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Small blocks, so a stream spans several reads
+    return BlobStore(str(tmp_path / "uploads"), block_size=1024)
+
+
+def blobs(store):
+    return sorted(
+        os.path.join(entry.path, name)
+        for entry in os.scandir(store.root)
+        if entry.is_dir() and entry.name != "incoming"
+        for name in os.listdir(entry.path)
+    )
+
+
+def test_streaming_hash_is_the_content_hash_used_for_fingerprints(store):
+    path, content_hash = store.put_stream(io.BytesIO(CONTENT), ".PDF")
+
+    assert content_hash == hashlib.md5(CONTENT).hexdigest() == file_content_hash(path)
+    assert path == store.blob_path(content_hash, ".pdf")
+    with open(path, "rb") as f:
+        assert f.read() == CONTENT
+
+
+def test_same_bytes_are_stored_once(store):
+    first, _ = store.put_stream(io.BytesIO(CONTENT), ".pdf")
+    second, _ = store.put_stream(io.BytesIO(CONTENT), ".pdf")
+
+    assert first == second
+    assert blobs(store) == [first]
+    assert os.listdir(os.path.join(store.root, "incoming")) == []
+
+
+def test_collect_keeps_referenced_and_pinned_blobs(store):
+    indexed, _ = store.put_stream(io.BytesIO(b"indexed"), ".txt")
+    replaced, _ = store.put_stream(io.BytesIO(b"replaced"), ".txt")
+    pending, _ = store.put_stream(io.BytesIO(b"pending"), ".txt")
+    store.release([indexed, replaced])
+
+    assert store.collect([indexed]) == 1
+    assert blobs(store) == sorted([indexed, pending])
+
+
+def test_blob_is_collected_once_every_upload_of_it_is_released(store):
+    path, _ = store.put_stream(io.BytesIO(CONTENT), ".pdf")
+    store.put_stream(io.BytesIO(CONTENT), ".pdf")
+
+    store.release([path])
+    assert store.collect([]) == 0
+    assert os.path.exists(path)
+
+    store.release([path])
+    assert store.collect([]) == 1
+    assert not os.path.exists(path)
+    assert not os.path.exists(os.path.dirname(path))
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from src.embedding.cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    QueryCachedEmbeddings,
+    QueryEmbeddingCache,
+    shared_query_cache,
+    text_hash,
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), touch_interval=60)
+
+
+def rows(cache):
+    return dict(cache._conn.execute("SELECT key, last_access FROM embeddings").fetchall())
+
+
+def test_queries_are_not_persisted(cache, make_faiss_store):
+    model = make_faiss_store().embedder
+    embeddings = CachedEmbeddings(model, cache, "hash")
+
+    embeddings.embed_documents(["a chunk"])
+    query_vector = embeddings.embed_query("a question")
+
+    assert query_vector == model.embed_query("a question")
+    assert list(rows(cache)) == [text_hash("a chunk")]
+
+
+def test_recent_hits_are_read_only(cache):
+    cache.put_many("hash", {"key": [1.0, 0.0]})
+    changes = cache._conn.total_changes
+
+    assert cache.get_many("hash", ["key", "missing"]) == {"key": [1.0, 0.0]}
+    assert cache._conn.total_changes == changes
+    assert not cache._conn.in_transaction
+
+
+def test_stale_hits_refresh_last_access(cache):
+    cache.put_many("hash", {"old": [1.0], "new": [2.0]})
+    long_ago = time.time() - 3600
+    cache._conn.execute("UPDATE embeddings SET last_access = ? WHERE key = 'old'", (long_ago,))
+    cache._conn.commit()
+    new_access = rows(cache)["new"]
+
+    cache.get_many("hash", ["old", "new"])
+
+    assert rows(cache)["old"] > long_ago + 3000
+    assert rows(cache)["new"] == new_access
+    assert not cache._conn.in_transaction
+
+
+def test_query_lru_embeds_each_query_once(make_faiss_store):
+    model = make_faiss_store().embedder
+    embeddings = QueryCachedEmbeddings(model, QueryEmbeddingCache(max_entries=2))
+
+    first = embeddings.embed_query("a question")
+    assert embeddings.embed_query("a question") == first
+    embeddings.embed_documents(["a question"])
+    assert (model.queries_embedded, model.documents_embedded) == (1, 1)
+
+    # Least recently used query is evicted past max_entries
+    embeddings.embed_query("second question")
+    embeddings.embed_query("third question")
+    embeddings.embed_query("a question")
+    assert model.queries_embedded == 4
+    assert embeddings.cache.stats()["entries"] == 2
+
+
+def test_shared_query_cache_is_one_per_model():
+    assert shared_query_cache("test-model-a") is shared_query_cache("test-model-a")
+    assert shared_query_cache("test-model-a") is not shared_query_cache("test-model-b")
+
+
+@pytest.mark.parametrize("answer_cache", [False, True])
+def test_search_mmr_and_answer_cache_share_one_query_embedding(
+    answer_cache, make_pipeline, write_documents, topic_text
+):
+    pipeline = make_pipeline(generation={"answer_cache": {"enabled": answer_cache}})
+    model = pipeline.faiss_store.embedder
+    pipeline.faiss_store.embedder = QueryCachedEmbeddings(model, QueryEmbeddingCache())
+    pipeline.config["documents"] = write_documents({"solar.txt": topic_text("solar")})
+    pipeline.prepare_vector_store()
+
+    pipeline.answer_with_sources("What is solar detail 1-2?")
+    assert model.queries_embedded == 1
+
+    pipeline.retrieve("What is solar detail 1-2?")
+    pipeline.answer_with_sources("What is solar detail 1-2?")
+    assert model.queries_embedded == 1
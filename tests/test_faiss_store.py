@@ -0,0 +1,179 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src.vectorstore.faiss_store import (
+    FaissVectorStore,
+    build_faiss_index,
+    exact_vectors_of,
+    index_kind,
+    index_precision,
+    lexical_index_of,
+    search_index,
+    tombstones_of,
+)
+
+# Fewer chunks than the 2**8 centroids a PQ{m}x8 codebook has to train
+SMALL_CORPUS = 187
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((SMALL_CORPUS, 64)).astype(np.float32)
+
+
+@pytest.mark.parametrize(
+    "config, expected",
+    [
+        ({"index_type": "flat", "vector_precision": "pq"}, ("flat", "sq8")),
+        ({"index_type": "hnsw", "vector_precision": "pq"}, ("hnsw", "sq8")),
+        ({"index_type": "ivf_pq"}, ("ivf_flat", "sq8")),
+    ],
+)
+def test_pq_falls_back_to_sq8_below_the_codebook_size(vectors, config, expected):
+    index = build_faiss_index(vectors, {**config, "pq_m": 16, "pq_nbits": 8})
+    index.add(vectors)
+
+    assert (index_kind(index), index_precision(index)) == expected
+    assert index.ntotal == SMALL_CORPUS
+
+
+def test_pq_is_kept_when_the_corpus_fills_the_codebook(vectors):
+    index = build_faiss_index(vectors, {"index_type": "ivf_pq", "pq_m": 16, "pq_nbits": 7})
+
+    assert (index_kind(index), index_precision(index)) == ("ivf_pq", "pq")
+
+
+def chunks(count: int) -> list:
+    return [{"text": f"chunk {i} about topic {i % 7}", "metadata": {"source": "test"}} for i in range(count)]
+
+
+def assert_in_sync(faiss_store, vector_store):
+    ids = list(vector_store.index_to_docstore_id.values())
+    live = set(range(vector_store.index.ntotal)) - tombstones_of(vector_store)
+    assert sorted(vector_store.index_to_docstore_id) == sorted(live)
+    assert len(vector_store.docstore._dict) == len(ids)
+    assert len(lexical_index_of(vector_store)) == len(ids)
+    if exact_vectors_of(vector_store) is not None:
+        assert len(exact_vectors_of(vector_store)) == len(ids)
+    # Every remaining chunk is still found at its own position
+    vectors = np.asarray(faiss_store.embedder.embed_documents(
+        [vector_store.docstore.search(doc_id).page_content for doc_id in ids]
+    ), dtype=np.float32)
+    _, labels = search_index(vector_store, vectors, 1)
+    assert [vector_store.index_to_docstore_id[label] for label in labels[:, 0]] == ids
+
+
+@pytest.mark.parametrize("index_type", ["ivf_pq", "ivf_flat", "hnsw"])
+def test_delete_below_the_codebook_size_keeps_stores_in_sync(make_faiss_store, index_type):
+    faiss_store = make_faiss_store(
+        index_type=index_type, vector_precision="sq8", pq_m=16, pq_nbits=8, nprobe=64, rescore=True
+    )
+    ids = [f"id-{i}" for i in range(300)]
+    vector_store = faiss_store.create_vector_store(chunks(300), ids=ids)
+
+    faiss_store.delete_documents(vector_store, ids[::3] + ids[1::3])
+
+    assert len(vector_store.index_to_docstore_id) == 100
+    assert list(vector_store.index_to_docstore_id.values()) == ids[2::3]
+    assert_in_sync(faiss_store, vector_store)
+
+    # ivf_pq cannot be retrained on 100 vectors; compaction falls back instead of failing
+    if faiss_store.needs_rebuild(vector_store):
+        faiss_store.compact(vector_store)
+    assert_in_sync(faiss_store, vector_store)
+
+
+def test_hnsw_delete_tombstones_vectors_until_compaction(make_faiss_store, tmp_path):
+    faiss_store = make_faiss_store(index_type="hnsw", vector_precision="fp32")
+    ids = [f"id-{i}" for i in range(200)]
+    vector_store = faiss_store.create_vector_store(chunks(200), ids=ids)
+    index = vector_store.index
+
+    faiss_store.delete_documents(vector_store, ids[:50])
+
+    # No rebuild: the vectors stay in the graph and are skipped by searches
+    assert vector_store.index is index and index.ntotal == 200
+    assert tombstones_of(vector_store) == set(range(50))
+    deleted = faiss_store.embedder.embed_documents([chunk["text"] for chunk in chunks(50)])
+    _, labels = search_index(vector_store, np.asarray(deleted, dtype=np.float32), 10)
+    assert labels.min() >= 50
+    assert_in_sync(faiss_store, vector_store)
+
+    # New chunks go after the tombstones
+    faiss_store.add_documents(vector_store, chunks(210)[200:], ids=[f"new-{i}" for i in range(10)])
+    assert [vector_store.index_to_docstore_id[position] for position in range(200, 210)] == [
+        f"new-{i}" for i in range(10)
+    ]
+    assert_in_sync(faiss_store, vector_store)
+
+    faiss_store.save_vector_store(vector_store, str(tmp_path / "artifact"), {"fingerprint": "a"})
+    loaded, _ = faiss_store.load_vector_store(str(tmp_path / "artifact"), {"fingerprint": "a"})
+    assert tombstones_of(loaded) == set(range(50))
+    assert_in_sync(faiss_store, loaded)
+
+    faiss_store.compact(vector_store)
+    assert vector_store.index.ntotal == 160 and not tombstones_of(vector_store)
+    assert list(vector_store.index_to_docstore_id.values()) == ids[50:] + [f"new-{i}" for i in range(10)]
+    assert_in_sync(faiss_store, vector_store)
+
+
+def test_new_stores_leave_the_served_store_intact(make_faiss_store, tmp_path):
+    faiss_store = make_faiss_store(index_type="flat", vector_precision="sq8", rescore=True)
+    served = faiss_store.create_vector_store(chunks(50), ids=[f"a-{i}" for i in range(50)])
+    served_exact = exact_vectors_of(served)
+    faiss_store.save_vector_store(served, str(tmp_path / "artifact"), {"fingerprint": "a"})
+
+    built = faiss_store.create_vector_store(chunks(20), ids=[f"b-{i}" for i in range(20)])
+    loaded, _ = faiss_store.load_vector_store(str(tmp_path / "artifact"), {"fingerprint": "a"})
+
+    assert exact_vectors_of(served) is served_exact
+    assert served_exact.get(["a-0", "a-49"]) is not None
+    assert len(lexical_index_of(served)) == 50
+    assert len(exact_vectors_of(built)) == 20 and len(exact_vectors_of(loaded)) == 50
+
+    # Once the retriever moved on, release() deletes the old store's file
+    faiss_store.release(served)
+    assert exact_vectors_of(served) is None
+    assert not os.path.exists(served_exact.path)
+
+
+def make_artifact(artifacts_dir, name, age):
+    path = FaissVectorStore.artifact_path(str(artifacts_dir), name)
+    os.makedirs(path)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+
+def test_prune_artifacts_keeps_current_and_most_recent_previous(tmp_path):
+    for name, age in [("current", 300), ("newest", 10), ("older", 100), ("oldest", 200), ("crashed.tmp", 0)]:
+        make_artifact(tmp_path, name, age)
+
+    FaissVectorStore.prune_artifacts(str(tmp_path), "current", keep_previous=1)
+
+    assert sorted(os.listdir(tmp_path / "vectorstore")) == ["current", "newest"]
+
+
+def test_prune_artifacts_can_keep_only_current(tmp_path):
+    for name, age in [("current", 0), ("previous", 10)]:
+        make_artifact(tmp_path, name, age)
+
+    FaissVectorStore.prune_artifacts(str(tmp_path), "current", keep_previous=0)
+    FaissVectorStore.prune_artifacts(str(tmp_path / "missing"), "current")
+
+    assert os.listdir(tmp_path / "vectorstore") == ["current"]
+
+
+def test_pq_fallback_is_retried_once_the_corpus_fills_the_codebook(make_faiss_store):
+    faiss_store = make_faiss_store(index_type="ivf_pq", pq_m=16, pq_nbits=8)
+    vector_store = faiss_store.create_vector_store(chunks(SMALL_CORPUS), ids=[f"a-{i}" for i in range(SMALL_CORPUS)])
+    assert index_kind(vector_store.index) == "ivf_flat"
+    assert not faiss_store.needs_rebuild(vector_store)
+
+    faiss_store.add_documents(vector_store, chunks(300)[SMALL_CORPUS:] + chunks(100), ids=[f"b-{i}" for i in range(213)])
+
+    assert faiss_store.needs_rebuild(vector_store)
+    faiss_store.compact(vector_store)
+    assert (index_kind(vector_store.index), index_precision(vector_store.index)) == ("ivf_pq", "pq")
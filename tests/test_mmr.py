@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from src.retrieval.mmr import maximal_marginal_relevance
+
+
+def reference_mmr(query_vec: np.ndarray, doc_vecs: np.ndarray, k: int, lambda_mult: float) -> list:
+    """Textbook MMR: every step recomputes each candidate's score from pairwise cosines."""
+    def cosine(a: np.ndarray, b: np.ndarray) -> float:
+        denom = np.linalg.norm(a) * np.linalg.norm(b)
+        return 0.0 if denom == 0 else float(np.dot(a, b) / denom)
+
+    selected: list = []
+    remaining = list(range(len(doc_vecs)))
+    while remaining and len(selected) < k:
+        if not selected:
+            chosen = max(remaining, key=lambda idx: cosine(query_vec, doc_vecs[idx]))
+        else:
+            chosen = max(
+                remaining,
+                key=lambda idx: lambda_mult * cosine(query_vec, doc_vecs[idx])
+                - (1 - lambda_mult) * max(cosine(doc_vecs[idx], doc_vecs[sel]) for sel in selected),
+            )
+        selected.append(chosen)
+        remaining.remove(chosen)
+    return selected
+
+
+def random_candidates(seed: int, n: int, dim: int = 32, duplicates: int = 0):
+    rng = np.random.default_rng(seed)
+    query = rng.standard_normal(dim)
+    docs = rng.standard_normal((n, dim))
+    if duplicates:
+        # Exact copies of earlier rows, placed after them
+        docs = np.vstack([docs, docs[rng.choice(n, duplicates, replace=False)]])
+    return query, docs
+
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.3, 0.5, 0.8, 1.0])
+@pytest.mark.parametrize("seed", range(5))
+def test_selection_matches_the_reference(seed, lambda_mult):
+    query, docs = random_candidates(seed, n=40)
+
+    for k in (1, 5, 20):
+        assert maximal_marginal_relevance(query, docs, k, lambda_mult) == reference_mmr(query, docs, k, lambda_mult)
+
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.5, 1.0])
+def test_k_larger_than_the_candidates_returns_each_once(lambda_mult):
+    query, docs = random_candidates(7, n=6)
+
+    selected = maximal_marginal_relevance(query, docs, 10, lambda_mult)
+
+    assert selected == reference_mmr(query, docs, 10, lambda_mult)
+    assert sorted(selected) == list(range(6))
+
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.5, 1.0])
+def test_duplicate_vectors_match_the_reference(lambda_mult):
+    query, docs = random_candidates(11, n=15, duplicates=5)
+
+    assert maximal_marginal_relevance(query, docs, 12, lambda_mult) == reference_mmr(query, docs, 12, lambda_mult)
+
+
+def test_diversity_only_never_picks_a_duplicate_before_the_rest():
+    query, docs = random_candidates(3, n=8, duplicates=3)
+
+    selected = maximal_marginal_relevance(query, docs, 8, lambda_mult=0.0)
+
+    assert sorted(selected) == list(range(8))
+
+
+def test_empty_input_and_zero_k():
+    query, docs = random_candidates(0, n=4)
+
+    assert maximal_marginal_relevance(query, np.empty((0, 32)), 3) == []
+    assert maximal_marginal_relevance(query, docs, 0) == []
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from src.ingestion import parallel
+from src.ingestion.parallel import stream_documents
+
+
+def messages_by_position(paths, **kwargs):
+    messages = {}
+    for position, chunks, error in stream_documents(paths, 200, 20, batch_size=4, **kwargs):
+        messages.setdefault(position, []).append((chunks, error))
+    return messages
+
+
+def fail_midway(monkeypatch, failing_path):
+    """Make `failing_path` raise after its first 4 chunks, as a corrupt page deep in a document would."""
+    iter_document_chunks = parallel.iter_document_chunks
+
+    def iter_chunks(path, *args):
+        chunks = iter_document_chunks(path, *args)
+        if path != failing_path:
+            return chunks
+        return (chunk if i < 4 else 1 / 0 for i, chunk in enumerate(chunks))
+
+    monkeypatch.setattr(parallel, "iter_document_chunks", iter_chunks)
+
+
+@pytest.fixture
+def paths(tmp_path, tokenizer, topic_text):
+    for name in ("solar.txt", "tides.txt", "notes.csv"):
+        (tmp_path / name).write_text(topic_text(name.split(".")[0]), encoding="utf-8")
+    return [
+        str(tmp_path / "solar.txt"),
+        str(tmp_path / "missing.txt"),
+        str(tmp_path / "notes.csv"),
+        str(tmp_path / "tides.txt"),
+    ]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_failed_documents_do_not_affect_the_others(paths, workers):
+    messages = messages_by_position(paths, workers=workers, page_workers=0)
+
+    assert sorted(messages) == [0, 1, 2, 3]
+    for position in (1, 2):
+        [(chunks, error)] = messages[position]
+        assert chunks is None and paths[position] in error
+    for position in (0, 3):
+        *batches, end = messages[position]
+        assert end == (None, None)
+        assert batches and all(chunks and error is None for chunks, error in batches)
+        assert {chunk["metadata"]["source"] for chunks, _ in batches for chunk in chunks} == {
+            os.path.basename(paths[position])
+        }
+
+
+def test_document_failing_midway_ends_with_its_error(paths, monkeypatch):
+    fail_midway(monkeypatch, paths[0])
+    messages = messages_by_position([paths[0], paths[3]], workers=0)
+
+    first_batch, (chunks, error) = messages[0]
+    assert len(first_batch[0]) == 4 and chunks is None and "division by zero" in error
+    assert messages[1][-1] == (None, None)
+
+
+def test_pipeline_drops_the_chunks_of_a_document_that_failed_midway(
+    make_pipeline, write_documents, topic_text, monkeypatch
+):
+    docs = write_documents({"solar.txt": topic_text("solar"), "tides.txt": topic_text("tides")})
+    tides = docs[1]["path"]
+    fail_midway(monkeypatch, tides)
+    pipeline = make_pipeline(pipeline={"ingestion_batch_size": 4})
+    pipeline.config["documents"] = docs
+    pipeline.prepare_vector_store()
+
+    assert list(pipeline.ingestion_errors) == [tides]
+    assert "division by zero" in pipeline.ingestion_errors[tides]
+    sources = {doc.metadata["source"] for doc in pipeline.vector_store.docstore._dict.values()}
+    assert sources == {"solar.txt"}
+    assert pipeline.vector_store.index.ntotal == len(pipeline.vector_store.index_to_docstore_id)
+    assert [entry["path"] for entry in pipeline.document_index.values()] == [docs[0]["path"]]
@@ -0,0 +1,49 @@
+from langchain_community.document_loaders import PyPDFLoader
+from pypdf import PdfWriter
+
+from src.ingestion import pdf_pages
+from src.ingestion.pdf_pages import iter_pdf_pages, shutdown_page_pool
+
+
+def blank_pdf(path, num_pages: int) -> str:
+    writer = PdfWriter()
+    for _ in range(num_pages):
+        writer.add_blank_page(width=200, height=200)
+    writer.set_page_label(0, num_pages - 1, style="/r")
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def pages(documents):
+    return [(page.page_content, page.metadata) for page in documents]
+
+
+def serial_pages(path: str):
+    return pages(PyPDFLoader(path).lazy_load())
+
+
+def test_short_pdfs_are_read_serially(tmp_path):
+    path = blank_pdf(tmp_path / "short.pdf", 40)
+
+    assert pages(iter_pdf_pages(path, workers=2, pages_per_task=8, min_pages=50)) == serial_pages(path)
+    assert pdf_pages._pool is None
+
+
+def test_page_pool_is_reused_across_documents(tmp_path):
+    first, second = blank_pdf(tmp_path / "first.pdf", 40), blank_pdf(tmp_path / "second.pdf", 30)
+    try:
+        assert pages(iter_pdf_pages(first, workers=2, pages_per_task=8, min_pages=0)) == serial_pages(first)
+        pool = pdf_pages._pool
+        assert pool is not None
+
+        # The consumer stopping early leaves the pool usable
+        partial = iter_pdf_pages(second, workers=2, pages_per_task=8, min_pages=0)
+        next(partial)
+        partial.close()
+
+        assert pages(iter_pdf_pages(second, workers=2, pages_per_task=8, min_pages=0)) == serial_pages(second)
+        assert pdf_pages._pool is pool
+    finally:
+        shutdown_page_pool()
+    assert pdf_pages._pool is None
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from src.vectorstore.faiss_store import exact_vectors_of, index_kind, index_precision, tombstones_of
+
+
+def test_artifact_is_rebuilt_when_index_settings_change(make_pipeline, write_documents, topic_text):
+    docs = write_documents({"solar.txt": topic_text("solar"), "tides.txt": topic_text("tides")})
+
+    first = make_pipeline(vectorstore={"index_type": "flat", "vector_precision": "fp32"})
+    first.config["documents"] = docs
+    first.prepare_vector_store()
+    assert index_kind(first.vector_store.index) == "flat"
+
+    # Same documents, new index settings: the artifact loads, then the index is rebuilt without re-embedding
+    second = make_pipeline(vectorstore={"index_type": "hnsw", "vector_precision": "sq8"})
+    second.config["documents"] = docs
+    second.prepare_vector_store()
+    assert (index_kind(second.vector_store.index), index_precision(second.vector_store.index)) == ("hnsw", "sq8")
+    assert second.vector_store.index.ntotal == first.vector_store.index.ntotal
+    assert second.faiss_store.embedder.documents_embedded == 0
+
+    # The rebuilt index was saved again, so the next start loads it as it is
+    third = make_pipeline(vectorstore={"index_type": "hnsw", "vector_precision": "sq8"})
+    third.config["documents"] = docs
+    third.prepare_vector_store()
+    assert (index_kind(third.vector_store.index), index_precision(third.vector_store.index)) == ("hnsw", "sq8")
+    assert third.faiss_store.embedder.documents_embedded == 0
+    assert third.retrieve("solar detail")
+
+
+def prepared(make_pipeline, docs, **vectorstore):
+    pipeline = make_pipeline(vectorstore=vectorstore)
+    pipeline.config["documents"] = docs
+    pipeline.prepare_vector_store()
+    return pipeline
+
+
+def test_compressed_artifact_without_exact_vectors_is_re_embedded(make_pipeline, write_documents, topic_text):
+    docs = write_documents({"solar.txt": topic_text("solar")})
+    first = prepared(make_pipeline, docs, index_type="flat", vector_precision="sq8", rescore=False)
+    chunks = first.vector_store.index.ntotal
+
+    # fp32 from SQ8 codes would keep their error: embed again instead of rebuilding
+    second = prepared(make_pipeline, docs, index_type="flat", vector_precision="fp32", rescore=False)
+    assert index_precision(second.vector_store.index) == "fp32"
+    assert second.faiss_store.embedder.documents_embedded == chunks
+
+    # The fp32 artifact saved by then is rebuilt as SQ8, its vectors kept for re-scoring
+    third = prepared(make_pipeline, docs, index_type="flat", vector_precision="sq8", rescore=True)
+    assert index_precision(third.vector_store.index) == "sq8"
+    assert third.faiss_store.embedder.documents_embedded == 0
+    assert len(exact_vectors_of(third.vector_store)) == chunks
+
+
+def test_turning_rescore_on_re_embeds_a_compressed_artifact(make_pipeline, write_documents, topic_text):
+    docs = write_documents({"solar.txt": topic_text("solar")})
+    first = prepared(make_pipeline, docs, index_type="flat", vector_precision="sq8", rescore=False)
+    assert exact_vectors_of(first.vector_store) is None
+
+    # Re-scoring needs exact vectors the SQ8 artifact never had
+    second = prepared(make_pipeline, docs, index_type="flat", vector_precision="sq8", rescore=True)
+    assert second.faiss_store.embedder.documents_embedded == first.vector_store.index.ntotal
+    assert len(exact_vectors_of(second.vector_store)) == first.vector_store.index.ntotal
+
+
+def test_compressed_artifact_with_exact_vectors_is_rebuilt_from_them(make_pipeline, write_documents, topic_text):
+    docs = write_documents({"solar.txt": topic_text("solar")})
+    prepared(make_pipeline, docs, index_type="flat", vector_precision="sq8", rescore=True)
+
+    second = prepared(make_pipeline, docs, index_type="hnsw", vector_precision="fp16", rescore=True)
+    assert (index_kind(second.vector_store.index), index_precision(second.vector_store.index)) == ("hnsw", "fp16")
+    assert second.faiss_store.embedder.documents_embedded == 0
+
+
+@pytest.mark.parametrize("index_type,precision", [("flat", "fp32"), ("hnsw", "fp32"), ("flat", "sq8")])
+def test_streaming_in_small_batches_builds_the_one_shot_index(
+    make_pipeline, write_documents, topic_text, tmp_path, index_type, precision
+):
+    docs = write_documents({name: topic_text(name.split(".")[0]) for name in ("solar.txt", "tides.txt", "wind.txt")})
+
+    def build(batch_size):
+        pipeline = make_pipeline(
+            pipeline={"ingestion_batch_size": batch_size, "artifacts_dir": str(tmp_path / f"artifacts-{batch_size}")},
+            vectorstore={"index_type": index_type, "vector_precision": precision},
+        )
+        pipeline.config["documents"] = docs
+        pipeline.prepare_vector_store()
+        return pipeline.vector_store
+
+    one_shot, streamed = build(100_000), build(3)
+
+    def contents(store):
+        return [
+            (store.docstore.search(doc_id).page_content, store.docstore.search(doc_id).metadata)
+            for _, doc_id in sorted(store.index_to_docstore_id.items())
+        ]
+
+    assert (index_kind(streamed.index), index_precision(streamed.index)) == (index_type, precision)
+    assert streamed.index.ntotal == one_shot.index.ntotal > 3
+    assert contents(streamed) == contents(one_shot)
+    np.testing.assert_array_equal(
+        streamed.index.reconstruct_n(0, streamed.index.ntotal), one_shot.index.reconstruct_n(0, one_shot.index.ntotal)
+    )
+
+
+def test_hnsw_deletes_are_tombstoned_until_the_compaction_threshold(make_pipeline, write_documents, topic_text):
+    texts = {name: topic_text(name.split(".")[0]) for name in ("solar.txt", "tides.txt", "wind.txt", "rain.txt")}
+    docs = write_documents(texts)
+    pipeline = prepared(make_pipeline, docs, index_type="hnsw", vector_precision="fp32")
+    pipeline.config["pipeline"]["compaction_threshold"] = 0.3
+    index = pipeline.vector_store.index
+    per_document = index.ntotal // 4
+
+    # A quarter deleted: below the threshold, the index is kept and the removed chunks are skipped
+    pipeline.config["documents"] = docs[:1] + docs[2:]
+    pipeline.prepare_vector_store()
+    assert pipeline.vector_store.index is index
+    assert len(tombstones_of(pipeline.vector_store)) == per_document
+    assert all(doc.metadata["source"] != "tides.txt" for doc in pipeline.retrieve("tides detail 1-2"))
+
+    # Loading the saved artifact picks the count up where it was left
+    reloaded = prepared(make_pipeline, docs[:1] + docs[2:], index_type="hnsw", vector_precision="fp32")
+    assert reloaded._deleted_since_compaction == per_document
+
+    # Half deleted: past the threshold, the index is rebuilt over the live chunks
+    pipeline.config["documents"] = docs[:1] + docs[3:]
+    pipeline.prepare_vector_store()
+    assert pipeline.vector_store.index is not index
+    assert pipeline.vector_store.index.ntotal == 2 * per_document
+    assert not tombstones_of(pipeline.vector_store)
+    assert index_kind(pipeline.vector_store.index) == "hnsw"
@@ -0,0 +1,52 @@
+import os
+import signal
+
+import numpy as np
+import pytest
+
+from src.retrieval import rerank_pool
+from src.retrieval.reranker import CrossEncoderReranker
+
+PAIRS = [("solar power", "solar panels turn light into power"), ("solar power", "wind turbines"), ("wind", "wind")]
+
+
+def _init_stub_worker(reranker_kwargs: dict, threads: int) -> None:
+    """Worker initializer that loads StubCrossEncoder, so the workers need no model download."""
+    import sentence_transformers
+    from conftest import StubCrossEncoder
+
+    sentence_transformers.CrossEncoder = StubCrossEncoder
+    rerank_pool._init_worker(reranker_kwargs, threads)
+
+
+@pytest.fixture
+def reranker(monkeypatch, stub_cross_encoder):
+    monkeypatch.setattr(rerank_pool, "_init_worker", _init_stub_worker)
+    reranker = CrossEncoderReranker("stub", workers=1, worker_options={"threads_per_worker": 1})
+    yield reranker
+    reranker.close()
+
+
+def kill_workers(pool: rerank_pool.RerankWorkerPool) -> None:
+    for pid in list(pool._executor._processes):
+        os.kill(pid, signal.SIGKILL)
+
+
+def test_pool_survives_dead_workers(reranker):
+    pool = reranker.model
+    expected = CrossEncoderReranker("stub")._predict(PAIRS)
+    np.testing.assert_allclose(reranker._predict(PAIRS), expected)
+
+    # First failure: the pool is restarted and the batch is scored again by the new workers
+    first_executor = pool._executor
+    kill_workers(pool)
+    np.testing.assert_allclose(reranker._predict(PAIRS), expected)
+    assert pool._executor is not None and pool._executor is not first_executor
+    assert pool._local_reranker is None
+
+    # Second failure: scoring falls back to a model loaded in this process
+    kill_workers(pool)
+    np.testing.assert_allclose(reranker._predict(PAIRS), expected)
+    assert pool._executor is None
+    assert pool._local_reranker is not None
+    np.testing.assert_allclose(reranker._predict(PAIRS), expected)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from src.exception import MyException
+from src.retrieval.reranker import CrossEncoderReranker
+from src.utils.main_utils import read_yaml_file
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+
+PASSAGES = [
+    "FAISS builds IVF indexes by clustering vectors into lists and probing only a few lists per query.",
+    "HNSW graphs connect each vector to its nearest neighbours on several layers for fast approximate search.",
+    "Product quantization splits a vector into sub-vectors and stores one centroid id per sub-vector.",
+    "A cross-encoder reads the query and the passage together and outputs a single relevance score.",
+    "BM25 ranks documents by term frequency, inverse document frequency and document length.",
+    "Reciprocal rank fusion adds 1 / (k + rank) over several rankings to merge them.",
+    "Maximal marginal relevance trades relevance against redundancy when selecting passages.",
+    "The Eiffel Tower was completed in 1889 and is about 330 metres tall.",
+    "Photosynthesis converts light energy, water and carbon dioxide into glucose and oxygen.",
+    "Sourdough bread is leavened by wild yeast and lactic acid bacteria in a starter.",
+    "ONNX Runtime executes exported models on CPU with graph optimizations and int8 kernels.",
+    "Chunk overlap keeps sentences that straddle a chunk boundary retrievable from both chunks.",
+]
+QUERIES = [
+    "how does an inverted file index search vectors",
+    "what does a cross encoder compute",
+    "how tall is the eiffel tower",
+    "merging rankings from keyword and vector search",
+    "how is bread made with a starter",
+]
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    rank_a, rank_b = np.argsort(np.argsort(a)), np.argsort(np.argsort(b))
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+@pytest.fixture(scope="module")
+def rerankers():
+    config = (read_yaml_file("configs/retrieval.yaml") or {}).get("retrieval", {})
+    model_name = config.get("reranker_model", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    try:
+        torch_reranker = CrossEncoderReranker(model_name, backend="torch")
+        onnx_reranker = CrossEncoderReranker(
+            model_name, backend="onnx", onnx_options={**(config.get("onnx") or {}), "quantize": True}
+        )
+    except MyException as e:
+        pytest.skip(f"Reranker model {model_name} is not available: {e}")
+    return torch_reranker, onnx_reranker
+
+
+def test_onnx_int8_scores_match_torch(rerankers):
+    torch_reranker, onnx_reranker = rerankers
+    documents = [Document(page_content=passage) for passage in PASSAGES]
+    for query in QUERIES:
+        torch_scores = np.array([score for _, score in sorted(torch_reranker.rank(query, documents))])
+        onnx_scores = np.array([score for _, score in sorted(onnx_reranker.rank(query, documents))])
+
+        assert spearman(torch_scores, onnx_scores) >= 0.9, query
+        assert np.argmax(onnx_scores) == np.argmax(torch_scores), query
+        # Scores are sigmoid probabilities; int8 quantization moves them only slightly
+        np.testing.assert_allclose(onnx_scores, torch_scores, atol=0.1, err_msg=query)
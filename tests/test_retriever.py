@@ -0,0 +1,122 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from src.retrieval.bm25 import reciprocal_rank_fusion
+from src.retrieval.retriever import RerankMMRRetriever
+from src.vectorstore.faiss_store import lexical_index_of
+
+
+class StubReranker:
+    """Scores each document by its `relevance` metadata and records what it was asked to score."""
+
+    def __init__(self):
+        self.calls = []
+
+    def rank(self, query, documents):
+        self.calls.append([doc.page_content for doc in documents])
+        return sorted(
+            ((idx, float(doc.metadata["relevance"])) for idx, doc in enumerate(documents)),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+
+def with_similarities(similarities):
+    """Unit vectors whose cosine similarity to the query e0 is each of `similarities`."""
+    vecs = np.zeros((len(similarities), 3), dtype=np.float32)
+    vecs[:, 0] = similarities
+    vecs[:, 1] = np.sqrt(1 - np.square(similarities))
+    return vecs
+
+
+@pytest.fixture
+def cascade(make_faiss_store):
+    """Run _cascade_rank over candidates with the given similarities and reranker relevance."""
+    def run(similarities, relevance, k, margin, band):
+        retriever = RerankMMRRetriever(None, StubReranker(), embedder=make_faiss_store().embedder)
+        docs = [Document(page_content=f"doc {idx}", metadata={"relevance": rel}) for idx, rel in enumerate(relevance)]
+        query_vec = np.array([1, 0, 0], dtype=np.float32)
+        ranked = retriever._cascade_rank("query", query_vec, docs, with_similarities(similarities), k, margin, band)
+        return [idx for idx, _ in ranked], retriever
+    return run
+
+
+def test_clear_gap_at_the_cut_off_skips_the_cross_encoder(cascade):
+    selected, retriever = cascade([0.9, 0.8, 0.5, 0.4], [0, 0, 1, 1], k=2, margin=0.1, band=0.05)
+
+    assert selected == [0, 1]
+    assert retriever.reranker.calls == []
+    assert retriever.cascade_paths == Counter(skipped=1)
+
+
+def test_only_the_band_around_the_cut_off_is_reranked(cascade):
+    # Cut-off between 0.71 and 0.69 (0.70): 0.9 is certain, 0.3 is out, the band holds 0.71, 0.69 and 0.68
+    selected, retriever = cascade([0.9, 0.71, 0.69, 0.68, 0.3], [0, 0, 0, 1, 1], k=2, margin=0.1, band=0.05)
+
+    assert selected == [0, 3]
+    assert retriever.reranker.calls == [["doc 1", "doc 2", "doc 3"]]
+    assert retriever.cascade_paths == Counter(partial=1)
+
+
+def test_every_candidate_in_the_band_is_a_full_rerank(cascade):
+    selected, retriever = cascade([0.72, 0.71, 0.69, 0.68], [0, 1, 0, 2], k=2, margin=0.1, band=0.05)
+
+    assert selected == [3, 1]
+    assert retriever.reranker.calls == [["doc 0", "doc 1", "doc 2", "doc 3"]]
+    assert retriever.cascade_paths == Counter(full=1)
+
+
+def test_candidate_on_the_band_edge_still_fills_its_slot(cascade):
+    # band == gap / 2: after float rounding 0.73 is neither above cut-off + band nor within the band
+    selected, retriever = cascade([0.9, 0.73, 0.63, 0.3], [0, 0, 0, 0], k=2, margin=0.12, band=0.05)
+
+    assert len(selected) == 2
+    assert selected[0] == 0
+
+
+def test_fewer_candidates_than_k_are_all_returned(cascade):
+    selected, retriever = cascade([0.5, 0.9], [1, 0], k=3, margin=0.1, band=0.05)
+
+    assert selected == [1, 0]
+    assert retriever.cascade_paths == Counter(skipped=1)
+
+
+def test_reciprocal_rank_fusion_adds_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+    # Ties keep the order ids were first seen in
+    assert [doc_id for doc_id, _ in reciprocal_rank_fusion([["x", "y"], ["y", "x"]])] == ["x", "y"]
+
+
+@pytest.fixture
+def hybrid_retriever(make_faiss_store):
+    store = make_faiss_store(index_type="flat", bm25_index=True)
+    texts = [f"chunk {i} about topic {i % 7}" for i in range(60)] + ["the zebra chunk"]
+    vector_store = store.create_vector_store([{"text": text, "metadata": {"source": "test"}} for text in texts])
+    return RerankMMRRetriever(
+        vector_store, StubReranker(), embedder=store.embedder, lexical_index=lexical_index_of(vector_store)
+    )
+
+
+def test_hybrid_candidates_follow_the_fused_order(hybrid_retriever):
+    query = "zebra topic 3"
+    query_vec = np.asarray(hybrid_retriever.embedder.embed_query(query), dtype=np.float32)
+    docs, positions = hybrid_retriever._vector_search(query_vec, 10)
+    index_to_id = hybrid_retriever.vector_store.index_to_docstore_id
+    lexical_ids = [doc_id for doc_id, _ in hybrid_retriever.lexical_index.search(query, 10)]
+
+    fused_docs, fused_positions = hybrid_retriever._fuse_lexical(query, docs, positions, 10, 8, 60)
+
+    expected = reciprocal_rank_fusion([[index_to_id[position] for position in positions], lexical_ids], k=60)[:8]
+    assert [index_to_id[position] for position in fused_positions] == [doc_id for doc_id, _ in expected]
+    assert [doc.page_content for doc in fused_docs] == [
+        hybrid_retriever.vector_store.docstore.search(doc_id).page_content for doc_id, _ in expected
+    ]
+    # The only chunk with the rare term is found by BM25 alone
+    assert "the zebra chunk" not in [doc.page_content for doc in docs]
+    assert "the zebra chunk" in [doc.page_content for doc in fused_docs]
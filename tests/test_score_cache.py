@@ -0,0 +1,64 @@
+import pytest
+from langchain_core.documents import Document
+
+from src.retrieval.reranker import CrossEncoderReranker
+from src.retrieval.score_cache import ScoreCache
+
+CHUNKS = [
+    "Solar panels turn sunlight into electricity.",
+    "Tides are driven by the pull of the moon.",
+    "Wind turbines turn moving air into electricity.",
+]
+
+
+@pytest.fixture
+def reranker(stub_cross_encoder):
+    reranker = CrossEncoderReranker("stub", cache=ScoreCache())
+    reranker.cache.set_fingerprint("docs-v1")
+    return reranker
+
+
+def documents(texts, source="a.txt"):
+    return [Document(page_content=text, metadata={"source": source}) for text in texts]
+
+
+def test_repeated_pairs_are_not_scored_again(reranker):
+    first = reranker.rank("how is electricity made", documents(CHUNKS))
+    second = reranker.rank("how is electricity made", documents(CHUNKS))
+
+    assert second == first
+    assert reranker.model.pairs_scored == len(CHUNKS)
+    assert reranker.cache_stats()["hits"] == len(CHUNKS)
+
+
+def test_cached_scores_equal_uncached_ones(reranker):
+    uncached = CrossEncoderReranker("stub")
+
+    reranker.rank("how is electricity made", documents(CHUNKS))
+
+    assert reranker.rank("how is electricity made", documents(CHUNKS)) == uncached.rank(
+        "how is electricity made", documents(CHUNKS)
+    )
+
+
+def test_pairs_are_keyed_by_query_and_chunk_content(reranker):
+    reranker.rank("how is electricity made", documents(CHUNKS))
+
+    # Same text from another document and a re-spaced query: cached
+    reranker.rank("  how is   electricity made ", documents(CHUNKS[:1], source="b.txt"))
+    assert reranker.model.pairs_scored == len(CHUNKS)
+
+    # An edited chunk and a different query are scored
+    reranker.rank("how is electricity made", documents([CHUNKS[0] + " Edited."]))
+    reranker.rank("what drives the tides", documents(CHUNKS[1:2]))
+    assert reranker.model.pairs_scored == len(CHUNKS) + 2
+
+
+def test_new_fingerprint_drops_cached_scores(reranker):
+    reranker.rank("how is electricity made", documents(CHUNKS))
+
+    reranker.cache.set_fingerprint("docs-v2")
+    reranker.rank("how is electricity made", documents(CHUNKS))
+
+    assert reranker.model.pairs_scored == 2 * len(CHUNKS)
+    assert reranker.cache_stats()["invalidations"] == 1
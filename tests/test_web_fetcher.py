@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import time
+
+import httpx
+import pytest
+
+from src.ingestion.web_fetcher import CachedPageLoader, WebCache, WebFetcher
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+class FakeSite:
+    """In-memory site behind an httpx.MockTransport that answers conditional requests with 304."""
+
+    def __init__(self, pages: dict):
+        self.pages = pages
+        self.requests = []
+        self.down = False
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.down:
+            raise httpx.ConnectError("connection refused", request=request)
+        body = self.pages.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        etag = f'"{hashlib.md5(body.encode()).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, headers={"ETag": etag, "Content-Type": "text/html; charset=utf-8"}, text=body)
+
+
+def url(path: str) -> str:
+    return f"https://example.test{path}"
+
+
+@pytest.fixture
+def site():
+    return FakeSite({"/a.html": "<html><title>A</title><p>first</p></html>"})
+
+
+@pytest.fixture
+def fetcher(site, tmp_path):
+    return WebFetcher(str(tmp_path / "cache"), transport=httpx.MockTransport(site.handle))
+
+
+def test_unchanged_page_is_revalidated_and_keeps_its_hash(site, fetcher):
+    first = fetcher.fetch([url("/a.html")])[url("/a.html")]
+    second = fetcher.fetch([url("/a.html")])[url("/a.html")]
+
+    assert first["status"] == "downloaded"
+    assert second == {"content_hash": first["content_hash"], "status": "not_modified", "error": None}
+    assert "if-none-match" not in site.requests[0].headers
+    assert site.requests[1].headers["if-none-match"] == f'"{first["content_hash"]}"'
+
+
+def test_changed_page_is_downloaded_again(site, fetcher):
+    first = fetcher.fetch([url("/a.html")])[url("/a.html")]
+    site.pages["/a.html"] = "<html><title>A</title><p>second</p></html>"
+    second = fetcher.fetch([url("/a.html")])[url("/a.html")]
+
+    assert second["status"] == "downloaded"
+    assert second["content_hash"] != first["content_hash"]
+    with open(fetcher.cache.body_path(url("/a.html")), encoding="utf-8") as f:
+        assert "second" in f.read()
+
+
+def test_failed_fetch_falls_back_to_the_cached_copy(site, fetcher):
+    first = fetcher.fetch([url("/a.html")])[url("/a.html")]
+    site.down = True
+    results = fetcher.fetch([url("/a.html"), url("/never-fetched.html")])
+
+    assert results[url("/a.html")]["status"] == "stale"
+    assert results[url("/a.html")]["content_hash"] == first["content_hash"]
+    assert results[url("/a.html")]["error"]
+    assert results[url("/never-fetched.html")]["status"] == "error"
+    assert results[url("/never-fetched.html")]["content_hash"] is None
+
+
+def test_nested_sitemap_index_lists_every_page(site, fetcher):
+    def urlset(paths):
+        locs = "".join(f"<url><loc>{url(path)}</loc></url>" for path in paths)
+        return f"<?xml version='1.0'?><urlset xmlns='{SITEMAP_NS}'>{locs}</urlset>"
+
+    def index(paths):
+        locs = "".join(f"<sitemap><loc>{url(path)}</loc></sitemap>" for path in paths)
+        return f"<?xml version='1.0'?><sitemapindex xmlns='{SITEMAP_NS}'>{locs}</sitemapindex>"
+
+    site.pages.update({
+        "/sitemap.xml": index(["/sitemap-docs.xml", "/nested-index.xml"]),
+        "/nested-index.xml": index(["/sitemap-blog.xml"]),
+        "/sitemap-docs.xml": urlset(["/a.html", "/b.html"]),
+        "/sitemap-blog.xml": urlset(["/c.html"]),
+        "/b.html": "<p>b</p>",
+        "/c.html": "<p>c</p>",
+    })
+
+    results = fetcher.fetch([], [url("/sitemap.xml")])
+
+    assert results[url("/sitemap.xml")]["pages"] == [url("/a.html"), url("/b.html"), url("/c.html")]
+    for page in ("/a.html", "/b.html", "/c.html"):
+        assert results[url(page)]["status"] == "downloaded"
+
+
+def write_entry(cache: WebCache, page_url: str, size: int, age: float) -> None:
+    with open(cache.body_path(page_url), "wb") as f:
+        f.write(b"x" * size)
+    with open(cache.body_path(page_url)[:-len(".body")] + ".json", "w", encoding="utf-8") as f:
+        json.dump({"url": page_url, "content_hash": "h", "fetched_at": time.time() - age}, f)
+
+
+def fetch_and_load(tmp_path, body: bytes, content_type: str):
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, headers={"Content-Type": content_type}, content=body)
+    )
+    fetcher = WebFetcher(str(tmp_path / "cache"), transport=transport)
+    fetcher.fetch([url("/page.html")])
+    (page,) = CachedPageLoader(fetcher.cache, url("/page.html")).load()
+    return page
+
+
+TEXT = "Le café où l'été déçoit, près de la forêt: " * 20
+
+
+def test_cached_page_is_decoded_with_the_declared_charset(tmp_path):
+    html = f"<html><head><title>Été</title></head><body><p>{TEXT}</p></body></html>"
+
+    page = fetch_and_load(tmp_path, html.encode("cp1252"), "text/html; charset=windows-1252")
+
+    assert page.page_content == "Été" + TEXT
+    assert page.metadata["title"] == "Été"
+
+
+def test_cached_page_without_a_declared_charset_is_decoded_like_web_base_loader(tmp_path):
+    # Like requests' apparent_encoding, the bytes decide, not a wrong <meta charset>
+    html = f'<html><head><meta charset="iso-8859-1"><title>Été</title></head><body><p>{TEXT}</p></body></html>'
+
+    page = fetch_and_load(tmp_path, html.encode("utf-8"), "text/html")
+
+    assert page.page_content == "Été" + TEXT
+    assert page.metadata["title"] == "Été"
+
+
+def test_cache_evicts_by_age_then_size_and_spares_kept_urls(tmp_path):
+    cache = WebCache(str(tmp_path))
+    write_entry(cache, url("/expired.html"), 10, age=10_000)
+    write_entry(cache, url("/kept.html"), 100, age=20_000)
+    write_entry(cache, url("/old.html"), 100, age=300)
+    write_entry(cache, url("/new.html"), 100, age=100)
+
+    evicted = cache.prune(max_age_seconds=1_000, max_bytes=250, keep=[url("/kept.html")])
+
+    assert evicted == 2
+    assert cache.get(url("/expired.html")) is None and cache.get(url("/old.html")) is None
+    assert cache.get(url("/kept.html")) is not None and cache.get(url("/new.html")) is not None
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(cache.body_path(url(page)))[:-len(".body")] + suffix
+        for page in ("/kept.html", "/new.html")
+        for suffix in (".body", ".json")
+    )